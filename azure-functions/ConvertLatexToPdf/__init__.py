@@ -7,35 +7,26 @@ import os
 import tempfile
 import shutil
 import subprocess
+import sys
 from pathlib import Path
 
 from shared_code.database import get_database
 from shared_code.storage import store_file
 from shared_code.models import ConversionResult
 
-# Utility functions for LaTeX processing
-def parse_latex_errors(log_content: str):
-    """Parse LaTeX log file to extract errors and warnings"""
-    errors = []
-    warnings = []
-    
-    lines = log_content.split('\n')
-    for i, line in enumerate(lines):
-        if line.startswith('!') and 'Error' in line:
-            error_msg = line
-            # Try to get the next few lines for more context
-            for j in range(i + 1, min(i + 3, len(lines))):
-                if lines[j].strip() and not lines[j].startswith('l.'):
-                    error_msg += " " + lines[j].strip()
-                if lines[j].startswith('l.'):
-                    error_msg += " " + lines[j].strip()
-                    break
-            errors.append(error_msg)
-        elif 'Warning' in line and not line.startswith('('):
-            warnings.append(line.strip())
-    
-    return errors, warnings
+# Share the log parser with the backend and CLI:
+# xtox/azure-functions/ConvertLatexToPdf/__init__.py -> xtox/core/latex_log.py
+xtox_dir = Path(__file__).resolve().parents[2]
+if str(xtox_dir) not in sys.path:
+    sys.path.insert(0, str(xtox_dir))
+from core.latex_log import parse_latex_log_file, summarize_diagnostics
 
+# Limit concurrent pdflatex processes per worker to the available cores
+MAX_CONCURRENT_COMPILES = int(os.environ.get('MAX_CONCURRENT_COMPILES', os.cpu_count() or 1))
+LATEX_TIMEOUT = int(os.environ.get('LATEX_TIMEOUT', 30))
+_compile_semaphore = asyncio.Semaphore(MAX_CONCURRENT_COMPILES)
+
+# Utility functions for LaTeX processing
 def auto_fix_latex(content: str):
     """Apply basic auto-fixes to LaTeX content"""
     original_content = content
@@ -71,6 +62,30 @@ def auto_fix_latex(content: str):
     
     return content, fixed
 
+async def run_pdflatex(filename: str, cwd: Path):
+    """Run pdflatex without blocking the event loop"""
+    command = ['pdflatex', '-interaction=nonstopmode', f'{filename}.tex']
+    async with _compile_semaphore:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=LATEX_TIMEOUT)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            raise subprocess.TimeoutExpired(command, LATEX_TIMEOUT)
+    
+    return subprocess.CompletedProcess(
+        command,
+        process.returncode,
+        stdout.decode('utf-8', errors='replace'),
+        stderr.decode('utf-8', errors='replace')
+    )
+
 async def process_latex_file(file_content: str, filename: str, auto_fix: bool = False):
     """Process LaTeX file and convert to PDF"""
     conversion_id = str(uuid.uuid4())
@@ -94,13 +109,7 @@ async def process_latex_file(file_content: str, filename: str, auto_fix: bool =
                 f.write(file_content)
             
             # Run pdflatex
-            result = subprocess.run(
-                ['pdflatex', '-interaction=nonstopmode', f'{filename}.tex'],
-                cwd=temp_dir_path,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = await run_pdflatex(filename, temp_dir_path)
             
             # Check if PDF was created
             pdf_file = temp_dir_path / f"{filename}.pdf"
@@ -112,9 +121,7 @@ async def process_latex_file(file_content: str, filename: str, auto_fix: bool =
             if result.returncode != 0 or not success:
                 log_file = temp_dir_path / f"{filename}.log"
                 if log_file.exists():
-                    with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        log_content = f.read()
-                    errors, warnings = parse_latex_errors(log_content)
+                    errors, warnings = summarize_diagnostics(parse_latex_log_file(log_file))
                 
                 if not errors:
                     errors = [f"LaTeX compilation failed with return code {result.returncode}"]
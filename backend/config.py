@@ -27,6 +27,31 @@ MAX_AUDIO_FILE_SIZE = int(os.environ.get('MAX_AUDIO_FILE_SIZE', 50 * 1024 * 1024
 LATEX_TIMEOUT = int(os.environ.get('LATEX_TIMEOUT', 30))  # seconds
 AUDIO_CONVERSION_TIMEOUT = int(os.environ.get('AUDIO_CONVERSION_TIMEOUT', 300))  # 5 minutes
 
+# Compile pool (blocking pdflatex runs are kept off the event loop)
+COMPILE_WORKERS = int(os.environ.get('COMPILE_WORKERS', os.cpu_count() or 1))
+COMPILE_QUEUE_LIMIT = int(os.environ.get('COMPILE_QUEUE_LIMIT', 4 * COMPILE_WORKERS))  # waiting jobs
+
+# Reusable scratch directories, on tmpfs when available
+WORKSPACE_USE_TMPFS = os.environ.get('WORKSPACE_USE_TMPFS', 'true').lower() == 'true'
+WORKSPACE_DIR = Path(os.environ.get(
+    'WORKSPACE_DIR',
+    '/dev/shm/xtopdf-workspaces' if WORKSPACE_USE_TMPFS and Path('/dev/shm').is_dir()
+    else str(TEMP_DIR / 'workspaces')
+))
+WORKSPACE_POOL_SIZE = int(os.environ.get('WORKSPACE_POOL_SIZE', 2 * COMPILE_WORKERS))
+
+# Warm compile sessions (opt-in per request with a session id from POST /api/sessions)
+COMPILE_SESSION_DIR = Path(os.environ.get(
+    'COMPILE_SESSION_DIR',
+    '/dev/shm/xtopdf-sessions' if WORKSPACE_USE_TMPFS and Path('/dev/shm').is_dir()
+    else str(TEMP_DIR / 'sessions')
+))
+COMPILE_SESSION_TTL = int(os.environ.get('COMPILE_SESSION_TTL', 900))  # idle seconds
+COMPILE_SESSION_MAX = int(os.environ.get('COMPILE_SESSION_MAX', 64))
+COMPILE_SESSION_MAX_BYTES = int(os.environ.get('COMPILE_SESSION_MAX_BYTES', 256 * 1024 * 1024))  # 256MB default
+COMPILE_SESSION_MIN_FREE_BYTES = int(os.environ.get('COMPILE_SESSION_MIN_FREE_BYTES', 128 * 1024 * 1024))  # keep 128MB free
+COMPILE_SESSION_SWEEP_INTERVAL = int(os.environ.get('COMPILE_SESSION_SWEEP_INTERVAL', 60))  # seconds between expiry sweeps
+
 # Rate limiting
 RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
 RATE_LIMIT_REQUESTS = int(os.environ.get('RATE_LIMIT_REQUESTS', 100))  # requests per window
@@ -37,6 +62,28 @@ CACHE_ENABLED = os.environ.get('CACHE_ENABLED', 'false').lower() == 'true'
 CACHE_TTL = int(os.environ.get('CACHE_TTL', 3600))  # seconds
 REDIS_URL = os.environ.get('REDIS_URL')
 
+# Compiled PDF cache (content-addressed, shared with the core library)
+COMPILE_CACHE_ENABLED = os.environ.get('COMPILE_CACHE_ENABLED', 'true').lower() == 'true'
+COMPILE_CACHE_DIR = Path(os.environ.get('COMPILE_CACHE_DIR', '/tmp/xtopdf-cache'))
+COMPILE_CACHE_MAX_BYTES = int(os.environ.get('COMPILE_CACHE_MAX_BYTES', 512 * 1024 * 1024))  # 512MB default
+
+# Pre-flight lint: reject sources that cannot compile without running pdflatex
+PREFLIGHT_ENABLED = os.environ.get('PREFLIGHT_ENABLED', 'true').lower() == 'true'
+
+# Early abort: stop pdflatex once its output shows the document is broken (0 disables)
+LATEX_MAX_ERRORS = int(os.environ.get('LATEX_MAX_ERRORS', 1))
+LATEX_MAX_ERROR_RATE = float(os.environ.get('LATEX_MAX_ERROR_RATE', 0))  # errors per second
+
+# Resource limits per pdflatex/ffmpeg process (0 disables a limit)
+LATEX_CPU_LIMIT = int(os.environ.get('LATEX_CPU_LIMIT', 25))  # CPU seconds, below LATEX_TIMEOUT so it can trigger
+LATEX_MEMORY_LIMIT = int(os.environ.get('LATEX_MEMORY_LIMIT', 1024 * 1024 * 1024))  # 1GB address space
+LATEX_FILE_SIZE_LIMIT = int(os.environ.get('LATEX_FILE_SIZE_LIMIT', 100 * 1024 * 1024))  # 100MB per output file
+LATEX_OPEN_FILES_LIMIT = int(os.environ.get('LATEX_OPEN_FILES_LIMIT', 256))
+FFMPEG_CPU_LIMIT = int(os.environ.get('FFMPEG_CPU_LIMIT', 120))  # CPU seconds
+FFMPEG_MEMORY_LIMIT = int(os.environ.get('FFMPEG_MEMORY_LIMIT', 1024 * 1024 * 1024))  # 1GB address space
+FFMPEG_FILE_SIZE_LIMIT = int(os.environ.get('FFMPEG_FILE_SIZE_LIMIT', 500 * 1024 * 1024))  # 500MB per output file
+FFMPEG_OPEN_FILES_LIMIT = int(os.environ.get('FFMPEG_OPEN_FILES_LIMIT', 256))
+
 # Create necessary directories
 TEMP_DIR.mkdir(exist_ok=True)
 DOC_STORAGE_DIR.mkdir(exist_ok=True)
\ No newline at end of file
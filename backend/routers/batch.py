@@ -28,11 +28,15 @@ router = APIRouter(prefix="/api/batch")
 async def batch_convert_latex(
     files: List[UploadFile] = File(...),
     auto_fix: bool = False,
+    batch: bool = True,
     background_tasks: BackgroundTasks = None
 ):
     """
     Convert multiple LaTeX files to PDF in batch.
     
+    With batch enabled, small files that share a preamble are compiled in a
+    single pdflatex run and the PDF is split back per file.
+    
     TODO: Production implementation:
     - Process files asynchronously using job queue
     - Return job ID for status polling
@@ -48,6 +52,7 @@ async def batch_convert_latex(
     batch_id = str(uuid.uuid4())
     results = []
     errors = []
+    documents = []
     
     for file in files:
         try:
@@ -78,8 +83,12 @@ async def batch_convert_latex(
                     })
                     continue
             
-            # Process conversion
             filename = file.filename.rsplit('.', 1)[0]
+            if batch:
+                documents.append((file_content, filename))
+                continue
+            
+            # Process conversion
             result = await LatexService.process_latex_file(file_content, filename, auto_fix)
             results.append(result.dict())
             
@@ -90,6 +99,14 @@ async def batch_convert_latex(
                 "error": str(e)
             })
     
+    if documents:
+        try:
+            batch_results = await LatexService.process_latex_batch(documents, auto_fix)
+            results.extend(result.dict() for result in batch_results)
+        except Exception as e:
+            logger.error(f"Error processing batch {batch_id}: {e}", exc_info=True)
+            errors.extend({"filename": filename, "error": str(e)} for _, filename in documents)
+    
     return {
         "batch_id": batch_id,
         "total_files": len(files),
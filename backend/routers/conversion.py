@@ -16,6 +16,7 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from models import AudioConversionResult, ConversionResult
 from services.conversion_service import ConversionBusinessLogic
 from utils.cache import cache_result
+from utils.compile_session import compile_sessions
 from utils.streaming import stream_upload_file
 
 logger = logging.getLogger(__name__)
@@ -26,13 +27,19 @@ router = APIRouter(prefix="/api")
 @router.post("/convert", response_model=ConversionResult)
 async def convert_latex_to_pdf(
     file: UploadFile = File(...),
-    auto_fix: bool = False
+    auto_fix: bool = False,
+    session_id: Optional[str] = Query(None, max_length=128)
 ):
     """
     Convert LaTeX file to PDF.
     
     Uses streaming for large files to avoid loading entire file into memory.
     Route handler delegates business logic to ConversionBusinessLogic.
+    
+    Clients that recompile the same document repeatedly (editor
+    integrations) can pass a session_id from POST /api/sessions. Its working
+    directory and auxiliary files are kept between requests, so recompiles
+    usually need a single pdflatex pass.
     """
     from config import TEMP_DIR
     import uuid
@@ -59,7 +66,8 @@ async def convert_latex_to_pdf(
             file_content=file_content,
             filename=filename,
             auto_fix=auto_fix,
-            max_file_size=MAX_FILE_SIZE
+            max_file_size=MAX_FILE_SIZE,
+            session_id=session_id
         )
         
         return result
@@ -73,6 +81,29 @@ async def convert_latex_to_pdf(
             logger.warning(f"Failed to clean up temp file {temp_file}: {e}")
 
 
+@router.post("/sessions")
+async def start_compile_session():
+    """
+    Start a compile session and return its id.
+    
+    Ids are generated here rather than chosen by the client, so each
+    session's working directory belongs to the client that started it.
+    """
+    return {"session_id": compile_sessions.create()}
+
+
+@router.delete("/sessions/{session_id}")
+async def end_compile_session(session_id: str):
+    """
+    End a compile session and free its working directory.
+    
+    Idle sessions also expire on their own after COMPILE_SESSION_TTL.
+    """
+    if not compile_sessions.close(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or still compiling")
+    return {"session_id": session_id, "closed": True}
+
+
 @router.get("/download/{conversion_id}")
 async def download_pdf(
     conversion_id: str,
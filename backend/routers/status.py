@@ -3,6 +3,9 @@ from typing import List
 
 from models import StatusCheck, StatusCheckCreate
 from database import Database
+from utils.compile_pool import compile_pool
+from utils.compile_session import compile_sessions
+from utils.workspace import workspace_pool
 
 router = APIRouter(prefix="/api")
 
@@ -22,4 +25,13 @@ async def create_status_check(input: StatusCheckCreate):
 async def get_status_checks():
     db = Database.get_db()
     status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
\ No newline at end of file
+    return [StatusCheck(**status_check) for status_check in status_checks]
+
+@router.get("/status/compile-pool")
+async def get_compile_pool_status():
+    """Report compile pool load: running jobs, queue depth and rejections."""
+    return {
+        **compile_pool.stats(),
+        "workspaces": workspace_pool.stats(),
+        "sessions": compile_sessions.stats(),
+    }
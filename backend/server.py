@@ -71,11 +71,22 @@ app.include_router(webhooks.router)
 async def startup_db_client():
     await Database.connect()
     logger.info("Connected to the MongoDB database")
+    
+    # Expired compile sessions are removed even when no requests arrive
+    from utils.compile_session import compile_sessions
+    compile_sessions.start_sweeper()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
     await Database.close()
     logger.info("Disconnected from the MongoDB database")
+    
+    from utils.compile_pool import compile_pool
+    from utils.compile_session import compile_sessions
+    from utils.workspace import workspace_pool
+    compile_pool.shutdown()
+    workspace_pool.shutdown()
+    compile_sessions.shutdown()
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,23 +1,45 @@
 """
 Service layer for document and audio conversion.
 """
+import asyncio
 import logging
 import shutil
 import subprocess
 import sys
-import time
 import uuid
+from contextlib import AsyncExitStack, asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, List, Optional, Tuple
 
 import aiofiles
 import aiofiles.os
 
-from config import TEMP_DIR
+from config import (
+    COMPILE_CACHE_DIR,
+    COMPILE_CACHE_ENABLED,
+    COMPILE_CACHE_MAX_BYTES,
+    FFMPEG_CPU_LIMIT,
+    FFMPEG_FILE_SIZE_LIMIT,
+    FFMPEG_MEMORY_LIMIT,
+    FFMPEG_OPEN_FILES_LIMIT,
+    LATEX_CPU_LIMIT,
+    LATEX_FILE_SIZE_LIMIT,
+    LATEX_MAX_ERROR_RATE,
+    LATEX_MAX_ERRORS,
+    LATEX_MEMORY_LIMIT,
+    LATEX_OPEN_FILES_LIMIT,
+    LATEX_TIMEOUT,
+    PREFLIGHT_ENABLED,
+    TEMP_DIR,
+)
 from database import Database
 from fastapi import HTTPException
 from models import AudioConversionResult, ConversionResult
-from utils import auto_fix_latex, parse_latex_errors
+from utils import auto_fix_latex
+from utils.compile_pool import CompilePoolFull, compile_pool
+from utils.compile_session import SessionNotFound, compile_sessions
 from utils.security import sanitize_filename, validate_file_path
+from utils.workspace import workspace_pool
 
 logger = logging.getLogger(__name__)
 
@@ -28,19 +50,140 @@ xtox_dir = backend_dir.parent
 if str(xtox_dir) not in sys.path:
     sys.path.insert(0, str(xtox_dir))
 from core.audio_converter import AudioConverter
+from core.batch_compile import compile_latex_batch
+from core.compile_cache import CompileCache, compile_cache_key
+from core.latex_format import find_format_for_content
+from core.latex_lint import lint_latex_content
+from core.latex_log import parse_latex_log_file, summarize_diagnostics
+from core.latex_to_pdf import run_pdflatex
+from core.sandbox import ResourceLimitExceeded, ResourceLimits
+
+compile_cache = CompileCache(COMPILE_CACHE_DIR, COMPILE_CACHE_MAX_BYTES)
+
+LATEX_LIMITS = ResourceLimits(
+    cpu_seconds=LATEX_CPU_LIMIT,
+    memory_bytes=LATEX_MEMORY_LIMIT,
+    file_size_bytes=LATEX_FILE_SIZE_LIMIT,
+    open_files=LATEX_OPEN_FILES_LIMIT,
+)
+FFMPEG_LIMITS = ResourceLimits(
+    cpu_seconds=FFMPEG_CPU_LIMIT,
+    memory_bytes=FFMPEG_MEMORY_LIMIT,
+    file_size_bytes=FFMPEG_FILE_SIZE_LIMIT,
+    open_files=FFMPEG_OPEN_FILES_LIMIT,
+)
 
 
 class LatexService:
     @staticmethod
-    async def process_latex_file(file_content: str, filename: str, auto_fix: bool = False) -> ConversionResult:
-        """Process LaTeX file and convert to PDF"""
-        conversion_id = str(uuid.uuid4())
+    def _compile(tex_file: Path, file_content: str) -> dict:
+        """Blocking part of a conversion; runs inside the compile pool."""
+        # Compile against a precompiled format for known preambles; dumping
+        # one runs pdflatex on the upload, so it is sandboxed the same way
+        format_path = find_format_for_content(
+            file_content, timeout=LATEX_TIMEOUT, limits=LATEX_LIMITS
+        )
+        
+        # Run pdflatex until cross-references settle, stopping broken
+        # documents early so they release their compile slot
+        return run_pdflatex(
+            tex_file,
+            format_path,
+            timeout=LATEX_TIMEOUT,
+            max_errors=LATEX_MAX_ERRORS or None,
+            max_error_rate=LATEX_MAX_ERROR_RATE or None,
+            limits=LATEX_LIMITS
+        )
+    
+    @staticmethod
+    async def _read_log(log_file: Path) -> Tuple[list, list]:
+        """Parse errors and warnings from a pdflatex log, if there is one."""
+        if not await aiofiles.os.path.exists(log_file):
+            return [], []
+        # The log is streamed through the parser in a worker thread
+        diagnostics = await asyncio.to_thread(parse_latex_log_file, log_file)
+        return summarize_diagnostics(diagnostics)
+    
+    @staticmethod
+    async def _store_result(
+        conversion_id: str,
+        filename: str,
+        success: bool,
+        pdf_file: Path,
+        errors: list,
+        warnings: list,
+        auto_fix_applied: bool,
+        fixed_content: Optional[str]
+    ) -> ConversionResult:
+        """Move the PDF to its download location and record the conversion."""
+        # Move PDF to accessible location if successful
+        pdf_path = None
+        if success:
+            final_pdf_path = TEMP_DIR / f"{conversion_id}.pdf"
+            shutil.move(pdf_file, final_pdf_path)
+            pdf_path = str(final_pdf_path)
+        
+        result_obj = ConversionResult(
+            id=conversion_id,
+            filename=filename,
+            success=success,
+            auto_fix_applied=auto_fix_applied,
+            errors=errors,
+            warnings=warnings,
+            pdf_path=pdf_path,
+            fixed_content=fixed_content if auto_fix_applied else None
+        )
+        
+        # Store result in database
+        db = Database.get_db()
+        await db.conversions.insert_one(result_obj.dict())
+        
+        return result_obj
+    
+    @staticmethod
+    @asynccontextmanager
+    async def _workspace(session_id: Optional[str] = None) -> AsyncIterator[Path]:
+        """Yield a session's warm directory, or a scratch directory from the pool."""
+        if session_id:
+            async with compile_sessions.use(session_id) as session_dir:
+                yield session_dir
+            return
+        
+        temp_dir = workspace_pool.acquire()
+        try:
+            yield temp_dir
+        finally:
+            # Recycle the workspace; clearing happens off the request path
+            workspace_pool.release(temp_dir)
+    
+    @staticmethod
+    async def process_latex_file(
+        file_content: str,
+        filename: str,
+        auto_fix: bool = False,
+        session_id: Optional[str] = None
+    ) -> ConversionResult:
+        """
+        Process LaTeX file and convert to PDF.
         
-        # Create temporary directory for this conversion
-        temp_dir = TEMP_DIR / conversion_id
-        temp_dir.mkdir(exist_ok=True)
+        With a session_id, the conversion runs in that session's directory,
+        where auxiliary files from its previous compile are still present.
+        """
+        conversion_id = str(uuid.uuid4())
+        workspace = AsyncExitStack()
         
         try:
+            # Take a scratch directory (or the session's) for this conversion
+            temp_dir = await workspace.enter_async_context(LatexService._workspace(session_id))
+            
+            # Key the cache on the submitted source, before any auto-fix;
+            # hashing reads dependencies from disk, so it runs off the loop
+            cache_key = None
+            if COMPILE_CACHE_ENABLED:
+                cache_key = await asyncio.to_thread(
+                    compile_cache_key, file_content.splitlines(), auto_fix, temp_dir
+                )
+            
             # Apply auto-fix if requested
             fixed_content = None
             auto_fix_applied = False
@@ -61,64 +204,85 @@ class LatexService:
             async with aiofiles.open(tex_file, 'w', encoding='utf-8') as f:
                 await f.write(file_content)
             
-            # Run pdflatex
-            result = subprocess.run(
-                ['pdflatex', '-interaction=nonstopmode', f'{filename}.tex'],
-                cwd=temp_dir,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            pdf_file = tex_file.with_suffix('.pdf')
+            cached = None
+            if cache_key:
+                cached = await asyncio.to_thread(compile_cache.fetch, cache_key, pdf_file)
             
-            # Check if PDF was created
-            pdf_file = temp_dir / f"{filename}.pdf"
-            success = pdf_file.exists()
+            # The lint may call kpsewhich or rebuild the TeX index
+            preflight_errors, preflight_warnings = [], []
+            if cached is None and PREFLIGHT_ENABLED:
+                preflight_errors, preflight_warnings = await asyncio.to_thread(
+                    lint_latex_content, file_content, temp_dir
+                )
             
-            # Parse errors and warnings (async I/O)
-            errors = []
-            warnings = []
-            if result.returncode != 0 or not success:
-                log_file = temp_dir / f"{filename}.log"
-                if await aiofiles.os.path.exists(log_file):
-                    async with aiofiles.open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                        log_content = await f.read()
-                    errors, warnings = parse_latex_errors(log_content)
+            if cached is not None:
+                # Identical source compiled before: reuse its PDF and diagnostics
+                logger.info(f"Compile cache hit for conversion {conversion_id}")
+                success = True
+                errors = cached["errors"]
+                warnings = cached["warnings"]
+            elif preflight_errors:
+                # Doomed to fail; don't spend a compile slot on it
+                logger.info(f"Pre-flight check rejected conversion {conversion_id}")
+                success = False
+                errors = preflight_errors
+                warnings = preflight_warnings
+            else:
+                # Compile in the bounded pool so the event loop stays responsive
+                result = await compile_pool.run(
+                    LatexService._compile, tex_file, file_content
+                )
                 
-                if not errors:
-                    errors = [f"LaTeX compilation failed with return code {result.returncode}"]
-                    if result.stderr:
-                        errors.append(result.stderr)
-            
-            # Move PDF to accessible location if successful
-            pdf_path = None
-            if success:
-                final_pdf_path = TEMP_DIR / f"{conversion_id}.pdf"
-                shutil.move(pdf_file, final_pdf_path)
-                pdf_path = str(final_pdf_path)
+                # Check if PDF was created (a stopped run may leave an older one)
+                success = pdf_file.exists() and not result["aborted"]
+                
+                if result["aborted"]:
+                    # The log was cut off; use what was parsed from the output
+                    logger.info(f"Stopped pdflatex early for conversion {conversion_id}")
+                    errors, warnings = summarize_diagnostics(result["diagnostics"])
+                else:
+                    # Parse errors and warnings (async I/O)
+                    errors, warnings = await LatexService._read_log(tex_file.with_suffix('.log'))
+                
+                if not result["success"] or not success:
+                    if not errors:
+                        errors = [f"LaTeX compilation failed with return code {result['returncode']}"]
+                        if result["stderr"]:
+                            errors.append(result["stderr"])
+                elif cache_key:
+                    # Copies the PDF and runs eviction
+                    await asyncio.to_thread(compile_cache.put, cache_key, pdf_file, errors, warnings)
             
-            result_obj = ConversionResult(
-                id=conversion_id,
-                filename=filename,
-                success=success,
-                auto_fix_applied=auto_fix_applied,
-                errors=errors,
-                warnings=warnings,
-                pdf_path=pdf_path,
-                fixed_content=fixed_content if auto_fix_applied else None
+            return await LatexService._store_result(
+                conversion_id, filename, success, pdf_file, errors, warnings,
+                auto_fix_applied, fixed_content
+            )
+        
+        except SessionNotFound:
+            raise HTTPException(
+                status_code=404,
+                detail="Compile session not found or expired. Start a new one with POST /api/sessions."
+            )
+        except CompilePoolFull:
+            logger.warning(f"Compile pool full, rejecting conversion {conversion_id}")
+            raise HTTPException(
+                status_code=503,
+                detail="The server is busy compiling other documents. Please retry shortly.",
+                headers={"Retry-After": "5"}
             )
-            
-            # Store result in database
-            db = Database.get_db()
-            await db.conversions.insert_one(result_obj.dict())
-            
-            return result_obj
-                
         except subprocess.TimeoutExpired:
             logger.error(f"LaTeX compilation timed out for conversion {conversion_id}")
             raise HTTPException(
                 status_code=408, 
                 detail="LaTeX compilation timed out. The document may be too complex or contain errors."
             )
+        except ResourceLimitExceeded as e:
+            logger.warning(f"LaTeX compilation hit its {e.limit} limit for conversion {conversion_id}")
+            raise HTTPException(
+                status_code=422,
+                detail=f"LaTeX compilation was stopped: {e}. The document may be too complex or loop forever."
+            )
         except ValueError as e:
             # Security-related errors (path traversal, invalid filename)
             logger.warning(f"Security validation error for conversion {conversion_id}: {str(e)}")
@@ -141,11 +305,129 @@ class LatexService:
                 detail="An error occurred during processing. Please try again or contact support."
             )
         finally:
-            # Clean up temporary directory
-            try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
+            await workspace.aclose()
+    
+    @staticmethod
+    async def process_latex_batch(
+        documents: List[Tuple[str, str]],
+        auto_fix: bool = False
+    ) -> List[ConversionResult]:
+        """
+        Process several LaTeX files, compiling compatible ones in one run.
+        
+        Small documents that share a preamble go through a single pdflatex
+        run and the PDF is split per document. Errors are still reported
+        against the document they came from.
+        
+        Args:
+            documents: (file_content, filename) pairs
+            auto_fix: Whether to apply auto-fix to each document
+        """
+        temp_dir = workspace_pool.acquire()
+        
+        try:
+            pending = []
+            finished = {}
+            for index, (file_content, filename) in enumerate(documents):
+                conversion_id = str(uuid.uuid4())
+                
+                # Key the cache on the submitted source, before any auto-fix
+                cache_key = None
+                if COMPILE_CACHE_ENABLED:
+                    cache_key = await asyncio.to_thread(
+                        compile_cache_key, file_content.splitlines(), auto_fix, temp_dir
+                    )
+                
+                fixed_content = None
+                auto_fix_applied = False
+                if auto_fix:
+                    file_content, auto_fix_applied = auto_fix_latex(file_content)
+                    if auto_fix_applied:
+                        fixed_content = file_content
+                
+                # Prefix with the index so equal filenames do not collide
+                safe_filename = sanitize_filename(filename)
+                tex_file = temp_dir / f"{index:03d}-{safe_filename}.tex"
+                validate_file_path(temp_dir, tex_file)
+                async with aiofiles.open(tex_file, 'w', encoding='utf-8') as f:
+                    await f.write(file_content)
+                
+                entry = (conversion_id, filename, tex_file, cache_key, auto_fix_applied, fixed_content)
+                pdf_file = tex_file.with_suffix('.pdf')
+                cached = None
+                if cache_key:
+                    cached = await asyncio.to_thread(compile_cache.fetch, cache_key, pdf_file)
+                if cached is not None:
+                    logger.info(f"Compile cache hit for conversion {conversion_id}")
+                    finished[index] = (entry, True, cached["errors"], cached["warnings"])
+                    continue
+                
+                if PREFLIGHT_ENABLED:
+                    preflight_errors, preflight_warnings = await asyncio.to_thread(
+                        lint_latex_content, file_content, temp_dir
+                    )
+                    if preflight_errors:
+                        logger.info(f"Pre-flight check rejected conversion {conversion_id}")
+                        finished[index] = (entry, False, preflight_errors, preflight_warnings)
+                        continue
+                pending.append((index, entry))
+            
+            if pending:
+                compiled = await compile_pool.run(
+                    compile_latex_batch,
+                    [str(entry[2]) for _, entry in pending],
+                    True,
+                    LATEX_TIMEOUT,
+                    LATEX_MAX_ERRORS or None,
+                    LATEX_LIMITS
+                )
+                for index, entry in pending:
+                    tex_file, cache_key = entry[2], entry[3]
+                    result = compiled[str(tex_file)]
+                    success = result["success"]
+                    if result["log_path"]:
+                        errors, warnings = await LatexService._read_log(Path(result["log_path"]))
+                    else:
+                        errors, warnings = list(result["errors"]), list(result["warnings"])
+                    
+                    if not success:
+                        if not errors:
+                            errors = [f"LaTeX compilation failed with return code {result['returncode']}"]
+                    elif cache_key:
+                        await asyncio.to_thread(
+                            compile_cache.put, cache_key, tex_file.with_suffix('.pdf'), errors, warnings
+                        )
+                    finished[index] = (entry, success, errors, warnings)
+            
+            results = []
+            for index in sorted(finished):
+                entry, success, errors, warnings = finished[index]
+                conversion_id, filename, tex_file, _, auto_fix_applied, fixed_content = entry
+                results.append(await LatexService._store_result(
+                    conversion_id, filename, success, tex_file.with_suffix('.pdf'),
+                    errors, warnings, auto_fix_applied, fixed_content
+                ))
+            return results
+        
+        except CompilePoolFull:
+            logger.warning("Compile pool full, rejecting batch conversion")
+            raise HTTPException(
+                status_code=503,
+                detail="The server is busy compiling other documents. Please retry shortly.",
+                headers={"Retry-After": "5"}
+            )
+        except ValueError as e:
+            logger.warning(f"Security validation error in batch conversion: {str(e)}")
+            raise HTTPException(status_code=400, detail=f"Invalid file: {str(e)}")
+        except Exception as e:
+            logger.error(f"Unexpected error processing LaTeX batch: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail="An error occurred during processing. Please try again or contact support."
+            )
+        finally:
+            # Recycle the workspace; clearing happens off the request path
+            workspace_pool.release(temp_dir)
 
 
 class AudioService:
@@ -160,9 +442,8 @@ class AudioService:
         """Process audio file and convert to target format"""
         conversion_id = str(uuid.uuid4())
         
-        # Create temporary directory for this conversion
-        temp_dir = TEMP_DIR / conversion_id
-        temp_dir.mkdir(exist_ok=True)
+        # Take a scratch directory for this conversion
+        temp_dir = workspace_pool.acquire()
         
         try:
             # Sanitize filename to prevent path traversal
@@ -179,7 +460,7 @@ class AudioService:
                 await f.write(file_content)
             
             # Initialize audio converter
-            converter = AudioConverter()
+            converter = AudioConverter(limits=FFMPEG_LIMITS)
             
             # Get audio info before conversion
             audio_info = converter.get_audio_info(input_file)
@@ -234,7 +515,13 @@ class AudioService:
             await db.audio_conversions.insert_one(result_obj.dict())
             
             return result_obj
-                
+        
+        except ResourceLimitExceeded as e:
+            logger.warning(f"ffmpeg hit its {e.limit} limit for audio conversion {conversion_id}")
+            raise HTTPException(
+                status_code=422,
+                detail=f"Audio conversion was stopped: {e}. The file may be too large or malformed."
+            )
         except ValueError as e:
             # Security-related errors (path traversal, invalid filename)
             logger.warning(f"Security validation error for audio conversion {conversion_id}: {str(e)}")
@@ -257,26 +544,5 @@ class AudioService:
                 detail="An error occurred during audio processing. Please try again or contact support."
             )
         finally:
-            # Clean up temporary directory with retry logic
-            max_retries = 3
-            retry_delay = 0.1
-            
-            for attempt in range(max_retries):
-                try:
-                    if temp_dir.exists():
-                        shutil.rmtree(temp_dir)
-                    break
-                except PermissionError as e:
-                    if attempt < max_retries - 1:
-                        time.sleep(retry_delay * (attempt + 1))
-                        logger.warning(
-                            f"Retry {attempt + 1}/{max_retries} cleaning up {temp_dir}: {e}"
-                        )
-                    else:
-                        logger.error(f"Failed to clean up {temp_dir} after {max_retries} attempts: {e}")
-                except Exception as e:
-                    logger.error(
-                        f"Error cleaning up temporary directory {temp_dir}: {e}",
-                        exc_info=True
-                    )
-                    break
\ No newline at end of file
+            # Recycle the workspace; clearing happens off the request path
+            workspace_pool.release(temp_dir)
@@ -33,7 +33,8 @@ class ConversionBusinessLogic:
         file_content: str,
         filename: str,
         auto_fix: bool,
-        max_file_size: int
+        max_file_size: int,
+        session_id: Optional[str] = None
     ) -> ConversionResult:
         """
         Convert LaTeX file to PDF.
@@ -43,6 +44,8 @@ class ConversionBusinessLogic:
             filename: Name of the file (without extension)
             auto_fix: Whether to auto-fix common LaTeX errors
             max_file_size: Maximum allowed file size
+            session_id: Optional compile session that keeps auxiliary files
+                warm between recompiles of the same document
         
         Returns:
             ConversionResult: Result of the conversion
@@ -62,7 +65,7 @@ class ConversionBusinessLogic:
         # Process conversion
         try:
             result = await LatexService.process_latex_file(
-                file_content, filename, auto_fix
+                file_content, filename, auto_fix, session_id
             )
             return result
         except HTTPException:
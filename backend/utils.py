@@ -1,29 +1,9 @@
 """
-Utility functions for LaTeX processing and error handling.
-"""
-from typing import List, Tuple
+Utility functions for LaTeX processing.
 
-def parse_latex_errors(log_content: str) -> Tuple[List[str], List[str]]:
-    """Parse LaTeX log file to extract errors and warnings"""
-    errors = []
-    warnings = []
-    
-    lines = log_content.split('\n')
-    for i, line in enumerate(lines):
-        if line.startswith('!') and 'Error' in line:
-            error_msg = line
-            # Try to get the next few lines for more context
-            for j in range(i + 1, min(i + 3, len(lines))):
-                if lines[j].strip() and not lines[j].startswith('l.'):
-                    error_msg += " " + lines[j].strip()
-                if lines[j].startswith('l.'):
-                    error_msg += " " + lines[j].strip()
-                    break
-            errors.append(error_msg)
-        elif 'Warning' in line and not line.startswith('('):
-            warnings.append(line.strip())
-    
-    return errors, warnings
+pdflatex logs are parsed by core.latex_log.
+"""
+from typing import Tuple
 
 def auto_fix_latex(content: str) -> Tuple[str, bool]:
     """Apply basic auto-fixes to LaTeX content"""
@@ -0,0 +1,104 @@
+"""
+Bounded worker pool for blocking compile jobs.
+
+pdflatex runs are blocking subprocess calls. Running them directly inside an
+``async def`` handler stalls the event loop for the whole compile, so they are
+handed to a dedicated thread pool instead. At most ``max_workers`` jobs run at
+once and at most ``max_queue`` more wait for a slot; anything beyond that is
+rejected straight away so callers can answer with 503 instead of piling up.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from config import COMPILE_QUEUE_LIMIT, COMPILE_WORKERS
+
+logger = logging.getLogger(__name__)
+
+
+class CompilePoolFull(Exception):
+    """Raised when the compile pool has no free slot or queue space."""
+
+
+class CompilePool:
+    """Runs blocking jobs off the event loop with bounded concurrency."""
+    
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = 0):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="compile"
+        )
+        # Jobs are counted from submission until their thread finishes, even
+        # if the awaiting request is cancelled in the meantime
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+    
+    @property
+    def queue_depth(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        with self._lock:
+            return self._pending - self._running
+    
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable in the pool and await its result.
+        
+        Raises:
+            CompilePoolFull: If all workers are busy and the queue is full
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                logger.warning(
+                    f"Compile pool full ({self._running} running, "
+                    f"{self._pending - self._running} queued)"
+                )
+                raise CompilePoolFull("Too many concurrent compilations")
+            self._pending += 1
+        
+        future = self._executor.submit(self._job, func, args, kwargs)
+        future.add_done_callback(self._finish)
+        return await asyncio.wrap_future(future)
+    
+    def _job(self, func: Callable[..., Any], args, kwargs) -> Any:
+        with self._lock:
+            self._running += 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+    
+    def _finish(self, future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+    
+    def stats(self) -> Dict[str, int]:
+        """Return current load figures for monitoring."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+    
+    def shutdown(self) -> None:
+        """Stop accepting work and wait for running jobs."""
+        self._executor.shutdown(wait=True)
+
+
+# Shared by every route that compiles documents
+compile_pool = CompilePool(max_workers=COMPILE_WORKERS, max_queue=COMPILE_QUEUE_LIMIT)
@@ -0,0 +1,248 @@
+"""
+Warm compile sessions for clients that recompile the same document.
+
+An editor integration resubmits one document many times while its author
+fixes errors. A normal conversion gets a freshly cleared workspace, so every
+compile starts without an .aux file and references need extra passes. A
+session keeps its own working directory. The .aux, .toc and .out files from
+the last compile are still there on the next one, so a single pdflatex pass
+is usually enough.
+
+Session ids are generated by the server and are unguessable, so two clients
+never share a working directory by picking the same id.
+
+Sessions expire after an idle TTL. A background sweep removes expired ones
+even when no requests arrive. When there are too many sessions, they use too
+much space, or the filesystem (RAM, when it is tmpfs) runs low, the least
+recently used idle sessions are evicted first.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+from config import (
+    COMPILE_SESSION_DIR,
+    COMPILE_SESSION_MAX,
+    COMPILE_SESSION_MAX_BYTES,
+    COMPILE_SESSION_MIN_FREE_BYTES,
+    COMPILE_SESSION_SWEEP_INTERVAL,
+    COMPILE_SESSION_TTL,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SessionNotFound(Exception):
+    """Raised when a session id was not issued by this server or has expired."""
+
+
+class _Session:
+    """A session's directory and bookkeeping."""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.last_used = time.monotonic()
+        self.in_use = 0
+        self.lock = asyncio.Lock()
+
+
+class CompileSessionStore:
+    """Keeps per-session working directories warm between compiles."""
+    
+    def __init__(
+        self,
+        root: Path,
+        ttl: float,
+        max_sessions: int,
+        max_bytes: int,
+        min_free_bytes: int = 0,
+        sweep_interval: float = 60
+    ):
+        self.root = Path(root)
+        self.ttl = ttl
+        self.max_sessions = max(max_sessions, 1)
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self.sweep_interval = sweep_interval
+        
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, _Session] = {}
+        self._evictions = 0
+        self._cleaner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-cleanup")
+        self._stop_sweeping = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+        
+        # Sessions do not survive a restart
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+    
+    def create(self) -> str:
+        """Start a session and return its id."""
+        session_id = secrets.token_urlsafe(24)
+        # Hash the id so it never forms part of a path
+        name = hashlib.sha256(session_id.encode("utf-8")).hexdigest()[:32]
+        session = _Session(self.root / name)
+        session.path.mkdir()
+        with self._lock:
+            self._sessions[session_id] = session
+        self._cleaner.submit(self.evict)
+        return session_id
+    
+    @asynccontextmanager
+    async def use(self, session_id: str) -> AsyncIterator[Path]:
+        """
+        Use a session's working directory.
+        
+        Compiles within one session are serialised. Raises SessionNotFound
+        for ids that were not created here or have expired.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                raise SessionNotFound(session_id)
+            session.in_use += 1
+        
+        try:
+            async with session.lock:
+                yield session.path
+        finally:
+            with self._lock:
+                session.in_use -= 1
+                session.last_used = time.monotonic()
+            self._cleaner.submit(self.evict)
+    
+    def close(self, session_id: str) -> bool:
+        """End a session and remove its directory; returns False if unknown."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session.in_use:
+                return False
+            del self._sessions[session_id]
+            detached = _detach(session.path)
+        self._cleaner.submit(shutil.rmtree, detached, True)
+        return True
+    
+    def evict(self) -> None:
+        """Drop expired sessions, then idle ones until the limits are met."""
+        now = time.monotonic()
+        with self._lock:
+            idle = sorted(
+                ((session.last_used, session_id, session)
+                 for session_id, session in self._sessions.items() if not session.in_use),
+                key=lambda item: item[0]
+            )
+            count = len(self._sessions)
+        
+        sizes = {session_id: _directory_size(session.path) for _, session_id, session in idle}
+        total = sum(sizes.values())
+        
+        for last_used, session_id, session in idle:
+            expired = now - last_used > self.ttl
+            pressure = (
+                count > self.max_sessions
+                or total > self.max_bytes
+                or _free_bytes(self.root) < self.min_free_bytes
+            )
+            if not (expired or pressure):
+                # Sorted by last use, so the rest are newer
+                break
+            
+            with self._lock:
+                if session.in_use or self._sessions.get(session_id) is not session:
+                    continue
+                del self._sessions[session_id]
+                self._evictions += 1
+                detached = _detach(session.path)
+            shutil.rmtree(detached, ignore_errors=True)
+            count -= 1
+            total -= sizes[session_id]
+            logger.info(f"Evicted compile session {session.path.name} ({'expired' if expired else 'pressure'})")
+    
+    def stats(self) -> Dict[str, int]:
+        """Return session figures for monitoring."""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "active": sum(1 for session in self._sessions.values() if session.in_use),
+                "evictions": self._evictions,
+            }
+    
+    def start_sweeper(self) -> None:
+        """Evict expired sessions every sweep_interval seconds, even without traffic."""
+        if self._sweeper is not None or self.sweep_interval <= 0:
+            return
+        self._stop_sweeping.clear()
+        self._sweeper = threading.Thread(target=self._sweep, name="session-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def _sweep(self) -> None:
+        while not self._stop_sweeping.wait(self.sweep_interval):
+            try:
+                self.evict()
+            except Exception as e:
+                logger.warning(f"Compile session sweep failed: {e}")
+    
+    def shutdown(self) -> None:
+        """Stop the sweeper and finish pending cleanups."""
+        self._stop_sweeping.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        self._cleaner.shutdown(wait=True)
+
+
+def _directory_size(path: Path) -> int:
+    """Total size of the files in a session directory."""
+    total = 0
+    for file in path.rglob("*"):
+        try:
+            if file.is_file():
+                total += file.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+def _free_bytes(path: Path) -> float:
+    """Free space on the filesystem holding path (infinite if unknown)."""
+    try:
+        return shutil.disk_usage(path).free
+    except OSError:
+        return float("inf")
+
+
+def _detach(path: Path) -> Path:
+    """
+    Move a session directory out of the way so it can be removed at leisure.
+    
+    A new session with the same id gets a fresh directory, even while the old
+    one is still being deleted.
+    """
+    detached = path.with_name(f"evicted-{uuid.uuid4().hex}")
+    try:
+        os.rename(path, detached)
+    except OSError:
+        return path
+    return detached
+
+
+# Used by LatexService for conversions that pass a session id
+compile_sessions = CompileSessionStore(
+    COMPILE_SESSION_DIR,
+    COMPILE_SESSION_TTL,
+    COMPILE_SESSION_MAX,
+    COMPILE_SESSION_MAX_BYTES,
+    COMPILE_SESSION_MIN_FREE_BYTES,
+    COMPILE_SESSION_SWEEP_INTERVAL,
+)
@@ -0,0 +1,123 @@
+"""
+Pool of reusable scratch directories for conversions.
+
+Creating a fresh ``TEMP_DIR / conversion_id`` for every request and
+``rmtree``-ing it afterwards costs a directory create/delete per request and
+blocks the request while files are removed. Instead, a fixed set of
+workspace directories is created up front, optionally on a RAM-backed mount
+such as ``/dev/shm``. Each one is handed to a single job at a time, and on
+release it is emptied by a background thread before going back to the pool.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Deque, Dict
+
+from config import WORKSPACE_DIR, WORKSPACE_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class WorkspacePool:
+    """Hands out empty scratch directories and recycles them after use."""
+    
+    def __init__(self, root: Path, size: int):
+        self.root = Path(root)
+        self.size = max(size, 1)
+        self.root.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._free: Deque[Path] = deque()
+        self._in_use = 0
+        self._cleaner = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workspace-cleanup")
+        
+        # Directories left over from a previous run are cleared before reuse
+        for index in range(self.size):
+            path = self.root / f"ws-{index}"
+            if path.exists():
+                self._in_use += 1
+                self.release(path)
+            else:
+                path.mkdir()
+                self._free.append(path)
+    
+    def acquire(self) -> Path:
+        """
+        Take an empty workspace directory for exclusive use.
+        
+        When every pooled directory is busy or still being cleared, an
+        overflow directory is created; it is removed again on release.
+        """
+        with self._lock:
+            self._in_use += 1
+            if self._free:
+                return self._free.pop()
+        
+        path = self.root / f"overflow-{uuid.uuid4().hex}"
+        path.mkdir()
+        return path
+    
+    def release(self, path: Path) -> None:
+        """Return a workspace; it is emptied off the request path."""
+        self._cleaner.submit(self._recycle, Path(path))
+    
+    def _recycle(self, path: Path) -> None:
+        pooled = path.name.startswith("ws-")
+        try:
+            if pooled:
+                _clear_directory(path)
+            else:
+                shutil.rmtree(path)
+        except OSError as e:
+            # A file still held open elsewhere; replace the directory so the
+            # pool never hands out a dirty workspace
+            logger.warning(f"Could not clear workspace {path}: {e}")
+            if pooled:
+                pooled = _replace_directory(path)
+        
+        with self._lock:
+            self._in_use -= 1
+            if pooled:
+                self._free.append(path)
+    
+    def stats(self) -> Dict[str, int]:
+        """Return pool usage figures for monitoring."""
+        with self._lock:
+            return {"size": self.size, "free": len(self._free), "in_use": self._in_use}
+    
+    def shutdown(self) -> None:
+        """Finish pending cleanups."""
+        self._cleaner.shutdown(wait=True)
+
+
+def _clear_directory(path: Path) -> None:
+    """Remove a directory's contents while keeping the directory itself."""
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
+
+def _replace_directory(path: Path) -> bool:
+    """Swap a directory for a fresh empty one, returning False on failure."""
+    stale = path.with_name(f"stale-{uuid.uuid4().hex}")
+    try:
+        os.rename(path, stale)
+        path.mkdir()
+    except OSError as e:
+        logger.error(f"Dropping workspace {path} from the pool: {e}")
+        return False
+    shutil.rmtree(stale, ignore_errors=True)
+    return True
+
+
+# Shared by the LaTeX and audio services
+workspace_pool = WorkspacePool(WORKSPACE_DIR, WORKSPACE_POOL_SIZE)
@@ -51,6 +51,28 @@ def main():
         default="pdf",
         help="Output format (default: pdf)"
     )
+    parser.add_argument(
+        "--engine",
+        choices=["latex", "direct", "auto"],
+        default="latex",
+        help="PDF engine for Markdown: LaTeX, the built-in renderer for simple "
+             "documents, or auto to use the built-in renderer when possible (default: latex)"
+    )
+    parser.add_argument(
+        "--listings",
+        choices=["listings", "highlight", "verbatim", "auto"],
+        default="auto",
+        help="How code blocks are typeset in LaTeX: the listings package, "
+             "pre-highlighted verbatim, plain verbatim, or auto to pick by "
+             "block length (default: auto)"
+    )
+    parser.add_argument(
+        "--image-dpi",
+        type=int,
+        default=None,
+        help="Downsample images in Markdown conversions to this resolution at "
+             "their printed size (default: keep full resolution)"
+    )
     parser.add_argument(
         "--skip-pdf",
         action="store_true",
@@ -88,8 +110,8 @@ def main():
     # Validate input files
     input_paths = [validate_file(f) for f in args.input_files]
     
-    # Check for pdflatex if we're generating PDFs
-    if not args.skip_pdf and args.format == "pdf":
+    # Check for pdflatex if we're generating PDFs with it
+    if not args.skip_pdf and args.format == "pdf" and args.engine == "latex":
         if not check_pdflatex_installed():
             print("Error: pdflatex is not installed or not in the system path.")
             print("Please install a LaTeX distribution like TeX Live, MiKTeX, or MacTeX.")
@@ -153,7 +175,12 @@ def main():
             return
         
         # Single file processing
-        converter = DocumentConverter(output_dir=output_dir)
+        converter = DocumentConverter(
+            output_dir=output_dir,
+            pdf_engine=args.engine,
+            listing_strategy=args.listings,
+            image_dpi=args.image_dpi
+        )
         input_path = input_paths[0]
         
         # Handle image files
@@ -194,7 +221,7 @@ def main():
                 with open(input_path, 'r', encoding='utf-8') as f:
                     markdown_content = f.read()
                 from xtox.core import convert_markdown_to_latex
-                convert_markdown_to_latex(markdown_content, str(latex_path))
+                convert_markdown_to_latex(markdown_content, str(latex_path), listing_strategy=args.listings)
                 print(f"Success! LaTeX file generated: {latex_path}")
             else:
                 # Convert to PDF
@@ -204,8 +231,11 @@ def main():
                     args.refinement
                 )
                 print(f"\nSuccess! Files generated:")
-                print(f"  LaTeX: {result['latex_path']}")
+                if 'latex_path' in result:
+                    print(f"  LaTeX: {result['latex_path']}")
                 print(f"  PDF: {result['pdf_path']}")
+                if args.verbose:
+                    print(f"  Engine: {result['engine']}")
                 if result['images']:
                     print(f"  Images: {len(result['images'])} files copied")
         
@@ -2,24 +2,54 @@
 Core conversion functionality for xtotext.
 """
 
-from .markdown_to_latex import convert_markdown_to_latex
+from .markdown_ast import parse_markdown, iter_blocks
+from .markdown_to_latex import (
+    convert_markdown_to_latex,
+    convert_markdown_to_latex_stream,
+    convert_markdown_file_to_latex,
+)
 from .markdown_to_docx import convert_markdown_to_docx
 from .markdown_to_html import convert_markdown_to_html
+from .markdown_to_pdf import convert_markdown_to_pdf
 from .html_to_markdown import convert_html_to_markdown
-from .latex_to_pdf import latex_to_pdf, fix_latex_structure, check_latex_structure
+from .latex_to_pdf import (
+    latex_to_pdf,
+    latex_content_to_pdf,
+    fix_latex_structure,
+    fix_latex_content,
+    check_latex_structure,
+    check_latex_content,
+)
+from .latex_lint import lint_latex_content, lint_latex_file
+from .latex_log import parse_latex_log, parse_latex_log_file
+from .tex_index import find_tex_file, is_tex_file_installed
 from .document_converter import DocumentConverter
 from .image_converter import ImageConverter
 from .multi_document_processor import MultiDocumentProcessor
 from .interactive_processor import InteractiveProcessor
 
 __all__ = [
+    "parse_markdown",
+    "iter_blocks",
     "convert_markdown_to_latex",
+    "convert_markdown_to_latex_stream",
+    "convert_markdown_file_to_latex",
     "convert_markdown_to_docx",
     "convert_markdown_to_html",
+    "convert_markdown_to_pdf",
     "convert_html_to_markdown",
     "latex_to_pdf", 
+    "latex_content_to_pdf",
     "fix_latex_structure",
+    "fix_latex_content",
     "check_latex_structure",
+    "check_latex_content",
+    "lint_latex_content",
+    "lint_latex_file",
+    "parse_latex_log",
+    "parse_latex_log_file",
+    "find_tex_file",
+    "is_tex_file_installed",
     "DocumentConverter",
     "ImageConverter",
     "MultiDocumentProcessor",
@@ -13,6 +13,11 @@ try:
 except ImportError:
     PYDUB_AVAILABLE = False
 
+try:
+    from .sandbox import ResourceLimitExceeded, ResourceLimits, exceeded_limit, limited_command
+except ImportError:
+    from sandbox import ResourceLimitExceeded, ResourceLimits, exceeded_limit, limited_command
+
 
 class AudioConverter:
     """Handle audio format conversion, especially WhatsApp OGG Opus files."""
@@ -36,7 +41,12 @@ class AudioConverter:
         'flac': 'FLAC'
     }
     
-    def __init__(self):
+    def __init__(self, limits: Optional[ResourceLimits] = None):
+        """
+        Args:
+            limits: Resource limits for ffmpeg conversions (see sandbox)
+        """
+        self.limits = limits
         self._check_ffmpeg()
     
     def _check_ffmpeg(self):
@@ -141,12 +151,15 @@ class AudioConverter:
         
         # Run ffmpeg
         result = subprocess.run(
-            cmd,
+            limited_command(cmd, self.limits),
             capture_output=True,
             text=True,
             timeout=60
         )
         
+        limit = exceeded_limit(self.limits, result.returncode, result.stderr or "")
+        if limit:
+            raise ResourceLimitExceeded(limit)
         if result.returncode != 0:
             error_msg = result.stderr or result.stdout
             raise RuntimeError(f"FFmpeg conversion failed: {error_msg}")
@@ -0,0 +1,401 @@
+"""
+Batch compilation of many small LaTeX documents in one pdflatex run.
+
+For one- and two-page documents, starting pdflatex and loading packages
+cost more than the typesetting itself. Documents that share a preamble are
+therefore concatenated into a single job. Each document starts on a fresh
+page with its counters reset and is typeset inside its own group, so local
+declarations such as ``\\Large`` or ``\\color`` end with it. The page count
+of each one is written to the log. The combined PDF is then split back into
+one PDF per document.
+
+Errors and warnings in the combined log are mapped back to the document
+and line they came from. Documents with errors are recompiled on their own, so their
+output and log are exactly what a single compile would give. If the
+combined run cannot be split reliably, every document is compiled on its
+own.
+"""
+
+import os
+import re
+import subprocess
+import tempfile
+from dataclasses import replace
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .latex_format import find_format_for_content
+from .latex_log import (
+    INPUT_LINE_PATTERN, SEVERITY_ERROR, SEVERITY_WARNING, LatexLogParser, parse_latex_log,
+    summarize_diagnostics
+)
+from .latex_to_pdf import CROSS_REFERENCE_PATTERN, run_pdflatex
+from .pdf_tools import PYPDF_AVAILABLE, split_pdf
+from .sandbox import ResourceLimitExceeded, ResourceLimits
+
+# Only documents up to this size are worth batching
+BATCH_MAX_BYTES = 64 * 1024
+BATCH_MAX_DOCUMENTS = 50
+
+# Bodies that reference labels, build lists or change definitions, layout
+# or anything else a group does not undo cannot share a run with other
+# documents
+BATCH_UNSAFE_PATTERN = re.compile(
+    r"\\(?:label|tableofcontents|listoffigures|listoftables|(?:re)?newcommand|"
+    r"(?:re)?newenvironment|def|gdef|edef|xdef|let|global|makeatletter|setlength|"
+    r"setcounter|addtocounter|pagestyle|pagenumbering|newgeometry|restoregeometry|"
+    r"pagecolor|input|include)\b"
+)
+BATCH_PAGES_PATTERN = re.compile(r"XTOX-BATCH-PAGES=(\d+):(\d+)")
+
+# Counters that restart with every document
+RESET_COUNTERS = ("page", "section", "subsection", "subsubsection", "figure",
+                  "table", "equation", "footnote")
+
+# \maketitle clears the title and redefines itself after its first use;
+# keep the preamble's values so every document can use them again
+TITLE_SAVE = (
+    "\\makeatletter\n"
+    "\\let\\xtox@maketitle\\maketitle\\let\\xtox@title\\@title"
+    "\\let\\xtox@author\\@author\\let\\xtox@date\\@date\\let\\xtox@thanks\\@thanks\n"
+    "\\makeatother\n"
+)
+TITLE_RESTORE = (
+    "\\makeatletter\n"
+    "\\global\\let\\maketitle\\xtox@maketitle\\global\\let\\@title\\xtox@title"
+    "\\global\\let\\@author\\xtox@author\\global\\let\\@date\\xtox@date"
+    "\\global\\let\\@thanks\\xtox@thanks\n"
+    "\\makeatother\n"
+)
+
+
+def split_document(content: str) -> Optional[Tuple[str, str]]:
+    """
+    Split LaTeX content into its preamble and body.
+    
+    The preamble runs through the ``\\begin{document}`` line and the body
+    up to ``\\end{document}``. Returns None for incomplete documents.
+    """
+    begin = content.find("\\begin{document}")
+    end = content.rfind("\\end{document}")
+    if begin == -1 or end == -1:
+        return None
+    body_start = content.find("\n", begin) + 1
+    if body_start == 0 or body_start > end:
+        return None
+    return content[:body_start], content[body_start:end]
+
+
+def can_batch(content: str) -> bool:
+    """Check whether a document may share a pdflatex run with others."""
+    if len(content.encode("utf-8")) > BATCH_MAX_BYTES:
+        return False
+    parts = split_document(content)
+    if parts is None:
+        return False
+    _, body = parts
+    return not (CROSS_REFERENCE_PATTERN.search(body) or BATCH_UNSAFE_PATTERN.search(body))
+
+
+def group_documents(documents: Dict[str, str]) -> Tuple[List[List[str]], List[str]]:
+    """
+    Group documents that can be compiled together.
+    
+    Args:
+        documents: Content keyed by .tex path
+    
+    Returns:
+        ``(groups, singles)``: lists of paths sharing a preamble and
+        directory, and paths that must be compiled on their own
+    """
+    buckets: Dict[Tuple[str, str], List[str]] = {}
+    singles: List[str] = []
+    for path, content in documents.items():
+        if not can_batch(content):
+            singles.append(path)
+            continue
+        preamble, _ = split_document(content)
+        key = (preamble.strip(), str(Path(path).resolve().parent))
+        buckets.setdefault(key, []).append(path)
+    
+    groups: List[List[str]] = []
+    for paths in buckets.values():
+        for start in range(0, len(paths), BATCH_MAX_DOCUMENTS):
+            chunk = paths[start:start + BATCH_MAX_DOCUMENTS]
+            if len(chunk) > 1:
+                groups.append(chunk)
+            else:
+                singles.extend(chunk)
+    return groups, singles
+
+
+def build_batch_source(preamble: str, bodies: Sequence[str]) -> Tuple[str, List[Tuple[int, int, int]]]:
+    """
+    Concatenate document bodies under one preamble.
+    
+    Each body is wrapped in ``\\begingroup``...``\\endgroup`` so that its
+    local declarations do not reach the next one. Returns the combined
+    source and, per body, ``(first, last, offset)``: the 1-based line range
+    it occupies in the combined file and the number to subtract to get the
+    line in the original document.
+    """
+    preamble_lines = preamble.count("\n")
+    parts = [preamble, TITLE_SAVE]
+    line = preamble_lines + TITLE_SAVE.count("\n")
+    spans = []
+    
+    for index, body in enumerate(bodies):
+        if not body.endswith("\n"):
+            body += "\n"
+        header = "\\clearpage\n"
+        if index:
+            header += f"\\typeout{{XTOX-BATCH-PAGES={index - 1}:\\the\\numexpr\\value{{page}}-1\\relax}}\n"
+        header += TITLE_RESTORE
+        header += ''.join(f"\\setcounter{{{name}}}{{{1 if name == 'page' else 0}}}" for name in RESET_COUNTERS)
+        # Distinct hyperref anchor names, so bookmarks point into the right document
+        header += ''.join(
+            f"\\def\\theH{name}{{{index}.\\arabic{{{name}}}}}"
+            for name in ("section", "figure", "table", "equation")
+        )
+        header += "\n\\begingroup\n"
+        parts.append(header)
+        line += header.count("\n")
+        
+        body_lines = body.count("\n")
+        spans.append((line + 1, line + body_lines, line - preamble_lines))
+        # Flush floats while the body's settings are still in effect
+        parts.append(body)
+        parts.append("\\clearpage\\endgroup\n")
+        line += body_lines + 1
+    
+    parts.append(
+        f"\\typeout{{XTOX-BATCH-PAGES={len(bodies) - 1}:\\the\\numexpr\\value{{page}}-1\\relax}}\n"
+        "\\end{document}\n"
+    )
+    return ''.join(parts), spans
+
+
+def attribute_errors(output: str, spans: Sequence[Tuple[int, int, int]]) -> Optional[Dict[int, List[str]]]:
+    """
+    Map errors in a combined pdflatex log to the documents they came from.
+    
+    Returns messages keyed by body index, with line numbers of the original
+    document, or None if any error lies outside every body.
+    """
+    attributed: Dict[int, List[str]] = {}
+    for diagnostic in parse_latex_log(output):
+        if diagnostic.severity != SEVERITY_ERROR:
+            continue
+        if diagnostic.line is None:
+            return None
+        for index, (first, last, offset) in enumerate(spans):
+            if first <= diagnostic.line <= last:
+                local = replace(diagnostic, line=diagnostic.line - offset)
+                attributed.setdefault(index, []).append(str(local))
+                break
+        else:
+            return None
+    return attributed
+
+
+def attribute_warnings(output: str, spans: Sequence[Tuple[int, int, int]]) -> Dict[int, List[str]]:
+    """
+    Map warnings in a combined pdflatex log to the documents they came from.
+    
+    A warning naming an input line inside a body belongs to that document,
+    with the line rewritten to the original document's. Other warnings
+    belong to the document being typeset when they were written, as the
+    page-count markers in the log show. Warnings from the shared preamble
+    or the end of the run apply to every document, since each of them
+    would get the same warning on its own.
+    """
+    attributed: Dict[int, List[str]] = {index: [] for index in range(len(spans))}
+    
+    def assign(warnings, current: Optional[int]) -> None:
+        for diagnostic in warnings:
+            if diagnostic.severity != SEVERITY_WARNING:
+                continue
+            message = diagnostic.message
+            index = current
+            if diagnostic.line is not None:
+                index = None
+                for body, (first, last, offset) in enumerate(spans):
+                    if first <= diagnostic.line <= last:
+                        index = body
+                        number = INPUT_LINE_PATTERN.search(message)
+                        if number:
+                            message = (message[:number.start(1)] + str(diagnostic.line - offset)
+                                       + message[number.end(1):])
+                        break
+            for body in attributed if index is None else [index]:
+                attributed[body].append(message)
+    
+    parser = LatexLogParser()
+    # Body n is typeset between marker n - 1 and marker n
+    current: Optional[int] = 0
+    for line in output.splitlines(True):
+        assign(parser.feed(line), current)
+        marker = BATCH_PAGES_PATTERN.search(line)
+        if marker:
+            following = int(marker.group(1)) + 1
+            current = following if following < len(spans) else None
+    assign(parser.close(), current)
+    return attributed
+
+
+def read_page_counts(output: str, count: int) -> Optional[List[int]]:
+    """Read the per-document page counts written by the combined run."""
+    pages = {int(index): int(value) for index, value in BATCH_PAGES_PATTERN.findall(output)}
+    if sorted(pages) != list(range(count)):
+        return None
+    return [pages[index] for index in range(count)]
+
+
+def _scale_limits(limits: Optional[ResourceLimits], count: int) -> Optional[ResourceLimits]:
+    """Limits for a combined run of count documents."""
+    if not limits or not limits.cpu_seconds:
+        return limits
+    return replace(limits, cpu_seconds=limits.cpu_seconds * count)
+
+
+def _compile_single(tex_path: str, use_format: bool, timeout: Optional[float],
+                    max_errors: Optional[int] = None,
+                    limits: Optional[ResourceLimits] = None) -> dict:
+    """Compile one document on its own."""
+    content = Path(tex_path).read_text(encoding="utf-8", errors="replace")
+    format_path = find_format_for_content(content, None, timeout, limits) if use_format else None
+    pdf_path = Path(tex_path).with_suffix(".pdf")
+    try:
+        result = run_pdflatex(tex_path, format_path, timeout=timeout,
+                              max_errors=max_errors, limits=limits)
+    except ResourceLimitExceeded as e:
+        return {
+            "success": False,
+            "pdf_path": None,
+            "errors": [str(e)],
+            "warnings": [],
+            "batched": False,
+            "log_path": None,
+            "returncode": None,
+            "limit": e.limit,
+        }
+    success = result["success"] and pdf_path.is_file()
+    errors, warnings = summarize_diagnostics(result["diagnostics"])
+    return {
+        "success": success,
+        "pdf_path": str(pdf_path) if success else None,
+        "errors": errors,
+        "warnings": warnings,
+        "batched": False,
+        # The log of a run that was stopped early is cut off
+        "log_path": None if result["aborted"] else str(pdf_path.with_suffix(".log")),
+        "returncode": result["returncode"],
+        "limit": None,
+    }
+
+
+def _compile_group(paths: List[str], documents: Dict[str, str], use_format: bool,
+                   timeout: Optional[float], max_errors: Optional[int] = None,
+                   limits: Optional[ResourceLimits] = None) -> Dict[str, dict]:
+    """Compile a group of same-preamble documents in one run."""
+    preamble, _ = split_document(documents[paths[0]])
+    bodies = [split_document(documents[path])[1] for path in paths]
+    source, spans = build_batch_source(preamble, bodies)
+    
+    work_dir = Path(paths[0]).resolve().parent
+    results: Dict[str, dict] = {}
+    with tempfile.TemporaryDirectory(prefix="xtox-batch-", dir=work_dir) as batch_dir:
+        batch_tex = Path(batch_dir) / "batch.tex"
+        batch_tex.write_text(source, encoding="utf-8")
+        
+        # Relative \includegraphics paths resolve against the documents' directory
+        env = {"TEXINPUTS": f".{os.pathsep}{work_dir}{os.pathsep}"}
+        format_path = find_format_for_content(source, None, timeout, limits) if use_format else None
+        print(f"Compiling {len(paths)} documents in one pdflatex run...")
+        try:
+            result = run_pdflatex(batch_tex, format_path,
+                                  timeout=timeout * len(paths) if timeout else None, env=env,
+                                  limits=_scale_limits(limits, len(paths)))
+            output = result["stdout"]
+        except (subprocess.TimeoutExpired, ResourceLimitExceeded):
+            output = ""
+        
+        batch_pdf = batch_tex.with_suffix(".pdf")
+        pages = read_page_counts(output, len(paths))
+        attributed = attribute_errors(output, spans)
+        warnings = attribute_warnings(output, spans)
+        if not batch_pdf.is_file() or pages is None or attributed is None:
+            print("Batch run could not be split; compiling documents one by one")
+            return {path: _compile_single(path, use_format, timeout, max_errors, limits) for path in paths}
+        
+        ranges = []
+        first = 0
+        for count in pages:
+            ranges.append((first, first + count - 1))
+            first += count
+        
+        clean = [index for index in range(len(paths)) if index not in attributed and pages[index]]
+        outputs = [str(Path(paths[index]).with_suffix(".pdf")) for index in clean]
+        split_pdf(batch_pdf, [ranges[index] for index in clean], outputs)
+        for index, output in zip(clean, outputs):
+            results[paths[index]] = {
+                "success": True,
+                "pdf_path": output,
+                "errors": [],
+                "warnings": warnings[index],
+                "batched": True,
+                "log_path": None,
+                "returncode": 0,
+                "limit": None,
+            }
+    
+    # Documents with errors get their own run and their own log
+    for path in paths:
+        if path not in results:
+            results[path] = _compile_single(path, use_format, timeout, max_errors, limits)
+    return results
+
+
+def compile_latex_batch(tex_paths: Sequence, use_format: bool = True,
+                        timeout: Optional[float] = None,
+                        max_errors: Optional[int] = None,
+                        limits: Optional[ResourceLimits] = None) -> Dict[str, dict]:
+    """
+    Compile many .tex files, sharing pdflatex runs where possible.
+    
+    Each PDF is written next to its .tex file. Documents are batched when
+    pypdf is available and at least two small documents in the same
+    directory share a preamble; the rest are compiled one by one.
+    
+    Args:
+        tex_paths: .tex files to compile
+        use_format: Compile against a precompiled format when one is available
+        timeout: Per-document timeout in seconds for a pdflatex pass
+        max_errors: Stop a document's own pdflatex run after this many errors;
+            combined runs always finish so their errors can be attributed
+        limits: Per-document resource limits; combined runs get the CPU time
+            of all their documents
+    
+    Returns:
+        A dict per path with success, pdf_path, errors (``"! message l.N"``
+        strings), warnings (attributed from the combined log for batched
+        documents), batched, log_path (None for batched documents and runs
+        stopped early), returncode and limit (the resource limit the run hit,
+        or None)
+    """
+    documents = {
+        str(path): Path(path).read_text(encoding="utf-8", errors="replace")
+        for path in tex_paths
+    }
+    
+    if PYPDF_AVAILABLE:
+        groups, singles = group_documents(documents)
+    else:
+        groups, singles = [], list(documents)
+    
+    results: Dict[str, dict] = {}
+    for group in groups:
+        results.update(_compile_group(group, documents, use_format, timeout, max_errors, limits))
+    for path in singles:
+        results[path] = _compile_single(path, use_format, timeout, max_errors, limits)
+    return results
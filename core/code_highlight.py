@@ -0,0 +1,187 @@
+"""
+Syntax highlighting of code blocks ahead of pdflatex.
+
+The listings package tokenises every line of an ``lstlisting`` inside TeX,
+which dominates compile time for documents with thousands of lines of code.
+:func:`highlight_code` does the tokenising in Python with Pygments instead
+and returns the lines for a fancyvrb ``Verbatim`` environment with
+``commandchars=\\\\\\{\\}``, coloured with the ``\\XK`` (keyword), ``\\XS``
+(string) and ``\\XC`` (comment) macros defined in the LaTeX preamble.
+
+Results are cached by a hash of the block, in memory and on disk, so
+rebuilding a document does not highlight unchanged blocks again. Without
+Pygments the code is returned escaped but uncoloured.
+"""
+
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+try:
+    import pygments
+    from pygments.lexers import get_lexer_by_name
+    from pygments.lexers.special import TextLexer
+    from pygments.token import Comment, Keyword, String
+    from pygments.util import ClassNotFound
+    PYGMENTS_AVAILABLE = True
+except ImportError:
+    PYGMENTS_AVAILABLE = False
+
+HIGHLIGHT_CACHE_DIR = Path(
+    os.environ.get("XTOX_HIGHLIGHT_CACHE_DIR", Path.home() / ".cache" / "xtox" / "highlight")
+)
+
+# Blocks shorter than this are cheap to highlight again and only kept in memory
+HIGHLIGHT_DISK_CACHE_MIN_LINES = 50
+
+# Highlighted blocks kept in memory per process
+HIGHLIGHT_MEMORY_CACHE_SIZE = 256
+
+# Bump when the emitted markup changes so stale disk entries are ignored
+HIGHLIGHT_FORMAT_VERSION = "1"
+
+# Characters that would otherwise be read as commands inside the Verbatim
+VERBATIM_COMMAND_ESCAPES = str.maketrans({
+    '\\': '\\XZbs{}',
+    '{': '\\XZob{}',
+    '}': '\\XZcb{}',
+})
+
+_memory_cache: "OrderedDict[str, List[str]]" = OrderedDict()
+
+
+def highlight_cache_key(lines: Sequence[str], language: str = "") -> str:
+    """Hash a code block together with everything that affects its markup."""
+    digest = hashlib.sha256()
+    version = pygments.__version__ if PYGMENTS_AVAILABLE else "none"
+    digest.update(f"{HIGHLIGHT_FORMAT_VERSION}\0{version}\0{language}\0".encode("utf-8"))
+    for line in lines:
+        digest.update(line.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def highlight_code(
+    lines: Sequence[str],
+    language: str = "",
+    cache_dir: Optional[Path] = HIGHLIGHT_CACHE_DIR
+) -> List[str]:
+    """
+    Highlight a code block for a ``Verbatim`` environment with commandchars.
+    
+    Parameters:
+    -----------
+    lines : sequence of str
+        Source lines of the block, without line endings
+    language : str, optional
+        Language named on the code fence; unknown languages are not coloured
+    cache_dir : Path, optional
+        Directory for the on-disk cache; None keeps results in memory only
+    
+    Returns:
+    --------
+    List[str]
+        One line of LaTeX per source line
+    """
+    if not lines:
+        return []
+    if not PYGMENTS_AVAILABLE:
+        return [line.translate(VERBATIM_COMMAND_ESCAPES) for line in lines]
+    
+    key = highlight_cache_key(lines, language)
+    cached = _memory_cache.get(key)
+    if cached is not None:
+        _memory_cache.move_to_end(key)
+        return cached
+    
+    use_disk = cache_dir is not None and len(lines) >= HIGHLIGHT_DISK_CACHE_MIN_LINES
+    highlighted = _read_cached(Path(cache_dir), key) if use_disk else None
+    if highlighted is None or len(highlighted) != len(lines):
+        highlighted = _highlight(lines, language)
+        if use_disk:
+            _write_cached(Path(cache_dir), key, highlighted)
+    
+    _memory_cache[key] = highlighted
+    if len(_memory_cache) > HIGHLIGHT_MEMORY_CACHE_SIZE:
+        _memory_cache.popitem(last=False)
+    return highlighted
+
+
+def clear_highlight_cache() -> None:
+    """Forget the highlighted blocks kept in memory."""
+    _memory_cache.clear()
+
+
+def _highlight(lines: Sequence[str], language: str) -> List[str]:
+    """Tokenise a block with Pygments and wrap coloured tokens in macros."""
+    try:
+        lexer = get_lexer_by_name(language, stripnl=False, ensurenl=False) if language else None
+    except ClassNotFound:
+        lexer = None
+    if lexer is None:
+        lexer = TextLexer(stripnl=False, ensurenl=False)
+    
+    output: List[str] = []
+    # Runs of (macro, text) on the current line; neighbouring tokens with the
+    # same colour share one macro call
+    runs: List[list] = []
+    for token_type, value in lexer.get_tokens("\n".join(lines)):
+        macro = _token_macro(token_type)
+        # Macro arguments may not span lines, so each line is wrapped separately
+        for index, part in enumerate(value.split("\n")):
+            if index:
+                output.append(_render_runs(runs))
+                runs = []
+            if not part:
+                continue
+            part_macro = macro if part.strip() else None
+            if runs and runs[-1][0] == part_macro:
+                runs[-1][1] += part
+            else:
+                runs.append([part_macro, part])
+    output.append(_render_runs(runs))
+    return output
+
+
+def _render_runs(runs: List[list]) -> str:
+    """Render one line of coloured runs."""
+    parts = []
+    for macro, text in runs:
+        text = text.translate(VERBATIM_COMMAND_ESCAPES)
+        parts.append(f"\\{macro}{{{text}}}" if macro else text)
+    return ''.join(parts)
+
+
+def _token_macro(token_type) -> Optional[str]:
+    """Return the colour macro for a Pygments token type, if it has one."""
+    if token_type in Keyword:
+        return "XK"
+    if token_type in String:
+        return "XS"
+    if token_type in Comment:
+        return "XC"
+    return None
+
+
+def _read_cached(cache_dir: Path, key: str) -> Optional[List[str]]:
+    """Load a highlighted block from the disk cache."""
+    try:
+        with open(cache_dir / f"{key}.tex", "r", encoding="utf-8") as file:
+            return file.read().split("\n")
+    except OSError:
+        return None
+
+
+def _write_cached(cache_dir: Path, key: str, highlighted: List[str]) -> None:
+    """Store a highlighted block atomically; failures only cost a cache miss."""
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write("\n".join(highlighted))
+        os.replace(temp_path, cache_dir / f"{key}.tex")
+    except OSError:
+        pass
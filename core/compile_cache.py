@@ -0,0 +1,304 @@
+"""
+Content-addressed cache of compiled PDFs.
+
+Identical LaTeX sources compile to identical PDFs, so a successful compile is
+stored under a hash of everything that affects its output: the normalised
+source, the auto_fix flag, the TeX engine version and the bytes of every local
+file the source pulls in (``\\input``/``\\include`` files and what they pull
+in, ``.bib`` files, local ``.sty``/``.cls`` files and images, including those
+found through ``\\graphicspath``). Sources that name a dependency through a
+macro cannot be keyed and bypass the cache. Entries live on disk as
+``<key>.pdf`` plus a ``<key>.json`` sidecar holding errors and warnings, and
+the least recently used entries are evicted once the cache grows past its
+size cap.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .latex_format import get_tex_version
+except ImportError:
+    # Allow latex_to_pdf to be run directly as a script
+    from latex_format import get_tex_version
+
+COMPILE_CACHE_DIR = Path(
+    os.environ.get("XTOX_COMPILE_CACHE_DIR", Path.home() / ".cache" / "xtox" / "pdf")
+)
+COMPILE_CACHE_MAX_BYTES = int(
+    os.environ.get("XTOX_COMPILE_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+
+GRAPHICS_EXTENSIONS = ("", ".pdf", ".png", ".jpg", ".jpeg")
+
+# A command that reads a file, with its braced argument (which may hold one
+# level of nested braces, as \graphicspath does) or the bare name \input allows
+DEPENDENCY_PATTERN = re.compile(
+    r"\\(input|include|subfile|lstinputlisting|verbatiminput|includepdf|includegraphics"
+    r"|bibliography|addbibresource|usepackage|RequirePackage|documentclass|graphicspath)"
+    r"(?![A-Za-z@])\s*(?:\[[^\]]*\]\s*)?(?:\{((?:[^{}]|\{[^{}]*\})*)\}|([^\s{}\\%]+))?"
+)
+COMMENT_PATTERN = re.compile(r"(?<!\\)%.*")
+
+# Extensions tried for each command's files, and whether those files are
+# TeX sources that can pull in further dependencies
+DEPENDENCY_KINDS = {
+    "input": (("", ".tex"), True),
+    "include": ((".tex",), True),
+    "subfile": (("", ".tex"), True),
+    "lstinputlisting": (("",), False),
+    "verbatiminput": (("",), False),
+    "includepdf": (("", ".pdf"), False),
+    "bibliography": ((".bib", ""), False),
+    "addbibresource": (("",), False),
+    "usepackage": ((".sty",), True),
+    "RequirePackage": ((".sty",), True),
+    "documentclass": ((".cls",), True),
+}
+LIST_COMMANDS = {"bibliography", "usepackage", "RequirePackage"}
+
+
+def compile_cache_key(lines: Iterable[str], auto_fix: bool = False, base_dir=None) -> Optional[str]:
+    """
+    Compute the cache key for a LaTeX source given as an iterable of lines.
+    
+    Line endings and trailing whitespace are normalised away. Files the
+    source depends on are resolved relative to base_dir the way pdflatex
+    would find them and hashed by content; a dependency that is not there
+    is hashed as missing, so adding it later changes the key. Returns None
+    when a dependency is named through a macro and cannot be resolved.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{get_tex_version() or 'unknown'}\0auto_fix={bool(auto_fix)}\0".encode("utf-8"))
+    
+    references: List[Tuple[str, str]] = []
+    for line in lines:
+        digest.update(line.rstrip().encode("utf-8"))
+        digest.update(b"\n")
+        if "\\" in line:
+            references.extend(_find_references(line))
+    
+    dependencies = _resolve_dependencies(references, base_dir or ".")
+    if dependencies is None:
+        return None
+    for kind, name, file_hash in dependencies:
+        digest.update(f"\0{kind}\0{name}\0{file_hash}".encode("utf-8"))
+    
+    return digest.hexdigest()
+
+
+def compile_cache_key_for_file(tex_path, auto_fix: bool = False) -> Optional[str]:
+    """Compute the cache key for a LaTeX file without loading it whole."""
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as file:
+        return compile_cache_key(file, auto_fix, os.path.dirname(os.path.abspath(tex_path)))
+
+
+def _find_references(line: str) -> List[Tuple[str, str]]:
+    """Return (command, argument) for each file-reading command in a line."""
+    line = COMMENT_PATTERN.sub("", line)
+    references = []
+    for match in DEPENDENCY_PATTERN.finditer(line):
+        command, braced, bare = match.groups()
+        if braced is None and (bare is None or command != "input"):
+            # No argument we can read, e.g. \input\jobname
+            references.append((command, "\\"))
+        else:
+            references.append((command, (braced if braced is not None else bare).strip()))
+    return references
+
+
+def _resolve_dependencies(
+    references: List[Tuple[str, str]], base_dir
+) -> Optional[List[Tuple[str, str, str]]]:
+    """
+    Hash every file the references pull in, following TeX sources into the
+    files they reference in turn.
+    
+    Returns (command, name, hash) triples, or None if a reference cannot be
+    resolved without expanding macros.
+    """
+    dependencies = []
+    graphics_dirs = [""]
+    images: List[str] = []
+    seen: Set[Tuple[str, str]] = set()
+    pending = list(references)
+    
+    while pending:
+        command, argument = pending.pop(0)
+        if "\\" in argument or "#" in argument:
+            return None
+        if command == "graphicspath":
+            graphics_dirs.extend(re.findall(r"\{([^{}]*)\}", argument))
+            continue
+        if command == "includegraphics":
+            images.append(argument)
+            continue
+        
+        extensions, is_source = DEPENDENCY_KINDS[command]
+        names = argument.split(",") if command in LIST_COMMANDS else [argument]
+        for name in names:
+            name = name.strip()
+            if not name or (command, name) in seen:
+                continue
+            seen.add((command, name))
+            path = _find_file(name, base_dir, [""], extensions)
+            dependencies.append((command, name, _hash_file(path)))
+            if path and is_source:
+                with open(path, "r", encoding="utf-8", errors="replace") as file:
+                    for line in file:
+                        if "\\" in line:
+                            pending.extend(_find_references(line))
+    
+    # \graphicspath applies to every image, wherever it appears
+    for image in images:
+        path = _find_file(image, base_dir, graphics_dirs, GRAPHICS_EXTENSIONS)
+        dependencies.append(("includegraphics", image, _hash_file(path)))
+    
+    return dependencies
+
+
+def _find_file(name: str, base_dir, directories: List[str], extensions) -> Optional[str]:
+    """Return the local file pdflatex would pick for a reference, if any."""
+    for directory in directories:
+        for extension in extensions:
+            candidate = os.path.join(base_dir, directory, name + extension)
+            if os.path.isfile(candidate):
+                return candidate
+    return None
+
+
+def _hash_file(path: Optional[str]) -> str:
+    """Hash a file's bytes; a missing file hashes as ``missing``."""
+    if path is None:
+        return "missing"
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class CompileCache:
+    """
+    On-disk LRU cache of compiled PDFs with a total size cap.
+    """
+    
+    def __init__(self, cache_dir=None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir or COMPILE_CACHE_DIR)
+        self.max_bytes = COMPILE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a compiled PDF.
+        
+        Returns a dict with pdf_path, errors and warnings, or None on a miss.
+        """
+        meta_path = self.cache_dir / f"{key}.json"
+        pdf_path = self.cache_dir / f"{key}.pdf"
+        try:
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not pdf_path.exists():
+            return None
+        
+        # Record the access for LRU eviction
+        now = time.time()
+        try:
+            os.utime(meta_path, (now, now))
+        except FileNotFoundError:
+            return None
+        
+        return {
+            "pdf_path": str(pdf_path),
+            "errors": meta.get("errors", []),
+            "warnings": meta.get("warnings", []),
+        }
+    
+    def fetch(self, key: str, target_path) -> Optional[Dict]:
+        """Copy a cached PDF to target_path, returning its entry on a hit."""
+        entry = self.get(key)
+        if entry is None:
+            return None
+        try:
+            shutil.copyfile(entry["pdf_path"], target_path)
+        except FileNotFoundError:
+            # Evicted or replaced by another process since the lookup
+            return None
+        return entry
+    
+    def put(
+        self,
+        key: str,
+        pdf_path,
+        errors: Optional[List[str]] = None,
+        warnings: Optional[List[str]] = None
+    ) -> None:
+        """Store a compiled PDF and its diagnostics, then enforce the size cap."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Write through temporary files so readers never see partial entries;
+        # the sidecar goes last because it marks the entry as complete
+        self._write_atomic(self.cache_dir / f"{key}.pdf", Path(pdf_path).read_bytes())
+        meta = {"errors": errors or [], "warnings": warnings or [], "created": time.time()}
+        self._write_atomic(self.cache_dir / f"{key}.json", json.dumps(meta).encode("utf-8"))
+        
+        self.evict()
+    
+    def evict(self) -> None:
+        """Remove least recently used entries until the cache fits its cap."""
+        entries = []
+        total = 0
+        for meta_path in self.cache_dir.glob("*.json"):
+            pdf_path = meta_path.with_suffix(".pdf")
+            try:
+                meta_stat = meta_path.stat()
+                size = meta_stat.st_size + pdf_path.stat().st_size
+            except FileNotFoundError:
+                continue
+            entries.append((meta_stat.st_mtime, meta_path, pdf_path, size))
+            total += size
+        
+        entries.sort()
+        for _, meta_path, pdf_path, size in entries:
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, pdf_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            total -= size
+    
+    def _write_atomic(self, path: Path, data: bytes) -> None:
+        """Write a file by renaming a fully written temporary file over it."""
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+_default_cache: Optional[CompileCache] = None
+
+
+def get_compile_cache() -> CompileCache:
+    """Return the process-wide cache configured from the environment."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CompileCache()
+    return _default_cache
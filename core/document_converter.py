@@ -3,15 +3,31 @@ Main document converter class that orchestrates all conversion operations.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
-from .markdown_to_latex import convert_markdown_to_latex
-from .markdown_to_docx import convert_markdown_to_docx
-from .markdown_to_html import convert_markdown_to_html
+from .markdown_ast import parse_markdown
+from .markdown_to_latex import (
+    convert_markdown_file_to_latex,
+    convert_markdown_to_latex,
+    latex_from_document,
+    FIGURE_WIDTH_INCHES,
+    LISTING_STRATEGIES,
+)
+from .markdown_to_docx import convert_markdown_to_docx, docx_from_document
+from .markdown_to_html import convert_markdown_to_html, html_from_document
+from .markdown_to_pdf import find_unsupported_features, pdf_from_document
 from .html_to_markdown import convert_html_to_markdown
-from .latex_to_pdf import latex_to_pdf, fix_latex_structure
-from ..utils.image_handler import copy_images_to_output_dir, update_image_paths
+from .image_converter import ImageConverter
+from .latex_to_pdf import fix_latex_content, latex_content_to_pdf, latex_to_pdf
+from .parallel_compile import can_compile_in_parallel, compile_latex_in_parallel
+from ..utils.image_handler import (
+    ImageStager,
+    copy_images_to_output_dir,
+    find_image_references,
+    update_image_paths,
+)
 
 
 class DocumentConverter:
@@ -19,20 +35,65 @@ class DocumentConverter:
     Main converter class that handles document transformations.
     """
     
-    def __init__(self, output_dir: Optional[str] = None):
+    # Target formats that can be rendered from a single Markdown parse
+    MARKDOWN_TARGET_FORMATS = ('pdf', 'latex', 'html', 'docx')
+    
+    # Markdown sources at least this large are converted with the streaming path
+    STREAMING_THRESHOLD_BYTES = 16 * 1024 * 1024
+    
+    # Generated LaTeX at least this large is compiled section by section in parallel
+    PARALLEL_THRESHOLD_BYTES = 1024 * 1024
+    
+    # PDF engines: LaTeX, the pure-Python renderer, or the renderer with a
+    # LaTeX fallback for documents it cannot draw
+    PDF_ENGINES = ('latex', 'direct', 'auto')
+    
+    def __init__(
+        self,
+        output_dir: Optional[str] = None,
+        streaming_threshold: Optional[int] = None,
+        parallel_threshold: Optional[int] = None,
+        pdf_engine: str = 'latex',
+        listing_strategy: str = 'auto',
+        image_dpi: Optional[int] = None
+    ):
         """
         Initialize the document converter.
         
         Args:
             output_dir: Default output directory for conversions
+            streaming_threshold: Source size in bytes above which Markdown is
+                streamed to LaTeX instead of being loaded into memory
+            parallel_threshold: LaTeX size in characters above which sections
+                are compiled concurrently and merged (requires pypdf)
+            pdf_engine: Default engine for ``markdown_to_pdf`` (see PDF_ENGINES)
+            listing_strategy: How code blocks are typeset in LaTeX output
+                (see markdown_to_latex.LISTING_STRATEGIES)
+            image_dpi: Downsample staged images to this resolution at their
+                printed width; None keeps them at full resolution
         """
+        if pdf_engine not in self.PDF_ENGINES:
+            raise ValueError(f"Unknown PDF engine: {pdf_engine}")
+        if listing_strategy not in LISTING_STRATEGIES:
+            raise ValueError(f"Unknown listing strategy: {listing_strategy}")
         self.output_dir = Path(output_dir) if output_dir else None
+        self.streaming_threshold = (
+            streaming_threshold if streaming_threshold is not None else self.STREAMING_THRESHOLD_BYTES
+        )
+        self.parallel_threshold = (
+            parallel_threshold if parallel_threshold is not None else self.PARALLEL_THRESHOLD_BYTES
+        )
+        self.pdf_engine = pdf_engine
+        self.listing_strategy = listing_strategy
+        self.image_dpi = image_dpi
     
     def markdown_to_pdf(
         self, 
         markdown_path: Union[str, Path], 
         output_dir: Optional[str] = None,
-        refinement_level: int = 1
+        refinement_level: int = 1,
+        stream: Optional[bool] = None,
+        engine: Optional[str] = None
     ) -> Dict[str, str]:
         """
         Convert Markdown file to PDF.
@@ -41,54 +102,189 @@ class DocumentConverter:
             markdown_path: Path to the markdown file
             output_dir: Output directory (overrides default)
             refinement_level: Level of LaTeX refinement (0-3)
-            
+            stream: Stream the conversion with constant memory; by default
+                streaming is used for sources above ``streaming_threshold``
+            engine: 'latex', 'direct' (pure Python, for prose with headings,
+                lists and images) or 'auto' (direct when the document allows
+                it, LaTeX otherwise); defaults to the converter's pdf_engine
+        
         Returns:
-            Dictionary with paths to generated files
+            Dictionary with paths to generated files and the engine used
         """
+        engine = engine or self.pdf_engine
+        if engine not in self.PDF_ENGINES:
+            raise ValueError(f"Unknown PDF engine: {engine}")
+        
         markdown_path = Path(markdown_path)
         if not markdown_path.exists():
             raise FileNotFoundError(f"Markdown file not found: {markdown_path}")
         
-        # Determine output directory
-        if output_dir:
-            output_path = Path(output_dir)
-        elif self.output_dir:
-            output_path = self.output_dir
+        if stream is None:
+            stream = markdown_path.stat().st_size >= self.streaming_threshold
+        
+        if engine == 'direct' or (engine == 'auto' and not stream):
+            result = self._markdown_to_pdf_direct(markdown_path, output_dir, required=(engine == 'direct'))
+            if result is not None:
+                return result
+        
+        if stream:
+            result = self._markdown_to_pdf_streaming(markdown_path, output_dir, refinement_level)
         else:
-            output_path = markdown_path.parent
+            result = self.convert_markdown(
+                markdown_path,
+                ['pdf'],
+                output_dir=output_dir,
+                refinement_level=refinement_level
+            )
+        result["engine"] = 'latex'
+        return result
+    
+    def convert_markdown(
+        self,
+        markdown_path: Union[str, Path],
+        formats: List[str],
+        output_dir: Optional[str] = None,
+        refinement_level: int = 1
+    ) -> Dict[str, Union[str, List[str]]]:
+        """
+        Convert a Markdown file to several formats from a single parse.
         
-        output_path.mkdir(parents=True, exist_ok=True)
+        Args:
+            markdown_path: Path to the markdown file
+            formats: Target formats ('pdf', 'latex', 'html', 'docx')
+            output_dir: Output directory (overrides default)
+            refinement_level: Level of LaTeX refinement (0-3), used for PDF
         
-        # Generate file paths
+        Returns:
+            Dictionary with a ``<format>_path`` entry per generated file
+            and the list of copied images
+        """
+        formats = [fmt.lower() for fmt in formats]
+        unsupported = [fmt for fmt in formats if fmt not in self.MARKDOWN_TARGET_FORMATS]
+        if unsupported:
+            raise ValueError(f"Unsupported target format(s): {', '.join(unsupported)}")
+        
+        markdown_path = Path(markdown_path)
+        if not markdown_path.exists():
+            raise FileNotFoundError(f"Markdown file not found: {markdown_path}")
+        
+        output_path = self._resolve_output_dir(markdown_path, output_dir)
         base_name = markdown_path.stem
-        latex_path = output_path / f"{base_name}.tex"
-        pdf_path = output_path / f"{base_name}.pdf"
         
         # Read markdown content
         with open(markdown_path, 'r', encoding='utf-8') as f:
             markdown_content = f.read()
         
-        # Process images
+        # Process images, scanning the source for references only once
+        image_references = find_image_references(markdown_content)
         image_mapping = copy_images_to_output_dir(
             markdown_content, 
             str(markdown_path.parent), 
-            str(output_path)
+            str(output_path),
+            references=image_references
         )
         
+        if image_mapping and self.image_dpi:
+            image_mapping = self._downsample_images(image_mapping, output_path)
+        
         if image_mapping:
-            markdown_content = update_image_paths(markdown_content, image_mapping)
+            markdown_content = update_image_paths(markdown_content, image_mapping, image_references)
         
-        # Convert to LaTeX
-        latex_content = convert_markdown_to_latex(markdown_content, str(latex_path))
+        # Parse once, then render every requested format from the same tree
+        document = parse_markdown(markdown_content)
+        result: Dict[str, Union[str, List[str]]] = {}
         
-        # Apply refinements
-        if refinement_level > 0:
-            if refinement_level == 1:
-                fix_latex_structure(str(latex_path))
-            elif refinement_level >= 2:
-                fix_latex_structure(str(latex_path), backup=True)
+        if 'latex' in formats or 'pdf' in formats:
+            latex_path = output_path / f"{base_name}.tex"
+            result["latex_path"] = str(latex_path)
+            
+            if 'pdf' in formats:
+                # The .tex file is written once, by the compile step
+                latex_content = latex_from_document(document, listing_strategy=self.listing_strategy)
+                result["pdf_path"] = self._compile_markdown_latex(
+                    latex_content, latex_path, refinement_level
+                )
+            else:
+                latex_from_document(document, str(latex_path), listing_strategy=self.listing_strategy)
+        
+        if 'html' in formats:
+            html_path = output_path / f"{base_name}.html"
+            html_from_document(document, str(html_path))
+            result["html_path"] = str(html_path)
+        
+        if 'docx' in formats:
+            docx_path = output_path / f"{base_name}.docx"
+            docx_from_document(document, str(docx_path), image_base_dir=output_path)
+            result["docx_path"] = str(docx_path)
+        
+        result["images"] = list(image_mapping.values()) if image_mapping else []
+        return result
+    
+    def _markdown_to_pdf_direct(
+        self,
+        markdown_path: Path,
+        output_dir: Optional[str],
+        required: bool
+    ) -> Optional[Dict[str, Union[str, List[str]]]]:
+        """
+        Render Markdown to PDF without LaTeX.
+        
+        Returns None when the document uses features the direct renderer
+        cannot draw, unless it is required, in which case ValueError is raised.
+        """
+        with open(markdown_path, 'r', encoding='utf-8') as f:
+            document = parse_markdown(f.read())
         
-        # Generate PDF
+        # Images are embedded from where the Markdown points, not copied
+        unsupported = find_unsupported_features(document, markdown_path.parent)
+        if unsupported:
+            if required:
+                raise ValueError(f"Direct PDF engine cannot render: {', '.join(unsupported)}")
+            print(f"Using LaTeX for {markdown_path.name}: {', '.join(unsupported)}")
+            return None
+        
+        output_path = self._resolve_output_dir(markdown_path, output_dir)
+        pdf_path = output_path / f"{markdown_path.stem}.pdf"
+        pdf_from_document(document, pdf_path, base_dir=markdown_path.parent)
+        
+        return {
+            "pdf_path": str(pdf_path),
+            "images": [],
+            "engine": 'direct'
+        }
+    
+    def _markdown_to_pdf_streaming(
+        self,
+        markdown_path: Path,
+        output_dir: Optional[str],
+        refinement_level: int
+    ) -> Dict[str, Union[str, List[str]]]:
+        """Convert Markdown to PDF without holding the source or LaTeX in memory."""
+        output_path = self._resolve_output_dir(markdown_path, output_dir)
+        latex_path = output_path / f"{markdown_path.stem}.tex"
+        pdf_path = latex_path.with_suffix('.pdf')
+        
+        # Images are staged as they stream past instead of in an upfront scan
+        image_mapping: Dict[str, Optional[str]] = {}
+        
+        with ImageStager(str(output_path)) as stager:
+            def resolve_image(image_path: str) -> str:
+                if image_path not in image_mapping:
+                    staged_path = stager.stage(image_path, str(markdown_path.parent))
+                    if staged_path and self.image_dpi:
+                        staged_path = self._downsample_image(staged_path, output_path)
+                    image_mapping[image_path] = staged_path
+                return image_mapping[image_path] or image_path
+            
+            convert_markdown_file_to_latex(
+                markdown_path,
+                latex_path,
+                image_resolver=resolve_image,
+                listing_strategy=self.listing_strategy
+            )
+        
+        # Streamed LaTeX always carries a complete document structure, so the
+        # read-and-rewrite refinement pass is skipped
         success = latex_to_pdf(str(latex_path), auto_fix=(refinement_level > 0))
         
         if not success or not pdf_path.exists():
@@ -97,9 +293,74 @@ class DocumentConverter:
         return {
             "latex_path": str(latex_path),
             "pdf_path": str(pdf_path),
-            "images": list(image_mapping.values()) if image_mapping else []
+            "images": [path for path in image_mapping.values() if path]
         }
     
+    def _downsample_images(self, image_mapping: Dict[str, str], output_path: Path) -> Dict[str, str]:
+        """Replace staged images with derivatives at image_dpi, concurrently."""
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+            downsampled = executor.map(
+                lambda staged_path: self._downsample_image(staged_path, output_path),
+                image_mapping.values()
+            )
+            return dict(zip(image_mapping.keys(), downsampled))
+    
+    def _downsample_image(self, staged_path: str, output_path: Path) -> str:
+        """
+        Downsample one staged image to image_dpi at the width figures are
+        printed, returning the path to reference from output_path.
+        """
+        try:
+            derived_path = ImageConverter().downsample_to_dpi(
+                output_path / staged_path,
+                output_path / "images",
+                FIGURE_WIDTH_INCHES,
+                self.image_dpi
+            )
+        except (OSError, ValueError) as e:
+            # Vector figures and formats Pillow cannot read are used as they are
+            print(f"Keeping {staged_path} at full resolution: {e}")
+            return staged_path
+        return os.path.relpath(derived_path, output_path)
+    
+    def _compile_markdown_latex(
+        self,
+        latex_content: str,
+        latex_path: Path,
+        refinement_level: int
+    ) -> str:
+        """Refine and compile LaTeX generated from Markdown, returning the PDF path."""
+        pdf_path = latex_path.with_suffix('.pdf')
+        
+        # Apply refinements in memory
+        if refinement_level > 0:
+            latex_content, _ = fix_latex_content(latex_content)
+        
+        # Write the .tex once and generate the PDF, splitting large documents
+        # into sections that compile on all cores
+        auto_fix = refinement_level > 0
+        if len(latex_content) >= self.parallel_threshold and can_compile_in_parallel(latex_content):
+            success = compile_latex_in_parallel(latex_content, str(latex_path), auto_fix=auto_fix)
+        else:
+            success = latex_content_to_pdf(latex_content, str(latex_path), auto_fix=auto_fix)
+        
+        if not success or not pdf_path.exists():
+            raise RuntimeError(f"PDF generation failed: {pdf_path}")
+        
+        return str(pdf_path)
+    
+    def _resolve_output_dir(self, source_path: Path, output_dir: Optional[str]) -> Path:
+        """Pick the output directory for a conversion and make sure it exists."""
+        if output_dir:
+            output_path = Path(output_dir)
+        elif self.output_dir:
+            output_path = self.output_dir
+        else:
+            output_path = source_path.parent
+        
+        output_path.mkdir(parents=True, exist_ok=True)
+        return output_path
+    
     def latex_to_pdf(
         self, 
         latex_path: Union[str, Path], 
@@ -111,7 +372,7 @@ class DocumentConverter:
         Args:
             latex_path: Path to the LaTeX file
             auto_fix: Whether to automatically fix LaTeX structure issues
-            
+        
         Returns:
             Path to generated PDF file
         """
@@ -138,7 +399,7 @@ class DocumentConverter:
         Args:
             markdown_path: Path to the markdown file
             output_dir: Output directory (overrides default)
-            
+        
         Returns:
             Path to generated DOCX file
         """
@@ -185,7 +446,7 @@ class DocumentConverter:
             markdown_path: Path to the markdown file
             output_dir: Output directory (overrides default)
             include_css: Whether to include CSS styling
-            
+        
         Returns:
             Path to generated HTML file
         """
@@ -230,7 +491,7 @@ class DocumentConverter:
         Args:
             html_path: Path to the HTML file
             output_dir: Output directory (overrides default)
-            
+        
         Returns:
             Path to generated Markdown file
         """
@@ -2,6 +2,9 @@
 Image format conversion and compression utilities.
 """
 
+import hashlib
+import io
+import math
 import os
 from pathlib import Path
 from typing import Optional, Tuple, Union, Dict, List
@@ -20,11 +23,41 @@ class ImageConverter:
         'jpg': 'JPEG', 
         'png': 'PNG',
         'webp': 'WebP',
+        'avif': 'AVIF',
         'bmp': 'BMP',
         'tiff': 'TIFF',
         'gif': 'GIF'
     }
     
+    # Formats whose size can be traded for quality by compress_image
+    LOSSY_FORMATS = {
+        'jpeg': 'JPEG',
+        'jpg': 'JPEG',
+        'webp': 'WEBP',
+        'avif': 'AVIF'
+    }
+    
+    # Quality range searched when compressing to a target size
+    MIN_QUALITY = 10
+    MAX_QUALITY = 95
+    
+    # First quality tried, and how fast log(size) is assumed to grow with
+    # quality until a second encode measures it
+    SEED_QUALITY = 75
+    SEED_LOG_SIZE_SLOPE = 0.015
+    
+    # A result within this share of the target is close enough to stop
+    SIZE_TOLERANCE = 0.9
+    
+    # Encodes per resolution before the search settles for the best fit
+    MAX_ENCODES = 6
+    
+    # Images are never scaled below this many pixels on their shorter side
+    MIN_DIMENSION = 16
+    
+    # EXIF orientations that rotate the image by 90 degrees
+    ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+    
     def __init__(self):
         self.quality_presets = {
             'high': 95,
@@ -90,7 +123,7 @@ class ImageConverter:
             
             # Save with appropriate settings
             save_kwargs = {'optimize': optimize}
-            if target_format.upper() in ['JPEG', 'WEBP']:
+            if target_format.upper() in ['JPEG', 'WEBP', 'AVIF']:
                 save_kwargs['quality'] = quality_val
             
             img.save(output_path, format=self.SUPPORTED_FORMATS[target_format.lower()], **save_kwargs)
@@ -110,7 +143,8 @@ class ImageConverter:
         Args:
             input_path: Path to input image
             output_path: Output path (overwrites input if None)
-            target_size_kb: Target file size in KB
+            target_size_kb: Target file size in KB; the output must be
+                JPEG, WebP or AVIF
             quality: Quality setting
             
         Returns:
@@ -130,34 +164,202 @@ class ImageConverter:
                                     quality=quality)
     
     def _compress_to_size(self, input_path: Path, output_path: Path, target_kb: int) -> str:
-        """Compress image to specific file size."""
+        """
+        Compress image to specific file size.
+        
+        The output format follows the output path's extension (JPEG, WebP or
+        AVIF). Quality is searched on in-memory encodes, starting from an
+        estimate and refined from the measured sizes, which usually settles in
+        two or three encodes. If even the lowest quality is too large, the
+        image is scaled down and searched again. Only the result is written.
+        """
+        image_format = self.LOSSY_FORMATS.get(output_path.suffix[1:].lower())
+        if image_format is None:
+            raise ValueError(
+                f"Compressing to a target size needs a JPEG, WebP or AVIF output, not {output_path.name}"
+            )
+        target_bytes = target_kb * 1024
+        
         with Image.open(input_path) as img:
-            if img.mode in ('RGBA', 'P'):
+            if image_format == 'JPEG' and img.mode in ('RGBA', 'LA', 'P'):
                 img = img.convert('RGB')
+            elif img.mode == 'P':
+                img = img.convert('RGBA')
+            else:
+                img = img.copy()
+        
+        smallest = None
+        seed_quality = self.SEED_QUALITY
+        while True:
+            data, smallest_here = self._search_quality(img, image_format, target_bytes, seed_quality)
+            if smallest is None or len(smallest_here) < len(smallest):
+                smallest = smallest_here
+            if data is not None:
+                break
             
-            # Binary search for optimal quality
-            min_quality, max_quality = 10, 95
+            # Quality alone cannot reach the target: shrink the image in
+            # proportion to how far the lowest quality missed
+            scale = math.sqrt(target_bytes / len(smallest_here)) * 0.95
+            new_size = (round(img.width * scale), round(img.height * scale))
+            if min(new_size) < self.MIN_DIMENSION:
+                print(f"Warning: {input_path.name} cannot be compressed to {target_kb} KB")
+                data = smallest
+                break
+            img = img.resize(new_size, Image.Resampling.LANCZOS)
+            # The new size was chosen to fit at about the lowest quality
+            seed_quality = self.MIN_QUALITY
+        
+        output_path.write_bytes(data)
+        return str(output_path)
+    
+    def _search_quality(
+        self,
+        img,
+        image_format: str,
+        target_bytes: int,
+        seed_quality: int
+    ) -> Tuple[Optional[bytes], bytes]:
+        """
+        Find the highest quality whose encoding fits in target_bytes.
+        
+        Returns the best fitting encoding (or None if none fits) and the
+        smallest encoding produced.
+        """
+        low, high = self.MIN_QUALITY, self.MAX_QUALITY
+        sizes: Dict[int, int] = {}
+        best = smallest = None
+        quality = seed_quality
+        
+        for _ in range(self.MAX_ENCODES):
+            data = self._encode(img, image_format, quality)
+            sizes[quality] = len(data)
+            if smallest is None or len(data) < len(smallest):
+                smallest = data
             
-            while min_quality <= max_quality:
-                quality = (min_quality + max_quality) // 2
-                
-                # Save to temporary location to check size
-                temp_path = output_path.with_suffix('.tmp.jpg')
-                img.save(temp_path, 'JPEG', quality=quality, optimize=True)
-                
-                file_size_kb = temp_path.stat().st_size / 1024
-                
-                if file_size_kb <= target_kb:
-                    # Size is acceptable, try higher quality
-                    temp_path.replace(output_path)
-                    min_quality = quality + 1
-                else:
-                    # Size too large, reduce quality
-                    temp_path.unlink()
-                    max_quality = quality - 1
+            if len(data) <= target_bytes:
+                best = data
+                low = quality + 1
+                if len(data) >= target_bytes * self.SIZE_TOLERANCE:
+                    break
+            else:
+                high = quality - 1
+            if low > high:
+                break
+            quality = self._estimate_quality(sizes, target_bytes, low, high)
+        
+        return best, smallest
+    
+    def _estimate_quality(self, sizes: Dict[int, int], target_bytes: int, low: int, high: int) -> int:
+        """
+        Estimate the quality that lands just under target_bytes.
+        
+        log(size) is treated as linear in quality, through the two measured
+        qualities closest to the target, or with SEED_LOG_SIZE_SLOPE after a
+        single encode. The estimate is kept inside [low, high].
+        """
+        goal = math.log(target_bytes * (1 + self.SIZE_TOLERANCE) / 2)
+        measured = sorted(sizes, key=lambda quality: abs(math.log(sizes[quality]) - goal))
+        q1 = measured[0]
+        slope = self.SEED_LOG_SIZE_SLOPE
+        if len(measured) > 1:
+            q2 = measured[1]
+            measured_slope = (math.log(sizes[q1]) - math.log(sizes[q2])) / (q1 - q2)
+            if measured_slope > 0:
+                slope = measured_slope
+        
+        # Every measured quality lies outside [low, high], so this is new
+        estimate = round(q1 + (goal - math.log(sizes[q1])) / slope)
+        return max(low, min(high, estimate))
+    
+    @staticmethod
+    def _encode(img, image_format: str, quality: int) -> bytes:
+        """Encode an image in memory."""
+        buffer = io.BytesIO()
+        save_kwargs = {'quality': quality}
+        if image_format == 'JPEG':
+            save_kwargs['optimize'] = True
+        try:
+            img.save(buffer, image_format, **save_kwargs)
+        except KeyError:
+            raise ValueError(f"This Pillow build cannot write {image_format} images")
+        return buffer.getvalue()
+    
+    def downsample_to_dpi(
+        self,
+        input_path: Union[str, Path],
+        output_dir: Union[str, Path],
+        width_inches: float,
+        dpi: int = 150
+    ) -> str:
+        """
+        Resample an image to the resolution it needs at its printed size.
+        
+        Images that already have no more than ``width_inches * dpi`` pixels
+        across are returned unchanged. Larger JPEGs are decoded in draft mode,
+        which lets the decoder skip most of the pixels. Derivatives are cached
+        in output_dir under the source's content hash and the target size, so
+        each one is only produced once.
+        
+        Args:
+            input_path: Path to input image
+            output_dir: Directory for the downsampled derivative
+            width_inches: Width the image is printed at
+            dpi: Target resolution in dots per inch
+            
+        Returns:
+            Path to the derivative, or input_path if no resampling is needed
+        """
+        input_path = Path(input_path)
+        target_width = max(1, round(width_inches * dpi))
+        
+        with Image.open(input_path) as img:
+            # Only the header has been read so far
+            raw_width, raw_height = img.size
+            rotated = img.getexif().get(0x0112) in self.ROTATED_ORIENTATIONS
+            display_width = raw_height if rotated else raw_width
+            if display_width <= target_width:
+                return str(input_path)
+            
+            scale = target_width / display_width
+            target_size = (max(1, round(raw_width * scale)), max(1, round(raw_height * scale)))
+            is_jpeg = img.format == 'JPEG'
+            suffix = '.jpg' if is_jpeg else '.png'
+            
+            output_dir = Path(output_dir)
+            output_path = output_dir / (
+                f"{self._file_digest(input_path)[:16]}-{target_size[0]}x{target_size[1]}{suffix}"
+            )
+            if output_path.exists():
+                return str(output_path)
+            
+            # Decode at the smallest power-of-two scale that still covers the target
+            img.draft(None, (math.ceil(raw_width * scale), math.ceil(raw_height * scale)))
+            if is_jpeg and img.mode not in ('RGB', 'L'):
+                img = img.convert('RGB')
+            elif not is_jpeg and img.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                img = img.convert('RGBA')
+            img = img.resize(target_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+            img = ImageOps.exif_transpose(img)
+            
+            output_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = output_path.with_name(output_path.name + '.tmp')
+            if is_jpeg:
+                img.save(temp_path, 'JPEG', quality=self.quality_presets['high'], optimize=True)
+            else:
+                img.save(temp_path, 'PNG', optimize=True)
+            temp_path.replace(output_path)
         
         return str(output_path)
     
+    @staticmethod
+    def _file_digest(path: Path) -> str:
+        """Hash a file's content."""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
     def batch_convert(
         self, 
         input_dir: Union[str, Path],
@@ -0,0 +1,268 @@
+"""
+Precompiled LaTeX formats for frequently used preambles.
+
+Loading packages dominates pdflatex start-up for short documents. A preamble
+can be dumped once into a custom format (``pdflatex -ini`` with the
+mylatexformat package) and later runs only have to load that format. Formats
+are cached on disk, keyed by the preamble text and the TeX engine version.
+The cache has a size cap; the least recently used formats and bookkeeping
+files are removed once it is exceeded, so arbitrary uploads cannot fill the
+disk.
+
+Dumping runs pdflatex on the document's own preamble, so it gets the same
+timeout and resource limits as the compile that asked for the format.
+
+Everything before ``\\csname endofdump\\endcsname`` (or ``\\begin{document}``
+when the marker is absent) goes into the format. Packages that must be loaded
+at run time, such as hyperref, belong after the marker. Without a format the
+marker expands to ``\\relax`` and is harmless.
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+try:
+    from .sandbox import ResourceLimits, exceeded_limit, limited_command
+    from .tex_index import get_tex_index
+except ImportError:
+    # Allow latex_to_pdf to be run directly as a script
+    from sandbox import ResourceLimits, exceeded_limit, limited_command
+    from tex_index import get_tex_index
+
+FORMAT_DUMP_MARKER = "\\csname endofdump\\endcsname"
+BEGIN_DOCUMENT = "\\begin{document}"
+
+FORMAT_CACHE_DIR = Path(
+    os.environ.get("XTOX_FORMAT_CACHE", Path.home() / ".cache" / "xtox" / "formats")
+)
+FORMAT_CACHE_MAX_BYTES = int(
+    os.environ.get("XTOX_FORMAT_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+FORMAT_DUMP_TIMEOUT = 120  # seconds
+# Marker files take at least a block on disk
+MIN_ENTRY_BYTES = 4096
+
+
+def get_tex_version() -> Optional[str]:
+    """Return the first line of ``pdflatex --version``, or None if unavailable."""
+    # Recorded in the TeX index, so pdflatex is not launched on every run
+    return get_tex_index().tex_version
+
+
+def extract_dump_preamble(content: str) -> Optional[str]:
+    """
+    Return the part of a LaTeX document that can be dumped into a format.
+    
+    That is everything up to the dump marker, or up to ``\\begin{document}``
+    when there is no marker. Returns None for documents without a preamble.
+    """
+    end = content.find(BEGIN_DOCUMENT)
+    if end == -1 or "\\documentclass" not in content[:end]:
+        return None
+    
+    marker = content.find(FORMAT_DUMP_MARKER, 0, end)
+    if marker != -1:
+        end = marker
+    return content[:end]
+
+
+def read_preamble(tex_path) -> Optional[str]:
+    """
+    Read a LaTeX file up to and including its ``\\begin{document}`` line.
+    
+    Returns None if the file has no ``\\begin{document}``.
+    """
+    lines = []
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            lines.append(line)
+            if BEGIN_DOCUMENT in line:
+                return ''.join(lines)
+    return None
+
+
+def format_key(preamble: str, tex_version: str) -> str:
+    """Return the cache key for a preamble compiled by a given TeX version."""
+    digest = hashlib.sha256()
+    digest.update(tex_version.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(preamble.strip().encode("utf-8"))
+    return digest.hexdigest()[:24]
+
+
+def evict_formats(cache_dir=None, max_bytes: Optional[int] = None) -> None:
+    """Remove least recently used cache files until the cache fits its cap."""
+    cache_dir = Path(cache_dir or FORMAT_CACHE_DIR)
+    max_bytes = FORMAT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    total = 0
+    for path in cache_dir.iterdir():
+        if path.suffix not in (".fmt", ".seen", ".failed"):
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        size = max(stat.st_size, MIN_ENTRY_BYTES)
+        entries.append((stat.st_mtime, path, size))
+        total += size
+    
+    entries.sort()
+    for _, path, size in entries:
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _touch(path: Path) -> None:
+    """Record a use of a cache file for LRU eviction."""
+    now = time.time()
+    try:
+        os.utime(path, (now, now))
+    except FileNotFoundError:
+        pass
+
+
+def dump_format(preamble: str, cache_dir=None, timeout: Optional[float] = None,
+                limits: Optional[ResourceLimits] = None) -> Optional[str]:
+    """
+    Dump a preamble into a precompiled format, reusing a cached one if present.
+    
+    The dump runs under limits and timeout (FORMAT_DUMP_TIMEOUT when None),
+    like a compile of the document.
+    Returns the format path without the ``.fmt`` extension, suitable for
+    ``pdflatex -fmt=...``, or None if the format could not be built.
+    """
+    tex_version = get_tex_version()
+    if tex_version is None:
+        return None
+    
+    cache_dir = Path(cache_dir or FORMAT_CACHE_DIR)
+    key = format_key(preamble, tex_version)
+    format_base = cache_dir / key
+    
+    if format_base.with_suffix(".fmt").exists():
+        _touch(format_base.with_suffix(".fmt"))
+        return str(format_base)
+    if format_base.with_suffix(".failed").exists():
+        return None
+    
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Build in a private directory and move the result into place, so
+    # concurrent compiles never pick up a half-written format
+    with tempfile.TemporaryDirectory(dir=cache_dir) as build_dir:
+        source = Path(build_dir) / f"{key}.tex"
+        source.write_text(
+            f"{preamble}\n{FORMAT_DUMP_MARKER}\n{BEGIN_DOCUMENT}\n\\end{{document}}\n",
+            encoding="utf-8"
+        )
+        
+        print(f"Dumping LaTeX format {key}...")
+        command = [
+            "pdflatex", "-ini", "-interaction=nonstopmode",
+            f"-jobname={key}", "&pdflatex", "mylatexformat.ltx", source.name
+        ]
+        try:
+            result = subprocess.run(
+                limited_command(command, limits),
+                cwd=build_dir,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                encoding='utf-8',
+                errors='replace',
+                timeout=timeout or FORMAT_DUMP_TIMEOUT
+            )
+        except FileNotFoundError:
+            return None
+        except subprocess.TimeoutExpired:
+            # A preamble that is this slow to dump is not retried
+            print(f"Dumping LaTeX format {key} timed out, compiling without it")
+            format_base.with_suffix(".failed").touch()
+            evict_formats(cache_dir)
+            return None
+        
+        built = Path(build_dir) / f"{key}.fmt"
+        if result.returncode != 0 or not built.exists():
+            if exceeded_limit(limits, result.returncode, result.stdout + result.stderr):
+                print(f"Dumping LaTeX format {key} hit a resource limit, compiling without it")
+            else:
+                print(f"Could not dump LaTeX format {key}, compiling without it")
+            format_base.with_suffix(".failed").touch()
+            evict_formats(cache_dir)
+            return None
+        
+        os.replace(built, format_base.with_suffix(".fmt"))
+    
+    evict_formats(cache_dir)
+    return str(format_base)
+
+
+def find_format_for_content(content: str, cache_dir=None, timeout: Optional[float] = None,
+                            limits: Optional[ResourceLimits] = None) -> Optional[str]:
+    """
+    Return a precompiled format to compile a LaTeX document against.
+    
+    Preambles that carry the dump marker (such as the one emitted for
+    Markdown) are dumped straight away. Other preambles are dumped the second
+    time they are seen, unless they load hyperref, which cannot be dumped.
+    A dump runs under timeout and limits.
+    """
+    preamble = extract_dump_preamble(content)
+    if preamble is None:
+        return None
+    has_marker = len(preamble) < content.find(BEGIN_DOCUMENT)
+    return _find_format(preamble, has_marker, cache_dir, timeout, limits)
+
+
+def find_format_for_file(tex_path, cache_dir=None, timeout: Optional[float] = None,
+                         limits: Optional[ResourceLimits] = None) -> Optional[str]:
+    """Like :func:`find_format_for_content`, reading only the file's preamble."""
+    head = read_preamble(tex_path)
+    if head is None:
+        return None
+    return find_format_for_content(head, cache_dir, timeout, limits)
+
+
+def _find_format(preamble: str, has_marker: bool, cache_dir=None,
+                 timeout: Optional[float] = None,
+                 limits: Optional[ResourceLimits] = None) -> Optional[str]:
+    """Apply the dumping policy for a preamble."""
+    if has_marker:
+        return dump_format(preamble, cache_dir, timeout, limits)
+    
+    if "hyperref" in preamble:
+        return None
+    
+    tex_version = get_tex_version()
+    if tex_version is None:
+        return None
+    
+    cache_dir = Path(cache_dir or FORMAT_CACHE_DIR)
+    seen = cache_dir / f"{format_key(preamble, tex_version)}.seen"
+    if seen.exists():
+        return dump_format(preamble, cache_dir, timeout, limits)
+    
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    seen.touch()
+    evict_formats(cache_dir)
+    return None
+
+
+def pdflatex_command(tex_path, format_path: Optional[str] = None, extra_args=()):
+    """Build the pdflatex command line, optionally using a precompiled format."""
+    command = ["pdflatex", "-interaction=nonstopmode"]
+    if format_path:
+        command.append(f"-fmt={format_path}")
+    command.extend(extra_args)
+    command.append(str(tex_path))
+    return command
@@ -0,0 +1,258 @@
+"""
+Pre-flight checks that catch doomed LaTeX compiles before pdflatex runs.
+
+The source is tokenized once, in pure Python, to find the failures that are
+most common in uploads:
+
+- unbalanced braces and environments,
+- packages and document classes that are not installed,
+- ``\\includegraphics`` targets that exist neither next to the document nor
+  in the TeX tree.
+
+Arguments that LaTeX reads verbatim (``\\verb``, ``\\lstinline``,
+``\\mintinline``, ``\\url``, ``\\path`` and the URL of ``\\href``) are
+skipped whole, so a ``%`` or an unbalanced brace inside them is not mistaken
+for a comment or a group.
+
+Errors are reported the way latex_log summarizes pdflatex errors: the ``!``
+message of the error pdflatex would raise, then ``l.N`` and the offending
+source line.
+"""
+
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .compile_cache import GRAPHICS_EXTENSIONS
+    from .tex_index import get_tex_index
+except ImportError:
+    # Allow latex_to_pdf to be run directly as a script
+    from compile_cache import GRAPHICS_EXTENSIONS
+    from tex_index import get_tex_index
+
+# One token per match: \verb, a command with a verbatim argument, a control
+# sequence, a comment, a brace or a newline
+TOKEN_PATTERN = re.compile(
+    r"\\verb\*?([^A-Za-z\s])[^\n]*?\1"
+    r"|\\(?:lstinline\s*(?:\[[^\]]*\])?|mintinline\s*(?:\[[^\]]*\])?\s*\{[^{}\n]*\}|url|path|href)"
+    r"(?![A-Za-z@])\s*(?:\{(?:[^{}\n]|\{[^{}\n]*\})*\}|([^A-Za-z\s{])[^\n]*?\2)"
+    r"|\\(?:[A-Za-z@]+\*?|.)|%[^\n]*|[{}\n]",
+    re.S
+)
+ARGUMENT_PATTERN = re.compile(r"\s*(?:\[[^\]]*\]\s*)?\{([^{}]*)\}")
+GRAPHICSPATH_PATTERN = re.compile(r"\s*\{((?:\s*\{[^{}]*\})*)\s*\}")
+
+# Environments whose contents are not LaTeX
+VERBATIM_ENVIRONMENTS = {"verbatim", "verbatim*", "Verbatim", "lstlisting", "minted", "comment"}
+PACKAGE_COMMANDS = {"\\usepackage", "\\RequirePackage"}
+ARGUMENT_COMMANDS = {"\\begin", "\\end", "\\documentclass", "\\includegraphics"}
+ARGUMENT_COMMANDS |= PACKAGE_COMMANDS
+
+# Whether each TeX file looked up so far is installed, by file name
+_installed_files: Dict[str, bool] = {}
+
+
+def find_missing_tex_files(names: Iterable[str], base_dir=None) -> Optional[Set[str]]:
+    """
+    Return which of the given TeX file names (``name.sty``, ``name.cls``) are
+    neither next to the document in base_dir nor installed.
+    
+    The persisted TeX index answers most lookups. Without one, names go
+    through a single kpsewhich call and are cached for the life of the
+    process. Returns None when kpsewhich is not available.
+    """
+    # pdflatex finds files in the document's directory before the TeX tree
+    base = Path(base_dir) if base_dir else Path.cwd()
+    names = {name for name in names if not (base / name).is_file()}
+    if not names:
+        return set()
+    
+    missing = get_tex_index().missing(names)
+    if missing is not None:
+        return missing
+    
+    unknown = sorted(name for name in names if name not in _installed_files)
+    if unknown:
+        try:
+            result = subprocess.run(
+                ["kpsewhich", *unknown],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                encoding='utf-8',
+                errors='replace'
+            )
+        except FileNotFoundError:
+            return None
+        found = {os.path.basename(line.strip()) for line in result.stdout.splitlines()}
+        for name in unknown:
+            _installed_files[name] = name in found
+    return {name for name in names if not _installed_files[name]}
+
+
+def _image_exists(target: str, search_dirs: List[Path]) -> bool:
+    """Check whether an \\includegraphics target resolves the way graphicx would."""
+    for directory in search_dirs:
+        for extension in GRAPHICS_EXTENSIONS:
+            if (directory / f"{target}{extension}").is_file():
+                return True
+    return False
+
+
+def _image_file_names(target: str) -> List[str]:
+    """File names graphicx tries for an image, for a TeX tree lookup."""
+    if os.path.splitext(target)[1]:
+        return [target]
+    return [target + extension for extension in GRAPHICS_EXTENSIONS if extension]
+
+
+def lint_latex_content(
+    content: str,
+    base_dir=None,
+    check_packages: bool = True,
+    check_images: bool = True
+) -> Tuple[List[str], List[str]]:
+    """
+    Check in-memory LaTeX content for errors that would make pdflatex fail.
+    
+    Args:
+        content: LaTeX source
+        base_dir: Directory that local packages and relative image paths
+            resolve against
+        check_packages: Look up packages and the document class in base_dir
+            and the TeX installation
+        check_images: Check that \\includegraphics targets exist
+    
+    Returns:
+        Tuple of (errors, warnings), like latex_log.summarize_diagnostics
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+    lines = content.split("\n")
+    
+    def report(message: str, line: int) -> None:
+        source = lines[line - 1].strip() if 0 < line <= len(lines) else ""
+        errors.append(f"{message} l.{line} {source}".rstrip())
+    
+    braces: List[int] = []
+    environments: List[Tuple[str, int]] = []
+    packages: Dict[str, int] = {}
+    images: List[Tuple[str, int]] = []
+    graphics_paths: List[str] = []
+    line = 1
+    pos = 0
+    
+    while True:
+        match = TOKEN_PATTERN.search(content, pos)
+        if match is None:
+            break
+        token = match.group(0)
+        pos = match.end()
+        
+        if token == "\n":
+            line += 1
+        elif token == "{":
+            braces.append(line)
+        elif token == "}":
+            if braces:
+                braces.pop()
+            else:
+                report("! Too many }'s.", line)
+        elif token == "\\graphicspath":
+            argument = GRAPHICSPATH_PATTERN.match(content, pos)
+            if argument is not None:
+                graphics_paths.extend(re.findall(r"\{([^{}]*)\}", argument.group(1)))
+                line += argument.group(0).count("\n")
+                pos = argument.end()
+        elif token in ARGUMENT_COMMANDS:
+            argument = ARGUMENT_PATTERN.match(content, pos)
+            if argument is None:
+                continue
+            value = argument.group(1).strip()
+            line += argument.group(0).count("\n")
+            pos = argument.end()
+            
+            if token == "\\begin":
+                if value in VERBATIM_ENVIRONMENTS:
+                    # Skip the contents, which may hold unbalanced braces
+                    end = content.find(f"\\end{{{value}}}", pos)
+                    if end == -1:
+                        report(f"! LaTeX Error: \\begin{{{value}}} on input line {line} is never ended.", line)
+                        break
+                    line += content.count("\n", pos, end)
+                    pos = end + len(f"\\end{{{value}}}")
+                else:
+                    environments.append((value, line))
+            elif token == "\\end":
+                if not environments:
+                    report(f"! LaTeX Error: \\end{{{value}}} without matching \\begin.", line)
+                else:
+                    name, opened = environments.pop()
+                    if name != value:
+                        report(
+                            f"! LaTeX Error: \\begin{{{name}}} on input line {opened} "
+                            f"ended by \\end{{{value}}}.",
+                            line
+                        )
+                if value == "document":
+                    # pdflatex stops reading here
+                    break
+            elif token == "\\documentclass":
+                packages.setdefault(f"{value}.cls", line)
+            elif token in PACKAGE_COMMANDS:
+                for name in value.split(","):
+                    name = name.strip()
+                    if name:
+                        packages.setdefault(f"{name}.sty", line)
+            elif token == "\\includegraphics":
+                images.append((value, line))
+    
+    for opened in braces:
+        report("! File ended while scanning use of a group: { is never closed.", opened)
+    for name, opened in environments:
+        report(f"! LaTeX Error: \\begin{{{name}}} on input line {opened} ended by end of file.", opened)
+    
+    if check_packages and packages:
+        missing = find_missing_tex_files(packages, base_dir)
+        if missing is None:
+            warnings.append("Package check skipped: kpsewhich not found")
+        else:
+            for name in sorted(missing, key=packages.get):
+                report(f"! LaTeX Error: File `{name}' not found.", packages[name])
+    
+    if check_images and images:
+        base = Path(base_dir) if base_dir else Path.cwd()
+        search_dirs = [base] + [base / path for path in graphics_paths]
+        unresolved = []
+        for target, image_line in images:
+            if "\\" in target or "#" in target or target.startswith('"'):
+                # Built from macros; only pdflatex can resolve it
+                continue
+            if not _image_exists(target, search_dirs):
+                unresolved.append((target, image_line))
+        
+        # Images such as mwe's example-image live in the TeX tree
+        candidates = {target: _image_file_names(target) for target, _ in unresolved}
+        missing = None
+        if candidates:
+            missing = find_missing_tex_files(
+                {name for names in candidates.values() for name in names}, base_dir
+            )
+        for target, image_line in unresolved:
+            if missing is None:
+                warnings.append(f"Image check skipped for `{target}': kpsewhich not found")
+            elif all(name in missing for name in candidates[target]):
+                report(f"! LaTeX Error: File `{target}' not found.", image_line)
+    
+    return errors, warnings
+
+
+def lint_latex_file(tex_path, check_packages: bool = True, check_images: bool = True) -> Tuple[List[str], List[str]]:
+    """Check a LaTeX file; images resolve against the file's directory."""
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as file:
+        content = file.read()
+    return lint_latex_content(
+        content, Path(tex_path).resolve().parent, check_packages, check_images
+    )
@@ -0,0 +1,254 @@
+"""
+Streaming parser for pdflatex logs and terminal output.
+
+The parser consumes text line by line, either from a log file or from
+pdflatex's stdout as it arrives. It yields structured diagnostics carrying
+the severity, message, source file and line. It accounts for the way TeX
+writes logs:
+
+- Lines are hard-wrapped at 79 columns (``max_print_line``), so wrapped
+  pieces are joined before matching.
+- The file being read is shown by ``(./file.tex`` ... ``)`` nesting, which
+  is tracked to attribute each diagnostic to a file.
+- An error starts with ``!`` (or ``file:line:`` with -file-line-error), and
+  its source line follows later as ``l.N <context>``.
+
+Because the parser is incremental, a caller can react to the first error as
+soon as pdflatex prints it. The patterns are compiled once at import time.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+SEVERITY_ERROR = "error"
+SEVERITY_WARNING = "warning"
+SEVERITY_BADBOX = "badbox"
+
+# TeX's default max_print_line: longer lines continue on the next one
+LOG_LINE_WIDTH = 79
+
+ERROR_PATTERN = re.compile(r"^! (.*)$")
+FILE_LINE_ERROR_PATTERN = re.compile(r"^(\S.*?\.[A-Za-z]+):(\d+): (.*)$")
+CONTEXT_PATTERN = re.compile(r"^l\.(\d+) ?(.*)$")
+WARNING_PATTERN = re.compile(
+    r"^(?:LaTeX|LaTeX Font|pdfTeX|(?:Package|Class) [\w.-]+) [Ww]arning: (.*)$"
+)
+BADBOX_PATTERN = re.compile(r"^(?:Over|Under)full \\[hv]box .*?(?:lines? (\d+)|$)")
+INPUT_LINE_PATTERN = re.compile(r"on input line (\d+)\.?")
+# A continuation line of a package message, e.g. "(hyperref)   more text"
+CONTINUATION_PATTERN = re.compile(r"^\([\w.-]+\)\s+(.*)$")
+FILE_PAREN_PATTERN = re.compile(r"\((\"[^\"]+\"|[^\s()\"]*)|\)")
+
+# Give up waiting for an error's l.N line after this many lines
+MAX_ERROR_CONTEXT_LINES = 12
+
+
+@dataclass
+class LatexDiagnostic:
+    """One error, warning or bad box reported by pdflatex."""
+    severity: str
+    message: str
+    file: Optional[str] = None
+    line: Optional[int] = None
+    context: Optional[str] = None
+    
+    def __str__(self) -> str:
+        if self.severity == SEVERITY_ERROR:
+            text = f"! {self.message}"
+            if self.line is not None:
+                text += f" l.{self.line}"
+                if self.context:
+                    text += f" {self.context}"
+            return text
+        return self.message
+
+
+class LatexLogParser:
+    """
+    Incremental pdflatex log parser.
+    
+    Feed it text in any chunks with :meth:`feed`, which returns the
+    diagnostics completed by that chunk; :meth:`close` flushes the rest.
+    """
+    
+    def __init__(self, line_width: int = LOG_LINE_WIDTH):
+        self.line_width = line_width
+        self.error_count = 0
+        self._partial = ""
+        self._wrapped: Optional[str] = None
+        self._files: List[Optional[str]] = []
+        self._error: Optional[LatexDiagnostic] = None
+        self._error_lines = 0
+        self._message: Optional[LatexDiagnostic] = None
+        self._after_context = False
+    
+    @property
+    def current_file(self) -> Optional[str]:
+        """The file pdflatex is currently reading, as far as the log shows."""
+        for name in reversed(self._files):
+            if name:
+                return name
+        return None
+    
+    def feed(self, text: str) -> List[LatexDiagnostic]:
+        """Parse a chunk of log text and return the diagnostics it completed."""
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        found: List[LatexDiagnostic] = []
+        for line in lines:
+            found.extend(self._physical_line(line.rstrip("\r")))
+        return found
+    
+    def close(self) -> List[LatexDiagnostic]:
+        """Flush buffered text at the end of the log."""
+        found: List[LatexDiagnostic] = []
+        if self._partial:
+            found.extend(self._physical_line(self._partial))
+            self._partial = ""
+        if self._wrapped is not None:
+            line, self._wrapped = self._wrapped, None
+            found.extend(self._logical_line(line))
+        found.extend(self._flush())
+        return found
+    
+    def _physical_line(self, line: str) -> List[LatexDiagnostic]:
+        """Join lines TeX wrapped at the log width, then parse whole lines."""
+        if self._wrapped is not None:
+            if ERROR_PATTERN.match(line):
+                # An error never continues a wrapped line
+                found = self._logical_line(self._wrapped)
+                self._wrapped = None
+                return found + self._physical_line(line)
+            line = self._wrapped + line
+            self._wrapped = None
+        if len(line) >= self.line_width and len(line) % self.line_width == 0:
+            self._wrapped = line
+            return []
+        return self._logical_line(line)
+    
+    def _logical_line(self, line: str) -> List[LatexDiagnostic]:
+        found: List[LatexDiagnostic] = []
+        
+        if self._after_context:
+            # The rest of the source line TeX shows after l.N
+            self._after_context = False
+            if line.startswith(" "):
+                return found
+        
+        if self._error is not None:
+            context = CONTEXT_PATTERN.match(line)
+            if context:
+                if self._error.line is None:
+                    self._error.line = int(context.group(1))
+                self._error.context = context.group(2).strip() or None
+                self._after_context = True
+                return self._flush()
+            self._error_lines += 1
+            if ERROR_PATTERN.match(line) or FILE_LINE_ERROR_PATTERN.match(line):
+                found.extend(self._flush())
+            elif self._error_lines > MAX_ERROR_CONTEXT_LINES:
+                found.extend(self._flush())
+            else:
+                continuation = CONTINUATION_PATTERN.match(line)
+                if continuation and self._error_lines <= 2:
+                    self._error.message += " " + continuation.group(1).strip()
+                return found
+        
+        if self._message is not None:
+            continuation = CONTINUATION_PATTERN.match(line)
+            if continuation:
+                self._message.message += " " + continuation.group(1).strip()
+                self._set_input_line(self._message)
+                return found
+            found.extend(self._flush())
+        
+        error = ERROR_PATTERN.match(line)
+        if error:
+            self._start_error(LatexDiagnostic(SEVERITY_ERROR, error.group(1).strip(), self.current_file))
+            return found
+        error = FILE_LINE_ERROR_PATTERN.match(line)
+        if error:
+            self._start_error(LatexDiagnostic(
+                SEVERITY_ERROR, error.group(3).strip(), error.group(1), int(error.group(2))
+            ))
+            return found
+        
+        warning = WARNING_PATTERN.match(line)
+        if warning:
+            self._message = LatexDiagnostic(SEVERITY_WARNING, line.strip(), self.current_file)
+            self._set_input_line(self._message)
+            return found
+        
+        badbox = BADBOX_PATTERN.match(line)
+        if badbox:
+            line_number = int(badbox.group(1)) if badbox.group(1) else None
+            found.append(LatexDiagnostic(SEVERITY_BADBOX, line.strip(), self.current_file, line_number))
+            return found
+        
+        self._track_files(line)
+        return found
+    
+    def _start_error(self, diagnostic: LatexDiagnostic) -> None:
+        self.error_count += 1
+        self._error = diagnostic
+        self._error_lines = 0
+    
+    def _flush(self) -> List[LatexDiagnostic]:
+        """Emit the diagnostic being assembled, if any."""
+        found = [diagnostic for diagnostic in (self._error, self._message) if diagnostic is not None]
+        self._error = self._message = None
+        return found
+    
+    @staticmethod
+    def _set_input_line(diagnostic: LatexDiagnostic) -> None:
+        match = INPUT_LINE_PATTERN.search(diagnostic.message)
+        if match:
+            diagnostic.line = int(match.group(1))
+    
+    def _track_files(self, line: str) -> None:
+        """Follow TeX's (file ... ) nesting to know which file is being read."""
+        for match in FILE_PAREN_PATTERN.finditer(line):
+            if match.group(0) == ")":
+                if self._files:
+                    self._files.pop()
+            else:
+                name = match.group(1).strip('"')
+                is_file = "." in name or "/" in name or "\\" in name
+                self._files.append(name if is_file else None)
+
+
+def iter_latex_log(lines: Iterable[str], line_width: int = LOG_LINE_WIDTH) -> Iterator[LatexDiagnostic]:
+    """Parse log lines lazily, yielding diagnostics as they complete."""
+    parser = LatexLogParser(line_width)
+    for line in lines:
+        yield from parser.feed(line if line.endswith("\n") else line + "\n")
+    yield from parser.close()
+
+
+def parse_latex_log(text: str) -> List[LatexDiagnostic]:
+    """Parse a whole log or pdflatex stdout held in memory."""
+    parser = LatexLogParser()
+    return parser.feed(text) + parser.close()
+
+
+def parse_latex_log_file(log_path) -> List[LatexDiagnostic]:
+    """Parse a .log file, streaming it rather than loading it whole."""
+    with open(log_path, "r", encoding="utf-8", errors="replace") as file:
+        return list(iter_latex_log(file))
+
+
+def summarize_diagnostics(diagnostics: Iterable[LatexDiagnostic]) -> Tuple[List[str], List[str]]:
+    """
+    Reduce diagnostics to (errors, warnings) message lists.
+    
+    This is the shape stored on conversion results; bad boxes are left out.
+    """
+    errors: List[str] = []
+    warnings: List[str] = []
+    for diagnostic in diagnostics:
+        if diagnostic.severity == SEVERITY_ERROR:
+            errors.append(str(diagnostic))
+        elif diagnostic.severity == SEVERITY_WARNING:
+            warnings.append(str(diagnostic))
+    return errors, warnings
@@ -1,22 +1,46 @@
+import hashlib
 import subprocess
 import sys
 import os
 import re
+import threading
+import time
+
+try:
+    from .compile_cache import compile_cache_key, compile_cache_key_for_file, get_compile_cache
+    from .latex_format import find_format_for_content, find_format_for_file, pdflatex_command
+    from .latex_lint import lint_latex_content, lint_latex_file
+    from .latex_log import SEVERITY_ERROR, LatexLogParser
+    from .sandbox import ResourceLimitExceeded, exceeded_limit, limited_command
+    from .tex_index import find_tex_file, get_tex_index, is_tex_file_installed
+except ImportError:
+    # Allow running this module directly as a script
+    from compile_cache import compile_cache_key, compile_cache_key_for_file, get_compile_cache
+    from latex_format import find_format_for_content, find_format_for_file, pdflatex_command
+    from latex_lint import lint_latex_content, lint_latex_file
+    from latex_log import SEVERITY_ERROR, LatexLogParser
+    from sandbox import ResourceLimitExceeded, exceeded_limit, limited_command
+    from tex_index import find_tex_file, get_tex_index, is_tex_file_installed
+
+DOCUMENTCLASS_PATTERN = re.compile(r"\\documentclass(\[.*?\])?\{.*?\}")
+
+# Commands whose output depends on a previous pass (auxiliary files)
+CROSS_REFERENCE_PATTERN = re.compile(
+    r"\\(?:ref|pageref|eqref|autoref|[cC]ref|cite|tableofcontents|listoffigures|listoftables)\b"
+)
+RERUN_PATTERN = re.compile(
+    r"Rerun to get|Label\(s\) may have changed|Please rerun LaTeX|Rerun LaTeX"
+)
+AUXILIARY_EXTENSIONS = (".aux", ".toc", ".out", ".lof", ".lot")
+MAX_LATEX_PASSES = 4
+# The error rate is only judged once a pass has run this long (seconds)
+ERROR_RATE_GRACE = 1.0
 
 
 def check_pdflatex_installed():
     """Check if pdflatex is installed and available."""
-    try:
-        result = subprocess.run(
-            ["pdflatex", "--version"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding='utf-8',
-            errors='replace'
-        )
-        return result.returncode == 0
-    except FileNotFoundError:
-        return False
+    # Answered from the persisted TeX index instead of running pdflatex
+    return get_tex_index().pdflatex_path is not None
 
 
 def check_latex_structure(tex_path):
@@ -24,52 +48,78 @@ def check_latex_structure(tex_path):
     Check if the LaTeX file has the required structure.
     Returns a tuple: (has_documentclass, has_begin_document, has_end_document)
     """
-    with open(tex_path, "r", encoding="utf-8") as file:
-        content = file.read()
+    has_documentclass = has_begin_document = has_end_document = False
 
-    has_documentclass = bool(re.search(r"\\documentclass(\[.*?\])?\{.*?\}", content))
-    has_begin_document = "\\begin{document}" in content
-    has_end_document = "\\end{document}" in content
+    # Scan line by line so very large files are never loaded whole
+    with open(tex_path, "r", encoding="utf-8") as file:
+        for line in file:
+            if not has_documentclass and DOCUMENTCLASS_PATTERN.search(line):
+                has_documentclass = True
+            if not has_begin_document and "\\begin{document}" in line:
+                has_begin_document = True
+            if not has_end_document and "\\end{document}" in line:
+                has_end_document = True
 
     return has_documentclass, has_begin_document, has_end_document
 
 
-def fix_latex_structure(tex_path, backup=True):
+def check_latex_content(content):
     """
-    Attempt to fix common LaTeX structure issues by adding missing elements.
-    Creates a backup of the original file if backup=True.
+    Check if in-memory LaTeX content has the required structure.
+    Returns a tuple: (has_documentclass, has_begin_document, has_end_document)
     """
-    if backup:
-        backup_path = f"{tex_path}.bak"
-        os.rename(tex_path, backup_path)
-        with open(backup_path, "r", encoding="utf-8") as file:
-            content = file.read()
-    else:
-        with open(tex_path, "r", encoding="utf-8") as file:
-            content = file.read()
-
-    has_documentclass, has_begin_document, has_end_document = check_latex_structure(
-        backup_path if backup else tex_path
+    return (
+        DOCUMENTCLASS_PATTERN.search(content) is not None,
+        "\\begin{document}" in content,
+        "\\end{document}" in content,
     )
 
+
+def fix_latex_content(content):
+    """
+    Add missing structural elements to in-memory LaTeX content.
+    Returns a tuple: (fixed_content, changed)
+    """
+    has_documentclass, has_begin_document, has_end_document = check_latex_content(content)
+    if has_documentclass and has_begin_document and has_end_document:
+        return content, False
+
     # Add missing structure
     if not has_documentclass:
-        content = "\\documentclass{article}\\n\\n" + content
+        content = "\\documentclass{article}\n\n" + content
 
     if not has_begin_document:
         # Add begin{document} after the preamble (after last \usepackage or \documentclass)
         preamble_end = max(
             content.rfind("\\documentclass"), content.rfind("\\usepackage")
         )
-        if preamble_end > -1:
-            content = content[:preamble_end] + content[preamble_end:].replace(
-                "\\n", "\\n\\n\\begin{document}\\n", 1
-            )
+        line_end = content.find("\n", preamble_end)
+        if line_end == -1:
+            content += "\n\n\\begin{document}\n"
         else:
-            content = "\\begin{document}\\n" + content
+            content = content[:line_end] + "\n\n\\begin{document}" + content[line_end:]
 
     if not has_end_document:
-        content += "\\n\\end{document}"
+        content += "\n\\end{document}\n"
+
+    return content, True
+
+
+def fix_latex_structure(tex_path, backup=True):
+    """
+    Attempt to fix common LaTeX structure issues by adding missing elements.
+    Creates a backup of the original file if backup=True.
+    """
+    with open(tex_path, "r", encoding="utf-8") as file:
+        content = file.read()
+
+    content, changed = fix_latex_content(content)
+    if not changed:
+        return True
+
+    if backup:
+        backup_path = f"{tex_path}.bak"
+        os.replace(tex_path, backup_path)
 
     # Write the fixed content
     with open(tex_path, "w", encoding="utf-8") as file:
@@ -81,27 +131,267 @@ def fix_latex_structure(tex_path, backup=True):
     return True
 
 
-def latex_to_pdf(tex_path, auto_fix=False):
+def needs_multiple_passes(tex_path):
+    """
+    Check whether a LaTeX file uses anything that is resolved on a later pass:
+    references, citations, lists of contents or hyperref bookmarks.
+    """
+    uses_hyperref = has_sections = False
+    with open(tex_path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            if CROSS_REFERENCE_PATTERN.search(line):
+                return True
+            uses_hyperref = uses_hyperref or "{hyperref}" in line
+            has_sections = has_sections or "\\section" in line
+            if uses_hyperref and has_sections:
+                return True
+    return False
+
+
+def _hash_auxiliary_files(base_path):
+    """Hash the auxiliary files pdflatex wrote next to a job."""
+    hashes = {}
+    for extension in AUXILIARY_EXTENSIONS:
+        try:
+            with open(base_path + extension, "rb") as file:
+                hashes[extension] = hashlib.sha1(file.read()).hexdigest()
+        except FileNotFoundError:
+            continue
+    return hashes
+
+
+def _log_requests_rerun(log_path):
+    """Scan a pdflatex log for a request to run again."""
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as file:
+            return any(RERUN_PATTERN.search(line) for line in file)
+    except FileNotFoundError:
+        return False
+
+
+def _run_pass(command, work_dir, env, timeout, max_errors, max_error_rate, limits=None):
+    """
+    Run one pdflatex pass, parsing its output as it is printed.
+
+    The process is killed once max_errors errors were printed, or once more
+    than max_error_rate errors per second were printed (judged after
+    ERROR_RATE_GRACE seconds). Returns a dict with returncode, stdout,
+    stderr, aborted and diagnostics. Raises subprocess.TimeoutExpired if
+    the pass exceeds timeout and ResourceLimitExceeded if it was stopped by
+    one of its limits.
+    """
+    process = subprocess.Popen(
+        limited_command(command, limits, env),
+        cwd=work_dir,
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        encoding='utf-8',
+        errors='replace'
+    )
+    # stderr is drained on the side so neither pipe can fill up and block
+    stderr = []
+    stderr_reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    stderr_reader.start()
+    timed_out = threading.Event()
+
+    def expire():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, expire) if timeout else None
+    if timer:
+        timer.start()
+
+    parser = LatexLogParser()
+    diagnostics = []
+    stdout = []
+    error_count = 0
+    aborted = False
+    started = time.monotonic()
+    try:
+        for line in process.stdout:
+            stdout.append(line)
+            found = parser.feed(line)
+            if not found:
+                continue
+            diagnostics.extend(found)
+            # Errors count once complete, so the l.N source line is included
+            error_count += sum(1 for diagnostic in found if diagnostic.severity == SEVERITY_ERROR)
+            if max_errors and error_count >= max_errors:
+                aborted = True
+            elif max_error_rate and error_count > 1:
+                elapsed = time.monotonic() - started
+                aborted = elapsed >= ERROR_RATE_GRACE and error_count / elapsed > max_error_rate
+            if aborted:
+                process.kill()
+                break
+        process.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        process.stdout.close()
+        stderr_reader.join()
+        process.stderr.close()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(command, timeout, "".join(stdout), "".join(stderr))
+
+    if not aborted:
+        limit = exceeded_limit(limits, process.returncode, "".join(stdout + stderr))
+        if limit:
+            raise ResourceLimitExceeded(limit)
+
+    diagnostics.extend(parser.close())
+    return {
+        "returncode": process.returncode,
+        "stdout": "".join(stdout),
+        "stderr": "".join(stderr),
+        "aborted": aborted,
+        "diagnostics": diagnostics,
+    }
+
+
+def run_pdflatex(tex_path, format_path=None, max_passes=MAX_LATEX_PASSES, timeout=None,
+                 env=None, max_errors=None, max_error_rate=None, limits=None):
+    """
+    Run pdflatex as many times as the document needs, latexmk style.
+
+    pdflatex runs in the directory of the file, so relative image paths and
+    output files resolve next to it. Documents with cross-references start
+    with a -draftmode pass that only writes auxiliary files, unless an .aux
+    from an earlier compile is already there. Another pass runs only while
+    the .aux/.toc/.out/.lof/.lot files change or the log asks for a rerun,
+    up to max_passes.
+
+    env, if given, holds extra environment variables such as TEXINPUTS.
+
+    In nonstopmode a broken document can go on through thousands of
+    cascading errors. With max_errors or max_error_rate (errors per second)
+    set, output is parsed while pdflatex prints it and the run is killed as
+    soon as the limit is reached. The .log file is then incomplete, so the
+    diagnostics collected from the output are returned instead.
+
+    limits, a sandbox.ResourceLimits, caps the CPU time, memory, output file
+    size and open files of each pass.
+
+    Returns a dict with success, returncode, passes, stdout and stderr of the
+    last run, aborted and the parsed diagnostics. Raises
+    subprocess.TimeoutExpired if a pass exceeds timeout and
+    sandbox.ResourceLimitExceeded if a pass hits one of its limits.
+    """
+    tex_path = os.path.abspath(tex_path)
+    work_dir, tex_name = os.path.split(tex_path)
+    base_path = os.path.splitext(tex_path)[0]
+
+    # Auxiliary files are only compared for documents that read them back;
+    # others run once unless the log asks for a rerun
+    track_auxiliary = needs_multiple_passes(tex_path)
+    # A warm .aux usually makes the first full pass correct already
+    draft = max_passes > 1 and track_auxiliary and not os.path.exists(base_path + ".aux")
+    hashes = _hash_auxiliary_files(base_path)
+    process_env = {**os.environ, **env} if env else None
+    passes = 0
+
+    while True:
+        passes += 1
+        mode = ", draft" if draft else ""
+        print(f"Running pdflatex (pass {passes}{mode})...")
+        result = _run_pass(
+            pdflatex_command(tex_name, format_path, ["-draftmode"] if draft else []),
+            work_dir,
+            process_env,
+            timeout,
+            max_errors,
+            max_error_rate,
+            limits
+        )
+        if result["aborted"]:
+            print("Stopped pdflatex early: error limit reached")
+            break
+        if result["returncode"] != 0:
+            break
+
+        new_hashes = _hash_auxiliary_files(base_path)
+        rerun = (
+            draft
+            or (track_auxiliary and new_hashes != hashes)
+            or _log_requests_rerun(base_path + ".log")
+        )
+        hashes = new_hashes
+        draft = False
+
+        if not rerun:
+            break
+        if passes >= max_passes:
+            print(f"Stopping after {passes} passes; references may be unresolved")
+            break
+
+    return {
+        "success": result["returncode"] == 0 and not result["aborted"],
+        "returncode": result["returncode"],
+        "passes": passes,
+        "stdout": result["stdout"],
+        "stderr": result["stderr"],
+        "aborted": result["aborted"],
+        "diagnostics": result["diagnostics"],
+    }
+
+
+def _report_structure_issues(structure):
+    """Print which structural elements are missing."""
+    has_documentclass, has_begin_document, has_end_document = structure
+    print("LaTeX file appears to have structural issues:")
+    if not has_documentclass:
+        print("- Missing \\documentclass declaration")
+    if not has_begin_document:
+        print("- Missing \\begin{document}")
+    if not has_end_document:
+        print("- Missing \\end{document}")
+
+
+def _report_preflight_errors(errors):
+    """Print the errors that stopped a compile before pdflatex ran."""
+    print("\nLaTeX Errors Found (pre-flight check, pdflatex was not run):")
+    for error in errors:
+        print(error)
+
+
+def latex_to_pdf(tex_path, auto_fix=False, use_format=True, max_passes=MAX_LATEX_PASSES,
+                 use_cache=True, preflight=True, max_errors=None, limits=None):
     """
     Convert LaTeX file to PDF using pdflatex.
     If auto_fix is True, attempts to fix common structure issues.
+    If use_format is True, compiles against a precompiled format for the
+    preamble when one is available (see latex_format).
+    pdflatex is rerun only while references change, up to max_passes.
+    If use_cache is True, identical sources are served from the compile cache.
+    If preflight is True, sources with unbalanced braces or environments,
+    missing packages or missing images fail without running pdflatex.
+    If max_errors is set, pdflatex is stopped after that many errors instead
+    of running on through the rest of the document.
+    limits (a sandbox.ResourceLimits) caps the resources pdflatex may use.
     """
     if not os.path.isfile(tex_path):
         print(f"File not found: {tex_path}")
         return False
 
+    pdf_path = f"{os.path.splitext(tex_path)[0]}.pdf"
+
+    # The key is taken before auto_fix rewrites the file
+    cache_key = compile_cache_key_for_file(tex_path, auto_fix) if use_cache else None
+    if cache_key and get_compile_cache().fetch(cache_key, pdf_path):
+        print(f"PDF served from compile cache: {pdf_path}")
+        return True
+
     # Check LaTeX structure
-    has_documentclass, has_begin_document, has_end_document = check_latex_structure(
-        tex_path
-    )
-    if not all([has_documentclass, has_begin_document, has_end_document]):
-        print("LaTeX file appears to have structural issues:")
-        if not has_documentclass:
-            print("- Missing \\documentclass declaration")
-        if not has_begin_document:
-            print("- Missing \\begin{document}")
-        if not has_end_document:
-            print("- Missing \\end{document}")
+    structure = check_latex_structure(tex_path)
+    if not all(structure):
+        _report_structure_issues(structure)
 
         if auto_fix:
             print("Attempting to fix structure issues...")
@@ -110,36 +400,95 @@ def latex_to_pdf(tex_path, auto_fix=False):
             print("Run with --auto-fix option to attempt automatic repair")
             return False
 
-    # Run pdflatex twice for references and cross-references
-    for i in range(2):
-        print(f"Running pdflatex (pass {i+1}/2)...")
-        result = subprocess.run(
-            ["pdflatex", "-interaction=nonstopmode", tex_path],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            encoding='utf-8',
-            errors='replace'
-        )
-        if result.returncode != 0:
-            print("Error during pdflatex run:")
+    if preflight:
+        errors, _ = lint_latex_file(tex_path)
+        if errors:
+            _report_preflight_errors(errors)
+            return False
+
+    format_path = find_format_for_file(tex_path, limits=limits) if use_format else None
+    return _compile_tex_file(tex_path, format_path, cache_key, max_passes, max_errors, limits)
+
+
+def latex_content_to_pdf(content, tex_path, auto_fix=False, use_format=True,
+                         max_passes=MAX_LATEX_PASSES, use_cache=True, preflight=True,
+                         max_errors=None, limits=None):
+    """
+    Compile in-memory LaTeX content to a PDF next to tex_path.
+
+    Structure checks and fixes run on the string, and the .tex file is
+    written exactly once, right before pdflatex runs. Options are the same
+    as for latex_to_pdf.
+    """
+    pdf_path = f"{os.path.splitext(tex_path)[0]}.pdf"
+
+    cache_key = None
+    if use_cache:
+        base_dir = os.path.dirname(os.path.abspath(tex_path))
+        cache_key = compile_cache_key(content.splitlines(), auto_fix, base_dir)
+        if get_compile_cache().fetch(cache_key, pdf_path):
+            with open(tex_path, "w", encoding="utf-8") as file:
+                file.write(content)
+            print(f"PDF served from compile cache: {pdf_path}")
+            return True
+
+    structure = check_latex_content(content)
+    if not all(structure):
+        _report_structure_issues(structure)
 
-            # Extract and display specific LaTeX errors
-            output = result.stdout
-            errors = re.findall(r"! (.*?)\.[\r\n]l\.(\d+)", output)
+        if not auto_fix:
+            print("Run with --auto-fix option to attempt automatic repair")
+            return False
+        print("Attempting to fix structure issues...")
+        content, _ = fix_latex_content(content)
 
-            if errors:
-                print("\nLaTeX Errors Found:")
-                for err, line in errors:
-                    print(f"Line {line}: {err}")
-                print("\nFull output:")
+    with open(tex_path, "w", encoding="utf-8") as file:
+        file.write(content)
 
-            print(output)
-            print(result.stderr)
+    if preflight:
+        errors, _ = lint_latex_content(content, os.path.dirname(os.path.abspath(tex_path)))
+        if errors:
+            _report_preflight_errors(errors)
             return False
 
+    format_path = find_format_for_content(content, limits=limits) if use_format else None
+    return _compile_tex_file(tex_path, format_path, cache_key, max_passes, max_errors, limits)
+
+
+def _compile_tex_file(tex_path, format_path, cache_key, max_passes, max_errors=None, limits=None):
+    """Run pdflatex on a prepared file, report errors and fill the cache."""
     pdf_path = f"{os.path.splitext(tex_path)[0]}.pdf"
+    if format_path:
+        print(f"Using precompiled format: {format_path}")
+
+    try:
+        result = run_pdflatex(tex_path, format_path, max_passes=max_passes,
+                              max_errors=max_errors, limits=limits)
+    except ResourceLimitExceeded as e:
+        print(f"pdflatex was stopped: {e}")
+        return False
+    if not result["success"]:
+        print("Error during pdflatex run:")
+
+        # Extract and display specific LaTeX errors
+        output = result["stdout"]
+        errors = [diagnostic for diagnostic in result["diagnostics"]
+                  if diagnostic.severity == SEVERITY_ERROR]
+
+        if errors:
+            print("\nLaTeX Errors Found:")
+            for error in errors:
+                print(f"Line {error.line}: {error.message}" if error.line else error.message)
+            print("\nFull output:")
+
+        print(output)
+        print(result["stderr"])
+        return False
+
     if os.path.isfile(pdf_path):
         print(f"PDF generated successfully: {pdf_path}")
+        if cache_key:
+            get_compile_cache().put(cache_key, pdf_path)
         return True
     else:
         print(f"PDF generation failed: {pdf_path} not found")
@@ -0,0 +1,414 @@
+"""
+Shared Markdown parser producing a compact block tree.
+
+The LaTeX, HTML and DOCX converters all walk the blocks produced here, so a
+document only has to be parsed once no matter how many formats it is rendered
+to. Parsing is line driven and incremental: ``iter_blocks`` yields each block
+as soon as it is closed, which keeps memory bounded by the largest single block.
+Inline text inside blocks is tokenized by ``iter_inline`` in a single
+left-to-right pass that every backend renders from. Streaming consumers can ask
+for long tables to be split into chunks of rows so that no block is unbounded.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import ClassVar, Dict, Iterable, Iterator, List, NamedTuple, Optional, Union
+
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+FENCE_PATTERN = re.compile(r'^\s*```\s*([^`\s]*)')
+IMAGE_PATTERN = re.compile(r'!\[(.*?)\]\((.*?)\)')
+IMAGE_LINE_PATTERN = re.compile(r'^\s*(?:!\[.*?\]\(.*?\)\s*)+$')
+ORDERED_ITEM_PATTERN = re.compile(r'^(\s*)\d+[.)]\s+(.*)$')
+UNORDERED_ITEM_PATTERN = re.compile(r'^(\s*)[-*+]\s+(.*)$')
+TABLE_SEPARATOR_PATTERN = re.compile(r'^\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?$')
+
+INLINE_SPECIAL_PATTERN = re.compile(r'[`*_\[!\\]')
+INLINE_LINK_PATTERN = re.compile(r'\[([^\]]*)\]\(\s*([^)\s]*)(?:\s+"[^"]*")?\s*\)')
+INLINE_IMAGE_PATTERN = re.compile(r'!\[([^\]]*)\]\(\s*([^)\s]*)(?:\s+"[^"]*")?\s*\)')
+ESCAPABLE_CHARACTERS = frozenset('\\`*_{}[]()#+-.!|>~<$%&^')
+
+
+@dataclass
+class Heading:
+    kind: ClassVar[str] = "heading"
+    level: int
+    text: str
+
+
+@dataclass
+class Paragraph:
+    kind: ClassVar[str] = "paragraph"
+    text: str
+
+
+@dataclass
+class Image:
+    kind: ClassVar[str] = "image"
+    alt: str
+    path: str
+
+
+@dataclass
+class CodeBlock:
+    kind: ClassVar[str] = "code"
+    language: str
+    lines: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Table:
+    kind: ClassVar[str] = "table"
+    header: List[str]
+    rows: List[List[str]] = field(default_factory=list)
+    # Chunked tables: the header went out with an earlier chunk / later
+    # chunks carry more rows of the same table
+    continued: bool = False
+    more: bool = False
+
+
+@dataclass
+class BlockQuote:
+    kind: ClassVar[str] = "quote"
+    lines: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ListItem:
+    level: int
+    ordered: bool
+    text: str
+
+
+@dataclass
+class ListBlock:
+    kind: ClassVar[str] = "list"
+    items: List[ListItem] = field(default_factory=list)
+
+
+Block = Union[Heading, Paragraph, Image, CodeBlock, Table, BlockQuote, ListBlock]
+
+
+@dataclass
+class Document:
+    blocks: List[Block] = field(default_factory=list)
+    
+    def __iter__(self) -> Iterator[Block]:
+        return iter(self.blocks)
+
+
+def split_table_row(line: str) -> List[str]:
+    """Split a ``| a | b |`` table row into stripped cell strings."""
+    line = line.strip()
+    if line.startswith('|'):
+        line = line[1:]
+    if line.endswith('|'):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split('|')]
+
+
+class MarkdownParser:
+    """
+    Incremental line-based Markdown block parser.
+    
+    Feed lines with ``feed`` and collect finished blocks from its return value;
+    call ``close`` once the input is exhausted to flush the last open block.
+    With ``table_chunk_rows`` set, a table is emitted every that many rows as
+    a chunk marked ``more``, followed by chunks marked ``continued``.
+    """
+    
+    def __init__(self, table_chunk_rows: Optional[int] = None):
+        self.table_chunk_rows = table_chunk_rows
+        self._open: Optional[Block] = None
+        self._paragraph: List[str] = []
+        self._pending_table_header: Optional[str] = None
+    
+    def feed(self, line: str) -> List[Block]:
+        """Consume one source line and return any blocks it completed."""
+        line = line.rstrip('\r\n')
+        done: List[Block] = []
+        
+        if isinstance(self._open, CodeBlock):
+            if FENCE_PATTERN.match(line):
+                done.append(self._open)
+                self._open = None
+            else:
+                self._open.lines.append(line)
+            return done
+        
+        if self._pending_table_header is not None:
+            header, self._pending_table_header = self._pending_table_header, None
+            if TABLE_SEPARATOR_PATTERN.match(line.strip()):
+                self._close(done)
+                self._open = Table(header=split_table_row(header))
+                return done
+            self._handle_text(header, done)
+        
+        if isinstance(self._open, Table):
+            stripped = line.strip()
+            if stripped.startswith('|') and stripped.endswith('|'):
+                table = self._open
+                table.rows.append(split_table_row(stripped))
+                if self.table_chunk_rows and len(table.rows) >= self.table_chunk_rows:
+                    table.more = True
+                    done.append(table)
+                    self._open = Table(header=table.header, continued=True)
+                return done
+            self._close(done)
+        
+        if not line.strip():
+            self._close(done)
+            return done
+        
+        fence = FENCE_PATTERN.match(line)
+        if fence:
+            self._close(done)
+            self._open = CodeBlock(language=fence.group(1))
+            return done
+        
+        heading = HEADING_PATTERN.match(line)
+        if heading:
+            self._close(done)
+            done.append(Heading(level=len(heading.group(1)), text=heading.group(2)))
+            return done
+        
+        if IMAGE_LINE_PATTERN.match(line):
+            self._close(done)
+            done.extend(Image(alt=alt, path=path.strip()) for alt, path in IMAGE_PATTERN.findall(line))
+            return done
+        
+        if line.startswith('>'):
+            text = line[1:]
+            if text.startswith(' '):
+                text = text[1:]
+            if not isinstance(self._open, BlockQuote):
+                self._close(done)
+                self._open = BlockQuote()
+            self._open.lines.append(text)
+            return done
+        
+        item = self._match_list_item(line)
+        if item is not None:
+            if not isinstance(self._open, ListBlock):
+                self._close(done)
+                self._open = ListBlock()
+            self._open.items.append(item)
+            return done
+        
+        if '|' in line:
+            self._pending_table_header = line
+            return done
+        
+        self._handle_text(line, done)
+        return done
+    
+    def close(self) -> List[Block]:
+        """Flush and return any blocks still open at end of input."""
+        done: List[Block] = []
+        if self._pending_table_header is not None:
+            header, self._pending_table_header = self._pending_table_header, None
+            self._handle_text(header, done)
+        self._close(done)
+        return done
+    
+    @staticmethod
+    def _match_list_item(line: str) -> Optional[ListItem]:
+        match = ORDERED_ITEM_PATTERN.match(line)
+        ordered = match is not None
+        if not ordered:
+            match = UNORDERED_ITEM_PATTERN.match(line)
+        if match is None:
+            return None
+        indent = match.group(1).replace('\t', '    ')
+        return ListItem(level=len(indent) // 2, ordered=ordered, text=match.group(2))
+    
+    def _handle_text(self, line: str, done: List[Block]) -> None:
+        # Indented text directly after a list item continues that item
+        if isinstance(self._open, ListBlock) and line[:1].isspace():
+            last = self._open.items[-1]
+            last.text = f"{last.text} {line.strip()}"
+            return
+        if self._open is not None:
+            self._close(done)
+        self._paragraph.append(line.strip())
+    
+    def _close(self, done: List[Block]) -> None:
+        if self._paragraph:
+            done.append(Paragraph(text='\n'.join(self._paragraph)))
+            self._paragraph = []
+        if self._open is not None:
+            done.append(self._open)
+            self._open = None
+
+
+def iter_blocks(lines: Iterable[str], table_chunk_rows: Optional[int] = None) -> Iterator[Block]:
+    """
+    Parse Markdown lines incrementally, yielding each block once it closes.
+    
+    Args:
+        lines: Source lines (with or without trailing newlines)
+        table_chunk_rows: Split tables into chunks of at most this many rows
+    
+    Yields:
+        Parsed block nodes in document order
+    """
+    parser = MarkdownParser(table_chunk_rows)
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
+def parse_markdown(markdown_content: str) -> Document:
+    """
+    Parse Markdown content into a document tree.
+    
+    Args:
+        markdown_content: The Markdown source
+    
+    Returns:
+        Document holding the parsed blocks
+    """
+    return Document(blocks=list(iter_blocks(markdown_content.split('\n'))))
+
+
+class BlockVisitor:
+    """Base class for backends that render blocks via ``visit_<kind>`` methods."""
+    
+    def visit(self, block: Block):
+        return getattr(self, f"visit_{block.kind}")(block)
+
+
+class InlineToken(NamedTuple):
+    """
+    One event of the inline token stream.
+    
+    ``kind`` is one of ``text``, ``code``, ``image``, ``strong_open``,
+    ``strong_close``, ``em_open``, ``em_close``, ``link_open`` and
+    ``link_close``. Links and images carry their URL in ``target``.
+    """
+    kind: str
+    text: str = ''
+    target: str = ''
+
+
+# Shared open/close events per emphasis delimiter
+_EMPHASIS_OPEN = {
+    '*': InlineToken('em_open'),
+    '_': InlineToken('em_open'),
+    '**': InlineToken('strong_open'),
+    '__': InlineToken('strong_open'),
+}
+_EMPHASIS_CLOSE = {
+    '*': InlineToken('em_close'),
+    '_': InlineToken('em_close'),
+    '**': InlineToken('strong_close'),
+    '__': InlineToken('strong_close'),
+}
+_LINK_CLOSE = InlineToken('link_close')
+
+
+def iter_inline(text: str) -> Iterator[InlineToken]:
+    """
+    Tokenize inline Markdown (code spans, emphasis, links, images) in one pass.
+    
+    Plain text between markup is yielded unescaped as ``text`` tokens; each
+    backend applies its own escaping while rendering. Open and close events
+    are always balanced, even for malformed input.
+    """
+    length = len(text)
+    stack: List[str] = []
+    # Next known position of each delimiter, so closer lookups never rescan
+    next_delimiter: Dict[str, int] = {}
+    pos = buffer_start = 0
+    
+    def has_closer(delimiter: str, start: int) -> bool:
+        known = next_delimiter.get(delimiter)
+        if known is None or (known != -1 and known < start):
+            known = text.find(delimiter, start)
+            next_delimiter[delimiter] = known
+        return known != -1
+    
+    while True:
+        match = INLINE_SPECIAL_PATTERN.search(text, pos)
+        if match is None:
+            break
+        i = match.start()
+        char = text[i]
+        
+        if char == '\\':
+            if i + 1 < length and text[i + 1] in ESCAPABLE_CHARACTERS:
+                if buffer_start < i:
+                    yield InlineToken('text', text[buffer_start:i])
+                yield InlineToken('text', text[i + 1])
+                pos = buffer_start = i + 2
+            else:
+                pos = i + 1
+            continue
+        
+        if char == '`':
+            end = text.find('`', i + 1)
+            if end == -1:
+                pos = i + 1
+                continue
+            if buffer_start < i:
+                yield InlineToken('text', text[buffer_start:i])
+            yield InlineToken('code', text[i + 1:end])
+            pos = buffer_start = end + 1
+            continue
+        
+        if char == '!' or char == '[':
+            pattern = INLINE_IMAGE_PATTERN if char == '!' else INLINE_LINK_PATTERN
+            link = pattern.match(text, i)
+            if link is None:
+                pos = i + 1
+                continue
+            if buffer_start < i:
+                yield InlineToken('text', text[buffer_start:i])
+            if char == '!':
+                yield InlineToken('image', link.group(1), link.group(2))
+            else:
+                yield InlineToken('link_open', target=link.group(2))
+                yield from iter_inline(link.group(1))
+                yield _LINK_CLOSE
+            pos = buffer_start = link.end()
+            continue
+        
+        # Emphasis delimiter run of '*' or '_'
+        run_end = i + 1
+        if run_end < length and text[run_end] == char:
+            run_end += 1
+            while run_end < length and text[run_end] == char:
+                run_end += 1
+        before = text[i - 1] if i > 0 else ' '
+        after = text[run_end] if run_end < length else ' '
+        
+        if stack and stack[-1][0] == char and len(stack[-1]) <= run_end - i:
+            delimiter = stack[-1]
+            can_close = not before.isspace() and (char == '*' or not after.isalnum())
+            if can_close:
+                if buffer_start < i:
+                    yield InlineToken('text', text[buffer_start:i])
+                stack.pop()
+                yield _EMPHASIS_CLOSE[delimiter]
+                pos = buffer_start = i + len(delimiter)
+                continue
+        
+        delimiter = char * 2 if run_end - i >= 2 else char
+        end = i + len(delimiter)
+        can_open = (
+            end < length
+            and not text[end].isspace()
+            and (char == '*' or not before.isalnum())
+        )
+        if can_open and delimiter not in stack and has_closer(delimiter, end):
+            if buffer_start < i:
+                yield InlineToken('text', text[buffer_start:i])
+            stack.append(delimiter)
+            yield _EMPHASIS_OPEN[delimiter]
+            pos = buffer_start = end
+        else:
+            pos = end
+    
+    if buffer_start < length:
+        yield InlineToken('text', text[buffer_start:])
+    while stack:
+        yield _EMPHASIS_CLOSE[stack.pop()]
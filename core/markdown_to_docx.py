@@ -14,6 +14,20 @@ try:
 except ImportError:
     raise ImportError("python-docx is required for DOCX conversion. Install with: pip install python-docx")
 
+from .markdown_ast import (
+    BlockQuote,
+    BlockVisitor,
+    CodeBlock,
+    Heading,
+    Image,
+    ListBlock,
+    Paragraph,
+    Table,
+    iter_inline,
+    parse_markdown,
+)
+from .markdown_ast import Document as MarkdownDocument
+
 
 def convert_markdown_to_docx(markdown_content: str, output_path: Optional[str] = None) -> str:
     """
@@ -22,122 +36,33 @@ def convert_markdown_to_docx(markdown_content: str, output_path: Optional[str] =
     Args:
         markdown_content: The Markdown content to convert
         output_path: Path to save the DOCX output
-        
+    
     Returns:
         The DOCX content as bytes if no output_path, otherwise the output path
     """
-    doc = Document()
-    
-    # Process Markdown content line by line
-    lines = markdown_content.split('\n')
-    in_code_block = False
-    in_list = False
-    list_items = []
+    return docx_from_document(parse_markdown(markdown_content), output_path)
+
+
+def docx_from_document(
+    document: MarkdownDocument,
+    output_path: Optional[str] = None,
+    image_base_dir: Optional[Union[str, Path]] = None
+):
+    """
+    Render an already parsed Markdown document as DOCX.
     
-    i = 0
-    while i < len(lines):
-        line = lines[i].rstrip()
-        
-        # Skip empty lines unless we're in a code block
-        if not line and not in_code_block:
-            if in_list:
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-            i += 1
-            continue
-        
-        # Headers
-        if line.startswith('# '):
-            if in_list:
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-            heading = doc.add_heading(line[2:], level=1)
-            
-        elif line.startswith('## '):
-            if in_list:
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-            heading = doc.add_heading(line[3:], level=2)
-            
-        elif line.startswith('### '):
-            if in_list:
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-            heading = doc.add_heading(line[4:], level=3)
-        
-        # Images
-        elif '![' in line and '](' in line:
-            if in_list:
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-            
-            alt_text = re.search(r'!\[(.*?)\]', line)
-            image_path = re.search(r'\((.*?)\)', line)
-            
-            if alt_text and image_path:
-                alt_text = alt_text.group(1)
-                image_path = image_path.group(1)
-                
-                # Try to add image if file exists
-                if Path(image_path).exists():
-                    try:
-                        doc.add_picture(image_path, width=Inches(4))
-                        if alt_text:
-                            p = doc.add_paragraph()
-                            p.add_run(f"Figure: {alt_text}").italic = True
-                            p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-                    except Exception:
-                        # If image can't be added, add alt text
-                        doc.add_paragraph(f"[Image: {alt_text}]")
-                else:
-                    doc.add_paragraph(f"[Image: {alt_text} - {image_path}]")
-        
-        # Code blocks
-        elif line.startswith('```'):
-            if in_list:
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-                
-            if in_code_block:
-                in_code_block = False
-            else:
-                in_code_block = True
-        
-        # Lists
-        elif line.strip().startswith('- ') or line.strip().startswith('* '):
-            if not in_list:
-                in_list = True
-            list_items.append(line.strip()[2:])
-        
-        # Regular text or code content
-        else:
-            if in_list and not line.strip().startswith('- ') and not line.strip().startswith('* '):
-                _add_list_to_doc(doc, list_items)
-                list_items = []
-                in_list = False
-            
-            if in_code_block:
-                # Add code line with monospace font
-                p = doc.add_paragraph()
-                run = p.add_run(line)
-                run.font.name = 'Courier New'
-            elif line.strip():
-                # Regular paragraph with basic formatting
-                text = _process_inline_formatting(line)
-                if text.strip():
-                    _add_formatted_paragraph(doc, text)
-        
-        i += 1
+    Args:
+        document: Document tree produced by ``parse_markdown``
+        output_path: Path to save the DOCX output
+        image_base_dir: Directory relative image paths are resolved against
     
-    # Handle any remaining list items
-    if in_list and list_items:
-        _add_list_to_doc(doc, list_items)
+    Returns:
+        The output path if one was given, otherwise the python-docx Document
+    """
+    doc = Document()
+    emitter = DocxEmitter(doc, image_base_dir)
+    for block in document.blocks:
+        emitter.visit(block)
     
     # Save to file if output path provided
     if output_path:
@@ -147,6 +72,79 @@ def convert_markdown_to_docx(markdown_content: str, output_path: Optional[str] =
     return doc
 
 
+class DocxEmitter(BlockVisitor):
+    """Append Markdown blocks to a python-docx document."""
+    
+    # Built-in list styles of the default template, indexed by nesting level
+    BULLET_STYLES = ['List Bullet', 'List Bullet 2', 'List Bullet 3']
+    NUMBER_STYLES = ['List Number', 'List Number 2', 'List Number 3']
+    
+    def __init__(self, doc, image_base_dir: Optional[Union[str, Path]] = None):
+        self.doc = doc
+        self.image_base_dir = Path(image_base_dir) if image_base_dir else None
+    
+    def visit_heading(self, block: Heading) -> None:
+        heading = self.doc.add_heading('', level=block.level)
+        _add_formatted_text_to_paragraph(heading, block.text)
+    
+    def visit_paragraph(self, block: Paragraph) -> None:
+        text = _process_inline_formatting(block.text.replace('\n', ' '))
+        if text.strip():
+            _add_formatted_paragraph(self.doc, text)
+    
+    def visit_image(self, block: Image) -> None:
+        image_path = Path(block.path)
+        if self.image_base_dir and not image_path.is_absolute():
+            image_path = self.image_base_dir / image_path
+        
+        # Try to add image if file exists
+        if image_path.exists():
+            try:
+                self.doc.add_picture(str(image_path), width=Inches(4))
+                if block.alt:
+                    p = self.doc.add_paragraph()
+                    p.add_run(f"Figure: {block.alt}").italic = True
+                    p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+            except Exception:
+                # If image can't be added, add alt text
+                self.doc.add_paragraph(f"[Image: {block.alt}]")
+        else:
+            self.doc.add_paragraph(f"[Image: {block.alt} - {block.path}]")
+    
+    def visit_code(self, block: CodeBlock) -> None:
+        for line in block.lines:
+            # Add code line with monospace font
+            p = self.doc.add_paragraph()
+            run = p.add_run(line)
+            run.font.name = 'Courier New'
+    
+    def visit_table(self, block: Table) -> None:
+        num_cols = len(block.header)
+        table = self.doc.add_table(rows=1, cols=num_cols)
+        table.style = 'Table Grid'
+        for cell, text in zip(table.rows[0].cells, block.header):
+            cell.text = ''
+            run = cell.paragraphs[0].add_run(text)
+            run.bold = True
+        for row in block.rows:
+            cells = table.add_row().cells
+            for cell, text in zip(cells, row[:num_cols]):
+                cell.text = ''
+                _add_formatted_text_to_paragraph(cell.paragraphs[0], text)
+    
+    def visit_quote(self, block: BlockQuote) -> None:
+        p = self.doc.add_paragraph()
+        p.style = 'Quote'
+        _add_formatted_text_to_paragraph(p, ' '.join(line.strip() for line in block.lines))
+    
+    def visit_list(self, block: ListBlock) -> None:
+        for item in block.items:
+            styles = self.NUMBER_STYLES if item.ordered else self.BULLET_STYLES
+            p = self.doc.add_paragraph()
+            p.style = styles[min(item.level, len(styles) - 1)]
+            _add_formatted_text_to_paragraph(p, item.text)
+
+
 def _add_list_to_doc(doc, items):
     """Add a bulleted list to the document."""
     for item in items:
@@ -167,19 +165,31 @@ def _add_formatted_paragraph(doc, text: str):
 
 
 def _add_formatted_text_to_paragraph(paragraph, text: str):
-    """Add formatted text to a paragraph, handling bold and italic."""
-    # Simple implementation - can be enhanced for more complex formatting
-    parts = re.split(r'(\*\*.*?\*\*|\*.*?\*)', text)
-    
-    for part in parts:
-        if part.startswith('**') and part.endswith('**'):
-            # Bold text
-            run = paragraph.add_run(part[2:-2])
-            run.bold = True
-        elif part.startswith('*') and part.endswith('*'):
-            # Italic text
-            run = paragraph.add_run(part[1:-1])
-            run.italic = True
-        else:
-            # Regular text
-            paragraph.add_run(part)
\ No newline at end of file
+    """Add formatted text to a paragraph using the shared inline tokenizer."""
+    bold = italic = link = 0
+    
+    for token in iter_inline(text):
+        kind = token.kind
+        if kind in ('text', 'code', 'image'):
+            run_text = f"[Image: {token.text}]" if kind == 'image' else token.text
+            run = paragraph.add_run(run_text)
+            if bold:
+                run.bold = True
+            if italic:
+                run.italic = True
+            if link:
+                run.underline = True
+            if kind == 'code':
+                run.font.name = 'Courier New'
+        elif kind == 'strong_open':
+            bold += 1
+        elif kind == 'strong_close':
+            bold -= 1
+        elif kind == 'em_open':
+            italic += 1
+        elif kind == 'em_close':
+            italic -= 1
+        elif kind == 'link_open':
+            link += 1
+        elif kind == 'link_close':
+            link -= 1
@@ -4,25 +4,24 @@ Convert Markdown to HTML format.
 
 import re
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, List, Optional
 
+from .markdown_ast import (
+    Block,
+    BlockQuote,
+    BlockVisitor,
+    CodeBlock,
+    Document,
+    Heading,
+    Image,
+    ListBlock,
+    Paragraph,
+    Table,
+    iter_inline,
+    parse_markdown,
+)
 
-def convert_markdown_to_html(markdown_content: str, output_path: Optional[str] = None, include_css: bool = True) -> str:
-    """
-    Convert Markdown content to HTML.
-    
-    Args:
-        markdown_content: The Markdown content to convert
-        output_path: Path to save the HTML output
-        include_css: Whether to include basic CSS styling
-        
-    Returns:
-        The HTML content
-    """
-    html_content = ""
-    
-    if include_css:
-        html_content = """<!DOCTYPE html>
+HTML_HEADER = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -44,81 +43,40 @@ def convert_markdown_to_html(markdown_content: str, output_path: Optional[str] =
 <body>
 
 """
+
+HTML_FOOTER = "\n</body>\n</html>"
+
+HTML_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'})
+
+
+def convert_markdown_to_html(markdown_content: str, output_path: Optional[str] = None, include_css: bool = True) -> str:
+    """
+    Convert Markdown content to HTML.
     
-    lines = markdown_content.split('\n')
-    in_code_block = False
-    in_list = False
-    in_blockquote = False
+    Args:
+        markdown_content: The Markdown content to convert
+        output_path: Path to save the HTML output
+        include_css: Whether to include basic CSS styling
     
-    for line in lines:
-        line = line.rstrip()
-        
-        # Headers
-        if line.startswith('# '):
-            html_content += f"<h1>{_escape_html(line[2:])}</h1>\n"
-        elif line.startswith('## '):
-            html_content += f"<h2>{_escape_html(line[3:])}</h2>\n"
-        elif line.startswith('### '):
-            html_content += f"<h3>{_escape_html(line[4:])}</h3>\n"
-        
-        # Images
-        elif '![' in line and '](' in line:
-            alt_text = re.search(r'!\[(.*?)\]', line)
-            image_path = re.search(r'\((.*?)\)', line)
-            if alt_text and image_path:
-                html_content += f'<img src="{image_path.group(1)}" alt="{_escape_html(alt_text.group(1))}">\n'
-        
-        # Code blocks
-        elif line.startswith('```'):
-            if in_code_block:
-                html_content += "</pre>\n"
-                in_code_block = False
-            else:
-                html_content += "<pre><code>"
-                in_code_block = True
-        
-        # Lists
-        elif line.strip().startswith('- '):
-            if not in_list:
-                html_content += "<ul>\n"
-                in_list = True
-            html_content += f"<li>{_process_inline_formatting(line.strip()[2:])}</li>\n"
-        elif in_list and not line.strip().startswith('- '):
-            html_content += "</ul>\n"
-            in_list = False
-            if line.strip():
-                html_content += f"<p>{_process_inline_formatting(line)}</p>\n"
-        
-        # Blockquotes
-        elif line.startswith('> '):
-            if not in_blockquote:
-                html_content += "<blockquote>\n"
-                in_blockquote = True
-            html_content += f"<p>{_process_inline_formatting(line[2:])}</p>\n"
-        elif in_blockquote and not line.startswith('> '):
-            html_content += "</blockquote>\n"
-            in_blockquote = False
-            if line.strip():
-                html_content += f"<p>{_process_inline_formatting(line)}</p>\n"
-        
-        # Regular text
-        elif in_code_block:
-            html_content += _escape_html(line) + "\n"
-        elif line.strip():
-            html_content += f"<p>{_process_inline_formatting(line)}</p>\n"
-        else:
-            html_content += "\n"
+    Returns:
+        The HTML content
+    """
+    return html_from_document(parse_markdown(markdown_content), output_path, include_css)
+
+
+def html_from_document(document: Document, output_path: Optional[str] = None, include_css: bool = True) -> str:
+    """
+    Render an already parsed Markdown document as HTML.
     
-    # Close open tags
-    if in_list:
-        html_content += "</ul>\n"
-    if in_blockquote:
-        html_content += "</blockquote>\n"
-    if in_code_block:
-        html_content += "</code></pre>\n"
+    Args:
+        document: Document tree produced by ``parse_markdown``
+        output_path: Path to save the HTML output
+        include_css: Whether to include basic CSS styling
     
-    if include_css:
-        html_content += "\n</body>\n</html>"
+    Returns:
+        The HTML content
+    """
+    html_content = ''.join(render_html(document.blocks, include_css))
     
     if output_path:
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -127,25 +85,93 @@ def convert_markdown_to_html(markdown_content: str, output_path: Optional[str] =
     return html_content
 
 
-def _escape_html(text: str) -> str:
-    """Escape HTML special characters."""
-    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+def render_html(blocks: Iterable[Block], include_css: bool = True) -> Iterator[str]:
+    """Yield HTML fragments for a sequence of Markdown blocks."""
+    emitter = HtmlEmitter()
+    if include_css:
+        yield HTML_HEADER
+    for block in blocks:
+        yield emitter.visit(block)
+    if include_css:
+        yield HTML_FOOTER
 
 
-def _process_inline_formatting(text: str) -> str:
-    """Process inline Markdown formatting."""
-    text = _escape_html(text)
+class HtmlEmitter(BlockVisitor):
+    """Render Markdown blocks as HTML fragments."""
+    
+    def visit_heading(self, block: Heading) -> str:
+        return f"<h{block.level}>{_process_inline_formatting(block.text)}</h{block.level}>\n"
     
-    # Bold
-    text = re.sub(r'\*\*([^*]+)\*\*', r'<strong>\1</strong>', text)
+    def visit_paragraph(self, block: Paragraph) -> str:
+        return f"<p>{_process_inline_formatting(block.text)}</p>\n"
     
-    # Italic
-    text = re.sub(r'\*([^*]+)\*', r'<em>\1</em>', text)
+    def visit_image(self, block: Image) -> str:
+        return f'<img src="{_escape_html(block.path)}" alt="{_escape_html(block.alt)}">\n'
     
-    # Inline code
-    text = re.sub(r'`([^`]+)`', r'<code>\1</code>', text)
+    def visit_code(self, block: CodeBlock) -> str:
+        body = ''.join(_escape_html(line) + "\n" for line in block.lines)
+        return f"<pre><code>{body}</code></pre>\n"
     
-    # Links
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'<a href="\2">\1</a>', text)
+    def visit_table(self, block: Table) -> str:
+        parts = ["<table>\n<thead>\n<tr>"]
+        parts.extend(f"<th>{_process_inline_formatting(cell)}</th>" for cell in block.header)
+        parts.append("</tr>\n</thead>\n<tbody>\n")
+        for row in block.rows:
+            parts.append("<tr>")
+            parts.extend(f"<td>{_process_inline_formatting(cell)}</td>" for cell in row)
+            parts.append("</tr>\n")
+        parts.append("</tbody>\n</table>\n")
+        return ''.join(parts)
     
-    return text
\ No newline at end of file
+    def visit_quote(self, block: BlockQuote) -> str:
+        body = ''.join(f"<p>{_process_inline_formatting(line)}</p>\n" for line in block.lines)
+        return f"<blockquote>\n{body}</blockquote>\n"
+    
+    def visit_list(self, block: ListBlock) -> str:
+        parts = []
+        # Stack of open list tags, one per nesting level
+        open_tags: List[str] = []
+        for item in block.items:
+            tag = 'ol' if item.ordered else 'ul'
+            depth = item.level + 1
+            while len(open_tags) > depth or (len(open_tags) == depth and open_tags[-1] != tag):
+                parts.append(f"</{open_tags.pop()}>\n")
+            while len(open_tags) < depth:
+                open_tags.append(tag)
+                parts.append(f"<{tag}>\n")
+            parts.append(f"<li>{_process_inline_formatting(item.text)}</li>\n")
+        while open_tags:
+            parts.append(f"</{open_tags.pop()}>\n")
+        return ''.join(parts)
+
+
+def _escape_html(text: str) -> str:
+    """Escape HTML special characters."""
+    return text.translate(HTML_ESCAPES)
+
+
+HTML_INLINE_MARKUP = {
+    'strong_open': '<strong>',
+    'strong_close': '</strong>',
+    'em_open': '<em>',
+    'em_close': '</em>',
+    'link_close': '</a>',
+}
+
+
+def _process_inline_formatting(text: str) -> str:
+    """Process inline Markdown formatting using the shared inline tokenizer."""
+    parts = []
+    for token in iter_inline(text):
+        kind = token.kind
+        if kind == 'text':
+            parts.append(_escape_html(token.text))
+        elif kind == 'code':
+            parts.append(f"<code>{_escape_html(token.text)}</code>")
+        elif kind == 'link_open':
+            parts.append(f'<a href="{_escape_html(token.target)}">')
+        elif kind == 'image':
+            parts.append(f'<img src="{_escape_html(token.target)}" alt="{_escape_html(token.text)}">')
+        else:
+            parts.append(HTML_INLINE_MARKUP[kind])
+    return ''.join(parts)
@@ -1,38 +1,35 @@
 import re
 import os
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Callable, Optional, Dict, Iterable, Iterator, List, Tuple, Union
 
-def convert_markdown_to_latex(markdown_content: str, output_path: Optional[str] = None, include_preamble: bool = True) -> str:
-    """
-    Convert Markdown content to LaTeX.
-    
-    Parameters:
-    -----------
-    markdown_content : str
-        The Markdown content to convert
-    output_path : str, optional
-        Path to save the LaTeX output
-    include_preamble : bool, default=True
-        Whether to include a standard LaTeX preamble
-        
-    Returns:
-    --------
-    str
-        The LaTeX content
-    """
-    # Initialize LaTeX content with a standard preamble if requested
-    latex_content = ""
-    if include_preamble:
-        latex_content = """\\documentclass{article}
+from .markdown_ast import (
+    Block,
+    BlockQuote,
+    BlockVisitor,
+    CodeBlock,
+    Document,
+    Heading,
+    Image,
+    ListBlock,
+    Paragraph,
+    Table,
+    iter_blocks,
+    iter_inline,
+    parse_markdown,
+)
+from .code_highlight import highlight_code
+
+LATEX_PREAMBLE = """\\documentclass{article}
 \\usepackage[utf8]{inputenc}
 \\usepackage{graphicx}
-\\usepackage{hyperref}
 \\usepackage{amsmath}
 \\usepackage{amssymb}
 \\usepackage{listings}
+\\usepackage{fancyvrb}
 \\usepackage{xcolor}
 \\usepackage{booktabs}
+\\usepackage{longtable}
 \\usepackage{geometry}
 \\usepackage{fancyhdr}
 \\usepackage{titlesec}
@@ -40,7 +37,6 @@ def convert_markdown_to_latex(markdown_content: str, output_path: Optional[str]
 
 \\geometry{margin=1in}
 \\definecolor{linkcolor}{RGB}{0,102,204}
-\\hypersetup{colorlinks=true, linkcolor=linkcolor, urlcolor=linkcolor}
 
 \\lstset{
   basicstyle=\\ttfamily\\small,
@@ -54,239 +50,369 @@ def convert_markdown_to_latex(markdown_content: str, output_path: Optional[str]
   showstringspaces=false
 }
 
+% Pre-highlighted code blocks (see code_highlight)
+\\fvset{fontsize=\\small, frame=single, numbers=left}
+\\renewcommand{\\theFancyVerbLine}{\\tiny\\textcolor{gray}{\\arabic{FancyVerbLine}}}
+\\newcommand{\\XK}[1]{\\textcolor{blue}{#1}}
+\\newcommand{\\XS}[1]{\\textcolor{orange}{#1}}
+\\newcommand{\\XC}[1]{\\textcolor{green!60!black}{#1}}
+\\newcommand{\\XZbs}{\\char`\\\\}
+\\newcommand{\\XZob}{\\char`\\{}
+\\newcommand{\\XZcb}{\\char`\\}}
+
 \\title{Converted from Markdown}
 \\author{}
 \\date{\\today}
 
+% Everything above is dumped into a precompiled format (see latex_format)
+\\csname endofdump\\endcsname
+\\usepackage{hyperref}
+\\hypersetup{colorlinks=true, linkcolor=linkcolor, urlcolor=linkcolor}
+
 \\begin{document}
 \\maketitle
 
 """
+
+# Single-pass escaping of LaTeX special characters in plain text
+LATEX_ESCAPES = str.maketrans({
+    '\\': '\\textbackslash{}',
+    '{': '\\{',
+    '}': '\\}',
+    '%': '\\%',
+    '&': '\\&',
+    '$': '\\$',
+    '#': '\\#',
+    '_': '\\_',
+    '~': '\\textasciitilde{}',
+    '^': '\\textasciicircum{}',
+})
+
+# Characters that still need escaping inside \href URLs
+LATEX_URL_ESCAPES = str.maketrans({
+    '%': '\\%',
+    '#': '\\#',
+    '{': '\\{',
+    '}': '\\}',
+})
+
+LATEX_INLINE_MARKUP = {
+    'strong_open': '\\textbf{',
+    'strong_close': '}',
+    'em_open': '\\textit{',
+    'em_close': '}',
+    'link_close': '}',
+}
+
+# How fenced code blocks are typeset: lstlisting, Python-highlighted
+# Verbatim, plain verbatim, or chosen by block length
+LISTING_STRATEGIES = ('listings', 'highlight', 'verbatim', 'auto')
+
+# With the auto strategy, blocks up to this many lines use lstlisting ...
+LISTINGS_MAX_LINES = 200
+
+# ... blocks up to this many are highlighted, and longer ones are plain verbatim
+HIGHLIGHT_MAX_LINES = 2000
+
+# Figures are set at this fraction of \textwidth, which is 6.5in with the
+# preamble's letter paper and 1in margins
+FIGURE_WIDTH_FRACTION = 0.8
+TEXT_WIDTH_INCHES = 6.5
+FIGURE_WIDTH_INCHES = FIGURE_WIDTH_FRACTION * TEXT_WIDTH_INCHES
+
+# Tables with more rows than this become a longtable, which breaks across
+# pages, instead of a floating tabular
+LONGTABLE_MIN_ROWS = 100
+
+# Longtable column widths are inferred from this many leading rows
+LONGTABLE_SAMPLE_ROWS = 50
+
+# Share of the line width taken by a longtable
+LONGTABLE_WIDTH = 0.98
+
+# When streaming, tables reach the emitter in chunks of this many rows
+TABLE_CHUNK_ROWS = 1000
+
+HEADING_COMMANDS = {
+    1: 'section',
+    2: 'subsection',
+    3: 'subsubsection',
+    4: 'paragraph',
+    5: 'subparagraph',
+    6: 'subparagraph',
+}
+
+
+def convert_markdown_to_latex(
+    markdown_content: str,
+    output_path: Optional[str] = None,
+    include_preamble: bool = True,
+    listing_strategy: str = 'auto'
+) -> str:
+    """
+    Convert Markdown content to LaTeX.
     
-    # Process Markdown content
-    lines = markdown_content.split('\n')
-    in_code_block = False
-    in_list = False
-    in_ordered_list = False
-    in_blockquote = False
-    list_level = 0
-    table_data = []
-    in_table = False
-    current_line_idx = 0
-    total_lines = len(lines)
+    Parameters:
+    -----------
+    markdown_content : str
+        The Markdown content to convert
+    output_path : str, optional
+        Path to save the LaTeX output
+    include_preamble : bool, default=True
+        Whether to include a standard LaTeX preamble
+    listing_strategy : str, default='auto'
+        How code blocks are typeset (see LISTING_STRATEGIES)
     
-    while current_line_idx < total_lines:
-        line = lines[current_line_idx]
-        current_line_idx += 1
-        
-        # Headers
-        if re.match(r'^# ', line):
-            latex_content += f"\\section{{{line[2:]}}}\\n\\n"
-        elif re.match(r'^## ', line):
-            latex_content += f"\\subsection{{{line[3:]}}}\\n\\n"
-        elif re.match(r'^### ', line):
-            latex_content += f"\\subsubsection{{{line[4:]}}}\\n\\n"
-        elif re.match(r'^#### ', line):
-            latex_content += f"\\paragraph{{{line[5:]}}}\\n\\n"
-        elif re.match(r'^##### ', line):
-            latex_content += f"\\subparagraph{{{line[6:]}}}\\n\\n"
-        
-        # Images
-        # ![alt text](image_path)
-        elif '![' in line and '](' in line:
-            alt_match = re.search(r'!\[(.*?)\]', line)
-            path_match = re.search(r'\((.*?)\)', line)
-            
-            if alt_match and path_match:
-                alt_text = alt_match.group(1)
-                image_path = path_match.group(1)
-                
-                # Make sure path is using forward slashes for LaTeX
-                image_path = image_path.replace('\\', '/')
-                
-                latex_content += f"""
-\\begin{{figure}}[htbp]
-\\centering
-\\includegraphics[width=0.8\\textwidth]{{{image_path}}}
-\\caption{{{alt_text}}}
-\\end{{figure}}
-\\n
-"""
-        
-        # Code blocks
-        elif line.startswith('```'):
-            if in_code_block:
-                latex_content += "\\end{lstlisting}\\n\\n"
-                in_code_block = False
-            else:
-                language = line[3:].strip()
-                if language:
-                    latex_content += f"\\begin{{lstlisting}}[language={language}]\\n"
-                else:
-                    latex_content += "\\begin{lstlisting}\\n"
-                in_code_block = True
-        
-        # Tables
-        elif '|' in line and not in_code_block:
-            if not in_table:
-                # Check if this is a table header
-                if re.match(r'^\|[-:| ]+\|$', lines[current_line_idx]) if current_line_idx < total_lines else False:
-                    in_table = True
-                    table_data = []
-                    # Parse header
-                    headers = [cell.strip() for cell in line.split('|')[1:-1]]
-                    table_data.append(headers)
-                    # Skip the separator line
-                    current_line_idx += 1
-            else:
-                # Parse table row
-                if line.startswith('|') and line.endswith('|'):
-                    cells = [cell.strip() for cell in line.split('|')[1:-1]]
-                    table_data.append(cells)
-                else:
-                    # End of table
-                    latex_content += format_table(table_data)
-                    in_table = False
-        
-        # End table if we're at the end of table data
-        elif in_table:
-            latex_content += format_table(table_data)
-            in_table = False
-            
-        # Blockquotes
-        elif line.startswith('> '):
-            if not in_blockquote:
-                latex_content += "\\begin{quote}\\n"
-                in_blockquote = True
-            latex_content += f"{line[2:]}\\n"
-        elif in_blockquote and not line.startswith('> '):
-            latex_content += "\\end{quote}\\n\\n"
-            in_blockquote = False
-            if line.strip():
-                current_line_idx -= 1  # Process this line again
-        
-        # Regular text (inside or outside code blocks)
-        elif in_code_block:
-            latex_content += line + "\\n"
-        else:
-            # Ordered lists
-            ordered_list_match = re.match(r'^(\s*)\d+\.\s+(.*)', line)
-            if ordered_list_match:
-                indent, content = ordered_list_match.groups()
-                indent_level = len(indent) // 2
-                
-                if not in_ordered_list or indent_level != list_level:
-                    if in_ordered_list:
-                        # Close previous list if indent level changed
-                        for _ in range(list_level + 1):
-                            latex_content += "\\end{enumerate}\\n"
-                    
-                    # Start new list with proper nesting
-                    for i in range(indent_level + 1):
-                        latex_content += "\\begin{enumerate}\\n"
-                    
-                    in_ordered_list = True
-                    list_level = indent_level
-                
-                latex_content += f"\\item {content}\\n"
-            
-            # Unordered lists
-            elif re.match(r'^(\s*)- ', line):
-                indent = re.match(r'^(\s*)- ', line).group(1)
-                indent_level = len(indent) // 2
-                content = line.strip()[2:]
-                
-                if not in_list or indent_level != list_level:
-                    if in_list:
-                        # Close previous list if indent level changed
-                        for _ in range(list_level + 1):
-                            latex_content += "\\end{itemize}\\n"
-                    
-                    # Start new list with proper nesting
-                    for i in range(indent_level + 1):
-                        latex_content += "\\begin{itemize}\\n"
-                    
-                    in_list = True
-                    list_level = indent_level
-                
-                latex_content += f"\\item {content}\\n"
-            
-            # End of lists
-            elif (in_list or in_ordered_list) and line.strip() == "":
-                if in_list:
-                    for _ in range(list_level + 1):
-                        latex_content += "\\end{itemize}\\n"
-                    in_list = False
-                
-                if in_ordered_list:
-                    for _ in range(list_level + 1):
-                        latex_content += "\\end{enumerate}\\n"
-                    in_ordered_list = False
-                
-                list_level = 0
-                latex_content += "\\n"
-            
-            # Bold and italic text
-            elif line.strip():
-                # Process inline formatting
-                processed_line = process_inline_formatting(line)
-                latex_content += processed_line + "\\n\\n"
+    Returns:
+    --------
+    str
+        The LaTeX content
+    """
+    return latex_from_document(parse_markdown(markdown_content), output_path, include_preamble, listing_strategy)
+
+
+def latex_from_document(
+    document: Document,
+    output_path: Optional[str] = None,
+    include_preamble: bool = True,
+    listing_strategy: str = 'auto'
+) -> str:
+    """
+    Render an already parsed Markdown document as LaTeX.
+    
+    Parameters:
+    -----------
+    document : Document
+        Document tree produced by ``parse_markdown``
+    output_path : str, optional
+        Path to save the LaTeX output
+    include_preamble : bool, default=True
+        Whether to include a standard LaTeX preamble
+    listing_strategy : str, default='auto'
+        How code blocks are typeset (see LISTING_STRATEGIES)
     
-    # Close any open environments
-    if in_list:
-        for _ in range(list_level + 1):
-            latex_content += "\\end{itemize}\\n"
+    Returns:
+    --------
+    str
+        The LaTeX content
+    """
+    # Collect fragments in an append-only buffer and join once at the end;
+    # growing a single string with += is quadratic on large documents.
+    chunks: List[str] = []
+    fragments = render_latex(document.blocks, include_preamble, listing_strategy)
     
-    if in_ordered_list:
-        for _ in range(list_level + 1):
-            latex_content += "\\end{enumerate}\\n"
+    # Save to file if output path provided, writing fragments as they are produced
+    if output_path:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for fragment in fragments:
+                f.write(fragment)
+                chunks.append(fragment)
+    else:
+        chunks.extend(fragments)
     
-    if in_blockquote:
-        latex_content += "\\end{quote}\\n"
+    return ''.join(chunks)
+
+
+def convert_markdown_to_latex_stream(
+    lines: Iterable[str],
+    include_preamble: bool = True,
+    image_resolver: Optional[Callable[[str], str]] = None,
+    listing_strategy: str = 'auto'
+) -> Iterator[str]:
+    """
+    Convert Markdown lines to LaTeX incrementally.
     
-    if in_code_block:
-        latex_content += "\\end{lstlisting}\\n"
+    Source lines are consumed lazily and a LaTeX fragment is yielded as soon
+    as each block closes, so only the block currently being parsed (a list
+    or code block, or up to TABLE_CHUNK_ROWS rows of a table) is held in memory.
     
-    if in_table:
-        latex_content += format_table(table_data)
+    Parameters:
+    -----------
+    lines : Iterable[str]
+        Markdown source lines, e.g. an open file object
+    include_preamble : bool, default=True
+        Whether to include a standard LaTeX preamble
+    image_resolver : callable, optional
+        Maps each image path to the path the LaTeX should reference
+    listing_strategy : str, default='auto'
+        How code blocks are typeset (see LISTING_STRATEGIES)
     
-    # Close document if preamble was included
-    if include_preamble:
-        latex_content += "\\end{document}"
+    Yields:
+    -------
+    str
+        LaTeX fragments in document order
+    """
+    blocks = iter_blocks(lines, table_chunk_rows=TABLE_CHUNK_ROWS)
+    if image_resolver is not None:
+        blocks = _resolve_images(blocks, image_resolver)
+    return render_latex(blocks, include_preamble, listing_strategy)
+
+
+def convert_markdown_file_to_latex(
+    markdown_path: Union[str, Path],
+    output_path: Union[str, Path],
+    include_preamble: bool = True,
+    image_resolver: Optional[Callable[[str], str]] = None,
+    listing_strategy: str = 'auto'
+) -> str:
+    """
+    Stream a Markdown file into a LaTeX file with constant memory.
     
-    # Save to file if output path provided
-    if output_path:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(latex_content)
+    Parameters:
+    -----------
+    markdown_path : str or Path
+        Markdown source file
+    output_path : str or Path
+        LaTeX file to write
+    include_preamble : bool, default=True
+        Whether to include a standard LaTeX preamble
+    image_resolver : callable, optional
+        Maps each image path to the path the LaTeX should reference
+    listing_strategy : str, default='auto'
+        How code blocks are typeset (see LISTING_STRATEGIES)
     
-    return latex_content
+    Returns:
+    --------
+    str
+        The path of the written LaTeX file
+    """
+    with open(markdown_path, 'r', encoding='utf-8') as source, \
+            open(output_path, 'w', encoding='utf-8') as target:
+        fragments = convert_markdown_to_latex_stream(
+            source, include_preamble, image_resolver, listing_strategy
+        )
+        for fragment in fragments:
+            target.write(fragment)
+    
+    return str(output_path)
 
 
-def process_inline_formatting(text: str) -> str:
+def _resolve_images(blocks: Iterable[Block], image_resolver: Callable[[str], str]) -> Iterator[Block]:
+    """Rewrite image paths of blocks as they stream past."""
+    for block in blocks:
+        if isinstance(block, Image):
+            block.path = image_resolver(block.path)
+        yield block
+
+
+def render_latex(
+    blocks: Iterable[Block],
+    include_preamble: bool = True,
+    listing_strategy: str = 'auto'
+) -> Iterator[str]:
     """
-    Process inline Markdown formatting (bold, italic, code, links).
+    Yield LaTeX fragments for a sequence of Markdown blocks.
     """
-    # Inline code
-    text = re.sub(r'`([^`]+)`', r'\\texttt{\1}', text)
+    emitter = LatexEmitter(listing_strategy)
+    if include_preamble:
+        yield LATEX_PREAMBLE
+    for block in blocks:
+        yield emitter.visit(block)
+    if include_preamble:
+        yield "\\end{document}\n"
+
+
+class LatexEmitter(BlockVisitor):
+    """Render Markdown blocks as LaTeX fragments."""
+    
+    def __init__(self, listing_strategy: str = 'auto'):
+        if listing_strategy not in LISTING_STRATEGIES:
+            raise ValueError(f"Unknown listing strategy: {listing_strategy}")
+        self.listing_strategy = listing_strategy
+    
+    def visit_heading(self, block: Heading) -> str:
+        command = HEADING_COMMANDS[block.level]
+        return f"\\{command}{{{process_inline_formatting(block.text)}}}\n\n"
+    
+    def visit_paragraph(self, block: Paragraph) -> str:
+        return process_inline_formatting(block.text) + "\n\n"
+    
+    def visit_image(self, block: Image) -> str:
+        # Make sure path is using forward slashes for LaTeX
+        image_path = block.path.replace('\\', '/')
+        return (
+            "\\begin{figure}[htbp]\n"
+            "\\centering\n"
+            f"\\includegraphics[width={FIGURE_WIDTH_FRACTION}\\textwidth]{{{image_path}}}\n"
+            f"\\caption{{{block.alt.translate(LATEX_ESCAPES)}}}\n"
+            "\\end{figure}\n\n"
+        )
     
-    # Bold (both ** and __ syntax)
-    text = re.sub(r'\*\*([^*]+)\*\*', r'\\textbf{\1}', text)
-    text = re.sub(r'__([^_]+)__', r'\\textbf{\1}', text)
+    def visit_code(self, block: CodeBlock) -> str:
+        strategy = self.listing_strategy
+        if strategy == 'auto':
+            if len(block.lines) <= LISTINGS_MAX_LINES:
+                strategy = 'listings'
+            elif len(block.lines) <= HIGHLIGHT_MAX_LINES:
+                strategy = 'highlight'
+            else:
+                strategy = 'verbatim'
+        
+        if strategy == 'highlight':
+            body = ''.join(line + "\n" for line in highlight_code(block.lines, block.language))
+            return "\\begin{Verbatim}[commandchars=\\\\\\{\\}]\n" + body + "\\end{Verbatim}\n\n"
+        if strategy == 'verbatim':
+            body = ''.join(line + "\n" for line in block.lines)
+            return "\\begin{verbatim}\n" + body + "\\end{verbatim}\n\n"
+        
+        if block.language:
+            begin = f"\\begin{{lstlisting}}[language={block.language}]\n"
+        else:
+            begin = "\\begin{lstlisting}\n"
+        body = ''.join(line + "\n" for line in block.lines)
+        return begin + body + "\\end{lstlisting}\n\n"
     
-    # Italic (both * and _ syntax)
-    text = re.sub(r'\*([^*]+)\*', r'\\textit{\1}', text)
-    text = re.sub(r'_([^_]+)_', r'\\textit{\1}', text)
+    def visit_table(self, block: Table) -> str:
+        if block.continued or block.more or len(block.rows) > LONGTABLE_MIN_ROWS:
+            return format_longtable_chunk(block)
+        return format_table([block.header] + block.rows)
     
-    # Links
-    text = re.sub(r'\[([^\]]+)\]\(([^)]+)\)', r'\\href{\2}{\1}', text)
+    def visit_quote(self, block: BlockQuote) -> str:
+        body = ''.join(process_inline_formatting(line) + "\n" for line in block.lines)
+        return "\\begin{quote}\n" + body + "\\end{quote}\n\n"
     
-    # Escape special LaTeX characters
-    special_chars = ['%', '&', '$', '#', '_', '{', '}', '~', '^']
-    for char in special_chars:
-        if char in text and not (char == '_' and ('\\textit{' in text or '\\textbf{' in text)):
-            text = text.replace(char, f'\\{char}')
+    def visit_list(self, block: ListBlock) -> str:
+        parts = []
+        # Stack of open environments, one per nesting level
+        open_envs: List[str] = []
+        for item in block.items:
+            env = 'enumerate' if item.ordered else 'itemize'
+            depth = item.level + 1
+            while len(open_envs) > depth or (len(open_envs) == depth and open_envs[-1] != env):
+                parts.append(f"\\end{{{open_envs.pop()}}}\n")
+            while len(open_envs) < depth:
+                open_envs.append(env)
+                parts.append(f"\\begin{{{env}}}\n")
+            parts.append(f"\\item {process_inline_formatting(item.text)}\n")
+        while open_envs:
+            parts.append(f"\\end{{{open_envs.pop()}}}\n")
+        parts.append("\n")
+        return ''.join(parts)
+
+
+def process_inline_formatting(text: str) -> str:
+    """
+    Process inline Markdown formatting (bold, italic, code, links).
     
-    return text
+    Formatting is recognised and special characters are escaped in a single
+    left-to-right walk over the text.
+    """
+    parts = []
+    for token in iter_inline(text):
+        kind = token.kind
+        if kind == 'text':
+            parts.append(token.text.translate(LATEX_ESCAPES))
+        elif kind == 'code':
+            parts.append(f"\\texttt{{{token.text.translate(LATEX_ESCAPES)}}}")
+        elif kind == 'link_open':
+            parts.append(f"\\href{{{token.target.translate(LATEX_URL_ESCAPES)}}}{{")
+        elif kind == 'image':
+            # Inline images are rendered as their alt text; standalone
+            # images become figures at block level
+            parts.append(token.text.translate(LATEX_ESCAPES))
+        else:
+            parts.append(LATEX_INLINE_MARKUP[kind])
+    return ''.join(parts)
 
 
 def format_table(table_data: List[List[str]]) -> str:
@@ -299,19 +425,67 @@ def format_table(table_data: List[List[str]]) -> str:
     num_cols = len(table_data[0])
     col_spec = 'c' * num_cols
     
-    latex_table = f"\\begin{{table}}[htbp]\n\\centering\n\\begin{{tabular}}{{|{col_spec}|}}\n\\hline\n"
+    parts = [f"\\begin{{table}}[htbp]\n\\centering\n\\begin{{tabular}}{{|{col_spec}|}}\n\\hline\n"]
     
     # Header row
-    latex_table += ' & '.join(process_inline_formatting(cell) for cell in table_data[0]) + ' \\\\ \\hline\\hline\n'
+    parts.append(format_table_row(table_data[0], num_cols) + ' \\\\ \\hline\\hline\n')
     
     # Data rows
     for row in table_data[1:]:
-        # Ensure row has the right number of columns
-        while len(row) < num_cols:
-            row.append('')
-        row = row[:num_cols]  # Truncate if too many columns
-        
-        latex_table += ' & '.join(process_inline_formatting(cell) for cell in row) + ' \\\\ \\hline\n'
+        parts.append(format_table_row(row, num_cols) + ' \\\\ \\hline\n')
+    
+    parts.append("\\end{tabular}\n\\end{table}\n\n")
+    return ''.join(parts)
+
+
+def format_longtable_chunk(table: Table) -> str:
+    """
+    Format one chunk of a Markdown table as part of a LaTeX longtable.
+    
+    The first chunk opens the longtable, with column widths inferred from its
+    leading rows and a header repeated on every page; the last chunk closes
+    it. Each chunk is formatted on its own, so a table of any length is
+    written in time linear in its rows with one chunk in memory.
+    """
+    num_cols = len(table.header)
+    parts = []
     
-    latex_table += "\\end{tabular}\n\\end{table}\n\n"
-    return latex_table
\ No newline at end of file
+    if not table.continued:
+        widths = infer_column_widths([table.header] + table.rows[:LONGTABLE_SAMPLE_ROWS], num_cols)
+        col_spec = ''.join(
+            f"p{{\\dimexpr {width:.3f}\\linewidth-2\\tabcolsep\\relax}}" for width in widths
+        )
+        header = format_table_row(table.header, num_cols) + ' \\\\ \\hline\\hline\n'
+        parts.append(
+            f"\\begin{{longtable}}{{|{col_spec}|}}\n"
+            f"\\hline\n{header}\\endfirsthead\n"
+            f"\\hline\n{header}\\endhead\n"
+        )
+    
+    for row in table.rows:
+        parts.append(format_table_row(row, num_cols) + ' \\\\ \\hline\n')
+    
+    if not table.more:
+        parts.append("\\end{longtable}\n\n")
+    return ''.join(parts)
+
+
+def infer_column_widths(sample: List[List[str]], num_cols: int) -> List[float]:
+    """
+    Split LONGTABLE_WIDTH between columns in proportion to their content.
+    
+    Each column is weighted by its longest cell in the sample, clamped so that
+    one long cell cannot squeeze the other columns to nothing.
+    """
+    weights = [4] * num_cols
+    for row in sample:
+        for index, cell in enumerate(row[:num_cols]):
+            weights[index] = max(weights[index], min(len(cell), 40))
+    total = sum(weights)
+    return [LONGTABLE_WIDTH * weight / total for weight in weights]
+
+
+def format_table_row(row: List[str], num_cols: int) -> str:
+    """Format the cells of a table row, padded or truncated to num_cols."""
+    cells = row[:num_cols] + [''] * (num_cols - len(row))
+    return ' & '.join(process_inline_formatting(cell) for cell in cells)
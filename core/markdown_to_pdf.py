@@ -0,0 +1,667 @@
+"""
+Render simple Markdown documents straight to PDF, without LaTeX.
+
+Most Markdown inputs are prose with headings, lists and images. Sending them
+through pdflatex costs seconds and needs TeX on every node. This module lays
+such documents out in pure Python and writes the PDF itself, using the
+standard PDF fonts (Helvetica and Courier) that every viewer provides, so
+nothing has to be embedded except images.
+
+Only that subset is supported. ``find_unsupported_features`` lists what a
+document uses beyond it (tables, code blocks, characters the standard fonts
+cannot encode, images that cannot be embedded), so callers can fall back to
+the LaTeX engine. The layout follows the LaTeX output: a title block,
+numbered sections, 1in margins and figures at 0.8 of the text width with a
+numbered caption.
+"""
+
+import re
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import quote
+
+from .markdown_ast import (
+    BlockQuote,
+    BlockVisitor,
+    CodeBlock,
+    Document,
+    Heading,
+    Image,
+    ListBlock,
+    Paragraph,
+    Table,
+    iter_inline,
+    parse_markdown,
+)
+
+try:
+    from PIL import Image as PILImage
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+PAGE_WIDTH = 612.0
+PAGE_HEIGHT = 792.0
+MARGIN = 72.0
+TEXT_WIDTH = PAGE_WIDTH - 2 * MARGIN
+
+BODY_SIZE = 10.0
+LEADING = 1.2
+PARAGRAPH_SKIP = 5.0
+LIST_INDENT = 25.0
+QUOTE_INDENT = 25.0
+IMAGE_WIDTH = 0.8 * TEXT_WIDTH
+TITLE = "Converted from Markdown"
+
+# Heading sizes and numbering depth, matching article's \section..\subparagraph
+HEADING_SIZES = {1: 14.4, 2: 12.0, 3: 10.0, 4: 10.0, 5: 10.0, 6: 10.0}
+NUMBERED_HEADING_LEVELS = 3
+
+# Unordered list markers per nesting level, as in LaTeX's itemize
+BULLETS = ("•", "–", "*", "·")
+
+# The standard fonts are used with WinAnsiEncoding (cp1252)
+PDF_ENCODING = "cp1252"
+FONT_REGULAR = "F1"
+FONT_BOLD = "F2"
+FONT_ITALIC = "F3"
+FONT_BOLD_ITALIC = "F4"
+FONT_CODE = "F5"
+BASE_FONTS = {
+    FONT_REGULAR: "Helvetica",
+    FONT_BOLD: "Helvetica-Bold",
+    FONT_ITALIC: "Helvetica-Oblique",
+    FONT_BOLD_ITALIC: "Helvetica-BoldOblique",
+    FONT_CODE: "Courier",
+}
+
+# Advance widths (1/1000 em) of characters 32-126, from the Adobe font metrics
+_HELVETICA_WIDTHS = (
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+)
+_HELVETICA_BOLD_WIDTHS = (
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+)
+# Widths of the non-ASCII characters the layout itself uses; others get a default
+_SPECIAL_WIDTHS = {"•": 350, "–": 556, "·": 278}
+_DEFAULT_WIDTH = 556
+_CODE_WIDTH = 600
+
+
+def _width_table(widths: Tuple[int, ...]) -> Dict[str, int]:
+    table = {chr(32 + index): width for index, width in enumerate(widths)}
+    table.update(_SPECIAL_WIDTHS)
+    return table
+
+
+FONT_WIDTHS = {
+    FONT_REGULAR: _width_table(_HELVETICA_WIDTHS),
+    FONT_ITALIC: _width_table(_HELVETICA_WIDTHS),
+    FONT_BOLD: _width_table(_HELVETICA_BOLD_WIDTHS),
+    FONT_BOLD_ITALIC: _width_table(_HELVETICA_BOLD_WIDTHS),
+}
+
+JPEG_EXTENSIONS = {".jpg", ".jpeg"}
+# Formats embedded by decoding them with Pillow
+PIL_EXTENSIONS = {".png", ".gif", ".bmp", ".tif", ".tiff", ".webp"}
+# Start-of-frame markers that carry the image size
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+WHITESPACE_PATTERN = re.compile(r"(\s+)")
+LINK_COLOUR = b"0 0.4 0.8 rg "
+
+# A run of text on a line: (text, font, link target or None)
+Fragment = Tuple[str, str, Optional[str]]
+
+
+def text_width(text: str, font: str, size: float) -> float:
+    """Width of text set in one of the standard fonts, in points."""
+    if font == FONT_CODE:
+        return len(text) * _CODE_WIDTH * size / 1000
+    widths = FONT_WIDTHS[font]
+    return sum(widths.get(char, _DEFAULT_WIDTH) for char in text) * size / 1000
+
+
+def _pdf_string(text: str) -> bytes:
+    """Encode text as the body of a PDF literal string."""
+    data = text.encode(PDF_ENCODING, errors="replace")
+    return data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+def _jpeg_info(data: bytes) -> Optional[Tuple[int, int, int]]:
+    """Read (width, height, components) from a JPEG's start-of-frame marker."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            pos += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        length = int.from_bytes(data[pos + 2:pos + 4], "big")
+        if marker in JPEG_SOF_MARKERS:
+            height = int.from_bytes(data[pos + 5:pos + 7], "big")
+            width = int.from_bytes(data[pos + 7:pos + 9], "big")
+            return width, height, data[pos + 9]
+        pos += 2 + length
+    return None
+
+
+def _resolve_image(path: str, base_dir: Optional[Path]) -> Path:
+    image_path = Path(path)
+    if base_dir is not None and not image_path.is_absolute():
+        image_path = base_dir / image_path
+    return image_path
+
+
+def _image_problem(path: str, base_dir: Optional[Path]) -> Optional[str]:
+    """Say why an image cannot be embedded directly, or None if it can."""
+    image_path = _resolve_image(path, base_dir)
+    if not image_path.is_file():
+        return "not found"
+    suffix = image_path.suffix.lower()
+    if suffix in JPEG_EXTENSIONS or (PIL_AVAILABLE and suffix in PIL_EXTENSIONS):
+        return None
+    return "unsupported format"
+
+
+def _block_texts(block) -> List[str]:
+    """The text a block renders, for encoding checks."""
+    if isinstance(block, (Heading, Paragraph)):
+        return [block.text]
+    if isinstance(block, Image):
+        return [block.alt]
+    if isinstance(block, BlockQuote):
+        return block.lines
+    if isinstance(block, ListBlock):
+        return [item.text for item in block.items]
+    return []
+
+
+def find_unsupported_features(
+    document: Document,
+    base_dir: Optional[Union[str, Path]] = None
+) -> List[str]:
+    """
+    List what a document uses that the direct renderer cannot draw.
+    
+    Args:
+        document: Document tree produced by ``parse_markdown``
+        base_dir: Directory relative image paths are resolved against
+    
+    Returns:
+        Short descriptions such as ``"tables"``; empty if the document can be
+        rendered directly
+    """
+    base = Path(base_dir) if base_dir else None
+    features: List[str] = []
+    
+    def add(feature: str) -> None:
+        if feature not in features:
+            features.append(feature)
+    
+    for block in document:
+        if isinstance(block, Table):
+            add("tables")
+        elif isinstance(block, CodeBlock):
+            add("code blocks")
+        elif isinstance(block, Image):
+            problem = _image_problem(block.path, base)
+            if problem:
+                add(f"image {block.path} ({problem})")
+        for text in _block_texts(block):
+            try:
+                text.encode(PDF_ENCODING)
+            except UnicodeEncodeError:
+                add("characters outside the standard PDF fonts")
+    return features
+
+
+class _PdfObjects:
+    """Numbered PDF objects, serialised with a cross-reference table."""
+    
+    def __init__(self):
+        self._objects: List[Optional[bytes]] = []
+    
+    def reserve(self) -> int:
+        """Allocate an object number to fill in later."""
+        self._objects.append(None)
+        return len(self._objects)
+    
+    def add(self, body: Union[str, bytes], number: Optional[int] = None) -> int:
+        if number is None:
+            number = self.reserve()
+        self._objects[number - 1] = body.encode("latin-1") if isinstance(body, str) else body
+        return number
+    
+    def add_stream(self, dictionary: str, data: bytes, number: Optional[int] = None) -> int:
+        header = f"<<{dictionary}/Length {len(data)}>>\nstream\n".encode("latin-1")
+        return self.add(header + data + b"\nendstream", number)
+    
+    def write(self, file, root: int, info: int) -> None:
+        header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+        file.write(header)
+        offsets = []
+        position = len(header)
+        for number, body in enumerate(self._objects, 1):
+            offsets.append(position)
+            chunk = b"%d 0 obj\n%s\nendobj\n" % (number, body)
+            file.write(chunk)
+            position += len(chunk)
+        count = len(self._objects) + 1
+        xref = [b"xref\n0 %d\n0000000000 65535 f \n" % count]
+        xref.extend(b"%010d 00000 n \n" % offset for offset in offsets)
+        file.write(b"".join(xref))
+        file.write(
+            b"trailer\n<</Size %d/Root %d 0 R/Info %d 0 R>>\nstartxref\n%d\n%%%%EOF\n"
+            % (count, root, info, position)
+        )
+
+
+class PdfEmitter(BlockVisitor):
+    """Lay out Markdown blocks on PDF pages."""
+    
+    def __init__(self, base_dir: Optional[Union[str, Path]] = None):
+        self.base_dir = Path(base_dir) if base_dir else None
+        self.objects = _PdfObjects()
+        self.resources = self.objects.reserve()
+        self.pages_root = self.objects.reserve()
+        self.pages: List[int] = []
+        # Embedded images by file, and their XObject numbers by name
+        self.images: Dict[Path, Tuple[str, int, int]] = {}
+        self.image_objects: Dict[str, int] = {}
+        self.sections = [0] * NUMBERED_HEADING_LEVELS
+        self.figures = 0
+        self._content: List[bytes] = []
+        self._annotations: List[list] = []
+        self.y = PAGE_HEIGHT - MARGIN
+    
+    # Blocks
+    
+    def visit_heading(self, block: Heading) -> None:
+        size = HEADING_SIZES[block.level]
+        fragments = self._fragments(block.text, FONT_BOLD)
+        if block.level <= NUMBERED_HEADING_LEVELS:
+            self.sections[block.level - 1] += 1
+            for index in range(block.level, NUMBERED_HEADING_LEVELS):
+                self.sections[index] = 0
+            number = ".".join(str(value) for value in self.sections[:block.level])
+            fragments = [(f"{number}  ", FONT_BOLD, None)] + fragments
+        
+        self._skip(size)
+        # Keep the heading on the page of the text that follows it
+        self._ensure_space(size * LEADING + 2 * BODY_SIZE * LEADING)
+        self._text(fragments, size)
+        self._skip(PARAGRAPH_SKIP)
+    
+    def visit_paragraph(self, block: Paragraph) -> None:
+        self._text(self._fragments(block.text), BODY_SIZE)
+        self._skip(PARAGRAPH_SKIP)
+    
+    def visit_image(self, block: Image) -> None:
+        name, pixel_width, pixel_height = self._embed_image(_resolve_image(block.path, self.base_dir))
+        width = IMAGE_WIDTH
+        height = width * pixel_height / pixel_width
+        self.figures += 1
+        caption = self._wrap(
+            [(f"Figure {self.figures}:", FONT_REGULAR, None), (" ", FONT_REGULAR, None)]
+            + self._fragments(block.alt),
+            BODY_SIZE,
+            TEXT_WIDTH
+        )
+        caption_height = len(caption) * BODY_SIZE * LEADING + PARAGRAPH_SKIP
+        
+        # Scale down images that would not fit on an empty page
+        available = PAGE_HEIGHT - 2 * MARGIN - caption_height - 2 * PARAGRAPH_SKIP
+        if height > available:
+            width *= available / height
+            height = available
+        
+        self._skip(PARAGRAPH_SKIP)
+        self._ensure_space(height + caption_height)
+        self.y -= height
+        x = MARGIN + (TEXT_WIDTH - width) / 2
+        self._content.append(f"q {width:.2f} 0 0 {height:.2f} {x:.2f} {self.y:.2f} cm /{name} Do Q\n".encode())
+        self._skip(PARAGRAPH_SKIP)
+        for line in caption:
+            self._line(line, BODY_SIZE, MARGIN + (TEXT_WIDTH - self._line_width(line)) / 2)
+        self._skip(PARAGRAPH_SKIP)
+    
+    def visit_quote(self, block: BlockQuote) -> None:
+        text = " ".join(block.lines)
+        self._text(self._fragments(text), BODY_SIZE, QUOTE_INDENT, TEXT_WIDTH - 2 * QUOTE_INDENT)
+        self._skip(PARAGRAPH_SKIP)
+    
+    def visit_list(self, block: ListBlock) -> None:
+        # (ordered, count) per open nesting level
+        levels: List[Tuple[bool, int]] = []
+        for item in block.items:
+            del levels[item.level + 1:]
+            while len(levels) <= item.level:
+                levels.append((item.ordered, 0))
+            ordered, count = levels[item.level]
+            if ordered != item.ordered:
+                count = 0
+            levels[item.level] = (item.ordered, count + 1)
+            
+            marker = f"{count + 1}." if item.ordered else BULLETS[min(item.level, len(BULLETS) - 1)]
+            indent = LIST_INDENT * (item.level + 1)
+            self._text(
+                self._fragments(item.text),
+                BODY_SIZE,
+                indent,
+                TEXT_WIDTH - indent,
+                marker=marker
+            )
+        self._skip(PARAGRAPH_SKIP)
+    
+    def visit_code(self, block: CodeBlock) -> None:
+        raise ValueError("Code blocks are not supported by the direct PDF renderer")
+    
+    def visit_table(self, block: Table) -> None:
+        raise ValueError("Tables are not supported by the direct PDF renderer")
+    
+    # Title block, like \maketitle
+    
+    def title(self, title: str = TITLE) -> None:
+        today = date.today()
+        self._skip(2 * BODY_SIZE)
+        for text, size in ((title, 17.28), (f"{today:%B} {today.day}, {today.year}", 12.0)):
+            line = [(text, FONT_REGULAR, None, text_width(text, FONT_REGULAR, size))]
+            self._line(line, size, MARGIN + (TEXT_WIDTH - line[0][3]) / 2)
+            self._skip(size * 0.75)
+        self._skip(BODY_SIZE)
+    
+    # Text layout
+    
+    @staticmethod
+    def _fragments(text: str, base_font: str = FONT_REGULAR) -> List[Fragment]:
+        """Turn inline Markdown into words and spaces, each with its font."""
+        fragments: List[Fragment] = []
+        bold = 1 if base_font == FONT_BOLD else 0
+        italic = 0
+        link: Optional[str] = None
+        for token in iter_inline(text):
+            kind = token.kind
+            if kind in ("text", "code", "image"):
+                if kind == "code":
+                    font = FONT_CODE
+                elif bold and italic:
+                    font = FONT_BOLD_ITALIC
+                elif bold:
+                    font = FONT_BOLD
+                else:
+                    font = FONT_ITALIC if italic else FONT_REGULAR
+                # Inline images are rendered as their alt text, as in LaTeX
+                for piece in WHITESPACE_PATTERN.split(token.text):
+                    if piece:
+                        fragments.append((" " if piece.isspace() else piece, font, link))
+            elif kind == "strong_open":
+                bold += 1
+            elif kind == "strong_close":
+                bold -= 1
+            elif kind == "em_open":
+                italic += 1
+            elif kind == "em_close":
+                italic -= 1
+            elif kind == "link_open":
+                link = token.target
+            elif kind == "link_close":
+                link = None
+        return fragments
+    
+    @staticmethod
+    def _wrap(fragments: List[Fragment], size: float, width: float) -> List[list]:
+        """Break fragments into lines no wider than width, at spaces."""
+        lines: List[list] = []
+        line: list = []
+        line_width = 0.0
+        break_at: Optional[int] = None
+        for text, font, link in fragments:
+            advance = text_width(text, font, size)
+            if text == " ":
+                if not line or line[-1][0] == " ":
+                    continue
+                break_at = len(line)
+            elif line_width + advance > width and break_at is not None:
+                rest = line[break_at + 1:]
+                lines.append(line[:break_at])
+                line = rest
+                line_width = sum(piece[3] for piece in rest)
+                break_at = None
+            line.append((text, font, link, advance))
+            line_width += advance
+        if line and line[-1][0] == " ":
+            line.pop()
+        if line:
+            lines.append(line)
+        return lines
+    
+    @staticmethod
+    def _line_width(line: list) -> float:
+        return sum(piece[3] for piece in line)
+    
+    def _text(
+        self,
+        fragments: List[Fragment],
+        size: float,
+        indent: float = 0.0,
+        width: float = TEXT_WIDTH,
+        marker: Optional[str] = None
+    ) -> None:
+        """Set a block of wrapped text, optionally with a list marker."""
+        for index, line in enumerate(self._wrap(fragments, size, width) or [[]]):
+            self._line(line, size, MARGIN + indent)
+            if index == 0 and marker:
+                marker_width = text_width(marker, FONT_REGULAR, size)
+                baseline = self.y + size * 0.25 * LEADING
+                x = MARGIN + indent - marker_width - size * 0.5
+                self._content.append(
+                    b"BT /%s %g Tf %.2f %.2f Td (%s) Tj ET\n"
+                    % (FONT_REGULAR.encode(), size, x, baseline, _pdf_string(marker))
+                )
+    
+    def _line(self, line: list, size: float, x: float) -> None:
+        """Set one line of text below the previous one."""
+        height = size * LEADING
+        self._ensure_space(height)
+        self.y -= height
+        if not line:
+            return
+        baseline = self.y + size * 0.25 * LEADING
+        parts = [b"BT %.2f %.2f Td " % (x, baseline)]
+        font = None
+        coloured = False
+        cursor = x
+        run: List[str] = []
+        for text, piece_font, link, advance in line:
+            if piece_font != font or bool(link) != coloured:
+                # One Tj per run of text in the same font and colour
+                if run:
+                    parts.append(b"(%s) Tj " % _pdf_string("".join(run)))
+                    run = []
+                if piece_font != font:
+                    parts.append(b"/%s %g Tf " % (piece_font.encode(), size))
+                    font = piece_font
+                if bool(link) != coloured:
+                    parts.append(LINK_COLOUR if link else b"0 g ")
+                    coloured = bool(link)
+            run.append(text)
+            if link:
+                self._link(cursor, baseline - size * 0.2, cursor + advance, baseline + size * 0.8, link)
+            cursor += advance
+        if run:
+            parts.append(b"(%s) Tj " % _pdf_string("".join(run)))
+        if coloured:
+            parts.append(b"0 g ")
+        parts.append(b"ET\n")
+        self._content.append(b"".join(parts))
+    
+    def _link(self, x1: float, y1: float, x2: float, y2: float, target: str) -> None:
+        """Record a clickable area, extending the previous one when it continues it."""
+        if self._annotations:
+            last = self._annotations[-1]
+            if last[4] == target and last[1] == y1 and abs(last[2] - x1) < 0.01:
+                last[2] = x2
+                return
+        self._annotations.append([x1, y1, x2, y2, target])
+    
+    def _skip(self, amount: float) -> None:
+        # Vertical space is dropped at the top of a page
+        if self.y < PAGE_HEIGHT - MARGIN:
+            self.y = max(self.y - amount, MARGIN)
+    
+    def _ensure_space(self, height: float) -> None:
+        if self.y - height < MARGIN and self.y < PAGE_HEIGHT - MARGIN:
+            self._finish_page()
+    
+    def _finish_page(self) -> None:
+        """Write out the current page and start a new one."""
+        data = zlib.compress(b"".join(self._content))
+        contents = self.objects.add_stream("/Filter/FlateDecode", data)
+        annotations = ""
+        if self._annotations:
+            numbers = []
+            for x1, y1, x2, y2, target in self._annotations:
+                uri = quote(target, safe=":/?#[]@!$&'*+,;=%~")
+                numbers.append(self.objects.add(
+                    f"<</Type/Annot/Subtype/Link/Rect [{x1:.2f} {y1:.2f} {x2:.2f} {y2:.2f}]"
+                    f"/Border [0 0 0]/A <</S/URI/URI ({uri.replace(')', '%29').replace('(', '%28')})>>>>"
+                ))
+            annotations = "/Annots [" + " ".join(f"{number} 0 R" for number in numbers) + "]"
+        self.pages.append(self.objects.add(
+            f"<</Type/Page/Parent {self.pages_root} 0 R/MediaBox [0 0 {PAGE_WIDTH:g} {PAGE_HEIGHT:g}]"
+            f"/Resources {self.resources} 0 R/Contents {contents} 0 R{annotations}>>"
+        ))
+        self._content = []
+        self._annotations = []
+        self.y = PAGE_HEIGHT - MARGIN
+    
+    # Images
+    
+    def _embed_image(self, path: Path) -> Tuple[str, int, int]:
+        """Add an image XObject once per file and return (name, width, height)."""
+        if path in self.images:
+            return self.images[path]
+        
+        data = path.read_bytes()
+        info = _jpeg_info(data) if path.suffix.lower() in JPEG_EXTENSIONS else None
+        if info is not None and info[2] in (1, 3):
+            # Baseline and progressive JPEGs are embedded as they are
+            width, height, components = info
+            colour_space = "/DeviceGray" if components == 1 else "/DeviceRGB"
+            dictionary = f"/ColorSpace{colour_space}/Filter/DCTDecode"
+        else:
+            if not PIL_AVAILABLE:
+                raise ValueError(f"Cannot embed image without Pillow: {path}")
+            with PILImage.open(path) as image:
+                image.load()
+                if image.mode in ("RGBA", "LA", "P", "PA"):
+                    # No soft masks: flatten transparency onto white paper
+                    image = image.convert("RGBA")
+                    background = PILImage.new("RGB", image.size, (255, 255, 255))
+                    background.paste(image, mask=image.getchannel("A"))
+                    image = background
+                elif image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+                width, height = image.size
+                colour_space = "/DeviceGray" if image.mode == "L" else "/DeviceRGB"
+                data = zlib.compress(image.tobytes())
+            dictionary = f"/ColorSpace{colour_space}/Filter/FlateDecode"
+        
+        number = self.objects.add_stream(
+            f"/Type/XObject/Subtype/Image/Width {width}/Height {height}/BitsPerComponent 8{dictionary}",
+            data
+        )
+        name = f"Im{len(self.images) + 1}"
+        self.images[path] = (name, width, height)
+        self.image_objects[name] = number
+        return self.images[path]
+    
+    # Output
+    
+    def write(self, file) -> None:
+        """Finish the last page and serialise the document."""
+        if self._content or not self.pages:
+            self._finish_page()
+        
+        fonts = " ".join(
+            f"/{name} {self.objects.add(f'<</Type/Font/Subtype/Type1/BaseFont/{base}/Encoding/WinAnsiEncoding>>')} 0 R"
+            for name, base in BASE_FONTS.items()
+        )
+        images = " ".join(f"/{name} {number} 0 R" for name, number in self.image_objects.items())
+        self.objects.add(f"<</Font <<{fonts}>>/XObject <<{images}>>>>", self.resources)
+        kids = " ".join(f"{number} 0 R" for number in self.pages)
+        self.objects.add(f"<</Type/Pages/Kids [{kids}]/Count {len(self.pages)}>>", self.pages_root)
+        root = self.objects.add(f"<</Type/Catalog/Pages {self.pages_root} 0 R>>")
+        info = self.objects.add(f"<</Title ({TITLE})/Producer (xtox)>>")
+        self.objects.write(file, root, info)
+
+
+def pdf_from_document(
+    document: Document,
+    output_path: Union[str, Path],
+    base_dir: Optional[Union[str, Path]] = None
+) -> str:
+    """
+    Render an already parsed Markdown document as PDF, without LaTeX.
+    
+    Args:
+        document: Document tree produced by ``parse_markdown``
+        output_path: Path to save the PDF
+        base_dir: Directory relative image paths are resolved against
+    
+    Returns:
+        The output path
+    
+    Raises:
+        ValueError: If the document uses features listed by
+            ``find_unsupported_features``
+    """
+    unsupported = find_unsupported_features(document, base_dir)
+    if unsupported:
+        raise ValueError(f"Direct PDF rendering does not support: {', '.join(unsupported)}")
+    
+    emitter = PdfEmitter(base_dir)
+    emitter.title()
+    for block in document:
+        emitter.visit(block)
+    with open(output_path, "wb") as f:
+        emitter.write(f)
+    return str(output_path)
+
+
+def convert_markdown_to_pdf(
+    markdown_content: str,
+    output_path: Union[str, Path],
+    base_dir: Optional[Union[str, Path]] = None
+) -> str:
+    """
+    Convert simple Markdown content straight to PDF.
+    
+    Args:
+        markdown_content: The Markdown content to convert
+        output_path: Path to save the PDF
+        base_dir: Directory relative image paths are resolved against
+    
+    Returns:
+        The output path
+    """
+    return pdf_from_document(parse_markdown(markdown_content), output_path, base_dir)
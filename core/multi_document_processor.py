@@ -7,17 +7,21 @@ from pathlib import Path
 from typing import List, Dict, Optional, Union, Tuple
 import mimetypes
 
+from .batch_compile import compile_latex_batch, group_documents
 from .document_converter import DocumentConverter
 from .image_converter import ImageConverter
+from .pdf_tools import PYPDF_AVAILABLE
 
 
 class MultiDocumentProcessor:
     """Process multiple documents with intelligent format selection."""
     
-    def __init__(self, output_dir: Optional[str] = None):
+    def __init__(self, output_dir: Optional[str] = None, batch_latex: bool = True):
         self.converter = DocumentConverter(output_dir)
         self.image_converter = ImageConverter()
         self.output_dir = Path(output_dir) if output_dir else None
+        # Compile small same-preamble .tex files in shared pdflatex runs
+        self.batch_latex = batch_latex
         
         # Format recommendations based on use case
         self.format_recommendations = {
@@ -63,8 +67,12 @@ class MultiDocumentProcessor:
             'errors': []
         }
         
+        documents = categorized_files['documents']
+        if target_formats['documents'] == 'pdf' and self.batch_latex:
+            documents = self._compile_latex_batch(documents, results)
+        
         # Process documents
-        for doc_path in categorized_files['documents']:
+        for doc_path in documents:
             try:
                 converted_path = self._convert_document(doc_path, target_formats['documents'])
                 results['documents'].append(converted_path)
@@ -81,6 +89,34 @@ class MultiDocumentProcessor:
         
         return results
     
+    def _compile_latex_batch(self, doc_paths: List[Path], results: Dict[str, List[str]]) -> List[Path]:
+        """
+        Compile batchable .tex files together.
+        
+        Returns the documents that still need converting one by one.
+        """
+        tex_paths = [path for path in doc_paths if path.suffix.lower() == '.tex']
+        if not PYPDF_AVAILABLE or len(tex_paths) < 2:
+            return doc_paths
+        
+        documents = {
+            str(path): path.read_text(encoding='utf-8', errors='replace') for path in tex_paths
+        }
+        groups, _ = group_documents(documents)
+        batched = [path for group in groups for path in group]
+        if not batched:
+            return doc_paths
+        
+        for path, result in compile_latex_batch(batched).items():
+            if result['success']:
+                results['documents'].append(result['pdf_path'])
+            else:
+                errors = '; '.join(result['errors']) or 'PDF generation failed'
+                results['errors'].append(f"Document {path}: {errors}")
+        
+        done = set(batched)
+        return [path for path in doc_paths if str(path) not in done]
+    
     def _categorize_files(self, file_paths: List[Union[str, Path]]) -> Dict[str, List[Path]]:
         """Categorize files by type."""
         categorized = {
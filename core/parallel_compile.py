@@ -0,0 +1,309 @@
+"""
+Parallel compilation of large LaTeX documents.
+
+A long document is split at its top-level ``\\section`` boundaries into
+independent units that share the original preamble. The units compile
+concurrently in a process pool and their PDFs are merged into one file.
+
+Page numbers continue across units in two phases. First, a single
+``-draftmode`` pass per unit counts its pages. Then the units are compiled
+for real, each starting at its page offset, with the section, figure and
+table counters carried over. Documents with a table of contents, a list of
+figures or tables, labels, references or citations need all sections in one
+run, so they are not split.
+``\\section`` lines inside verbatim-like environments, such as a code block
+showing LaTeX, are content and never start a unit.
+
+Whenever the parallel path cannot produce the PDF (the document cannot be
+split, fails the pre-flight check, or a unit fails to compile), the document
+is compiled serially with latex_content_to_pdf instead.
+"""
+
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from .compile_cache import compile_cache_key, get_compile_cache
+from .latex_format import find_format_for_content, pdflatex_command
+from .latex_lint import VERBATIM_ENVIRONMENTS
+from .latex_lint import lint_latex_content
+from .latex_to_pdf import check_latex_content, fix_latex_content, latex_content_to_pdf, run_pdflatex
+from .pdf_tools import PYPDF_AVAILABLE, merge_pdfs
+
+SECTION_LINE_PATTERN = re.compile(r"^\s*\\section\{")
+BEGIN_ENVIRONMENT_PATTERN = re.compile(r"\\begin\{([^{}]+)\}")
+# Anything that refers across sections needs the whole document in one run
+UNSPLITTABLE_PATTERN = re.compile(
+    r"\\(?:tableofcontents|listoffigures|listoftables|label|ref|pageref|eqref|autoref|"
+    r"[cCvV]ref|nameref|hyperref|(?:foot|paren|text|auto)?cite[tp]?|nocite)\b"
+)
+PAGE_COUNT_PATTERN = re.compile(r"XTOX-UNIT-PAGES=(\d+)")
+
+# Seconds a single pdflatex pass over one unit may take
+UNIT_PASS_TIMEOUT = 300
+
+# Counters that run across the whole document, with what increments them
+CARRIED_COUNTERS = {
+    "section": re.compile(r"\\section\{"),
+    "figure": re.compile(r"\\begin\{figure\}"),
+    "table": re.compile(r"\\begin\{table\}"),
+}
+
+PAGE_COUNT_HOOK = (
+    "\\AtEndDocument{\\clearpage"
+    "\\typeout{XTOX-UNIT-PAGES=\\the\\numexpr\\value{page}-1\\relax}}\n"
+)
+
+
+def split_latex_units(content: str, min_units: int = 2) -> Optional[Tuple[str, List[str]]]:
+    """
+    Split a LaTeX document into independently compilable units.
+    
+    Returns ``(preamble, bodies)``, where the preamble runs through the
+    ``\\begin{document}`` line and each body starts at a top-level
+    ``\\section``; front matter stays with the first unit. Returns None if
+    the document cannot be split into at least min_units units.
+    """
+    if UNSPLITTABLE_PATTERN.search(content):
+        return None
+    
+    begin = content.find("\\begin{document}")
+    end = content.rfind("\\end{document}")
+    if begin == -1 or end == -1:
+        return None
+    body_start = content.find("\n", begin) + 1
+    if body_start == 0 or body_start > end:
+        return None
+    
+    bodies: List[str] = []
+    current: List[str] = []
+    has_section = False
+    for line, verbatim in _scan_verbatim(content[body_start:end]):
+        if not verbatim and SECTION_LINE_PATTERN.match(line):
+            if has_section:
+                bodies.append(''.join(current))
+                current = []
+            has_section = True
+        current.append(line)
+    bodies.append(''.join(current))
+    
+    if len(bodies) < min_units:
+        return None
+    return content[:body_start], bodies
+
+
+def _scan_verbatim(text: str) -> Iterator[Tuple[str, bool]]:
+    """
+    Yield each line of text with whether it starts inside a verbatim-like
+    environment, whose contents are not LaTeX.
+    """
+    environment = None
+    for line in text.splitlines(True):
+        yield line, environment is not None
+        pos = 0
+        while True:
+            if environment is not None:
+                end = line.find(f"\\end{{{environment}}}", pos)
+                if end == -1:
+                    break
+                pos = end + len(environment) + 6
+                environment = None
+            match = BEGIN_ENVIRONMENT_PATTERN.search(line, pos)
+            if match is None:
+                break
+            pos = match.end()
+            if match.group(1) in VERBATIM_ENVIRONMENTS:
+                environment = match.group(1)
+
+
+def _count_carried(body: str) -> dict:
+    """Count what increments each carried counter, outside verbatim text."""
+    text = ''.join(line for line, verbatim in _scan_verbatim(body) if not verbatim)
+    return {name: len(pattern.findall(text)) for name, pattern in CARRIED_COUNTERS.items()}
+
+
+def can_compile_in_parallel(content: str) -> bool:
+    """Check whether compile_latex_in_parallel can handle a document."""
+    return PYPDF_AVAILABLE and split_latex_units(content) is not None
+
+
+def _unit_source(preamble: str, body: str, first_page: int, counters: dict, count_pages: bool) -> str:
+    """Build the source of one unit, continuing page and counter values."""
+    parts = [preamble]
+    if count_pages:
+        parts.append(PAGE_COUNT_HOOK)
+    if first_page > 1:
+        parts.append(f"\\setcounter{{page}}{{{first_page}}}\n")
+    for name, value in counters.items():
+        if value:
+            parts.append(f"\\setcounter{{{name}}}{{{value}}}\n")
+    parts.append(body)
+    parts.append("\\end{document}\n")
+    return ''.join(parts)
+
+
+def _count_unit_pages(unit_path: str, format_path: Optional[str], env: dict,
+                      timeout: Optional[float] = UNIT_PASS_TIMEOUT) -> Optional[int]:
+    """Run one draft pass over a unit and return its page count."""
+    try:
+        result = subprocess.run(
+            pdflatex_command(os.path.basename(unit_path), format_path, ["-draftmode"]),
+            cwd=os.path.dirname(unit_path),
+            env={**os.environ, **env},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding='utf-8',
+            errors='replace',
+            timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    match = PAGE_COUNT_PATTERN.search(result.stdout)
+    if result.returncode != 0 or not match:
+        return None
+    return int(match.group(1))
+
+
+def _compile_unit(unit_path: str, format_path: Optional[str], env: dict,
+                  timeout: Optional[float] = UNIT_PASS_TIMEOUT) -> dict:
+    """Compile one unit to PDF (runs in a worker process)."""
+    try:
+        return run_pdflatex(unit_path, format_path, timeout=timeout, env=env)
+    except subprocess.TimeoutExpired:
+        return {
+            "success": False,
+            "stdout": "",
+            "stderr": f"pdflatex timed out after {timeout} seconds",
+        }
+
+
+def compile_latex_in_parallel(
+    content: str,
+    tex_path,
+    auto_fix: bool = False,
+    use_format: bool = True,
+    use_cache: bool = True,
+    preflight: bool = True,
+    max_workers: Optional[int] = None,
+    timeout: Optional[float] = UNIT_PASS_TIMEOUT
+) -> bool:
+    """
+    Compile in-memory LaTeX content to a PDF next to tex_path, splitting it
+    into section units that compile concurrently.
+    
+    The full .tex is still written to tex_path. Unit sources and their
+    auxiliary files go to a ``<name>-parts`` directory beside it, which is
+    removed afterwards. timeout bounds each pdflatex pass over a unit. If
+    the document cannot be split, fails the pre-flight check or a unit
+    fails, it is compiled serially with latex_content_to_pdf. Returns True
+    on success, like latex_content_to_pdf.
+    """
+    tex_path = Path(tex_path).resolve()
+    pdf_path = tex_path.with_suffix(".pdf")
+    
+    cache_key = None
+    if use_cache:
+        cache_key = compile_cache_key(content.splitlines(), auto_fix, tex_path.parent)
+        if get_compile_cache().fetch(cache_key, pdf_path):
+            tex_path.write_text(content, encoding="utf-8")
+            print(f"PDF served from compile cache: {pdf_path}")
+            return True
+    
+    if auto_fix and not all(check_latex_content(content)):
+        content, _ = fix_latex_content(content)
+    
+    def compile_serially(reason: str) -> bool:
+        print(f"{reason}; compiling the whole document in one run")
+        return latex_content_to_pdf(
+            content, str(tex_path), auto_fix=auto_fix, use_format=use_format,
+            use_cache=use_cache, preflight=preflight
+        )
+    
+    split = split_latex_units(content)
+    if split is None:
+        return compile_serially("Document cannot be split into sections for parallel compilation")
+    if preflight and lint_latex_content(content, tex_path.parent)[0]:
+        # The serial path reports the errors without running pdflatex
+        return compile_serially("Pre-flight check failed")
+    preamble, bodies = split
+    tex_path.write_text(content, encoding="utf-8")
+    
+    parts_dir = tex_path.parent / f"{tex_path.stem}-parts"
+    parts_dir.mkdir(exist_ok=True)
+    try:
+        success = _compile_units(
+            preamble, bodies, tex_path, parts_dir, content, use_format, max_workers, timeout
+        )
+    except Exception as e:
+        # A crashed worker or a merge error; the serial run decides the outcome
+        print(f"Parallel compilation failed: {e}")
+        success = False
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    if not success:
+        return compile_serially("A section failed to compile on its own")
+    
+    print(f"PDF generated successfully: {pdf_path}")
+    if cache_key:
+        get_compile_cache().put(cache_key, pdf_path)
+    return True
+
+
+def _compile_units(preamble: str, bodies: List[str], tex_path: Path, parts_dir: Path,
+                   content: str, use_format: bool, max_workers: Optional[int],
+                   timeout: Optional[float]) -> bool:
+    """Compile the units concurrently and merge them into the document's PDF."""
+    unit_paths = [str(parts_dir / f"part-{index:03d}.tex") for index in range(1, len(bodies) + 1)]
+    
+    # Relative \includegraphics and \input paths resolve against the main file
+    env = {"TEXINPUTS": f".{os.pathsep}{tex_path.parent}{os.pathsep}"}
+    format_path = find_format_for_content(content, None, timeout) if use_format else None
+    
+    # Counter values at the start of each unit
+    counters_before = []
+    totals = {name: 0 for name in CARRIED_COUNTERS}
+    for body in bodies:
+        counters_before.append(dict(totals))
+        for name, count in _count_carried(body).items():
+            totals[name] += count
+    
+    print(f"Compiling {len(bodies)} sections in parallel...")
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+        # Phase 1: count the pages of every unit
+        for unit_path, body, counters in zip(unit_paths, bodies, counters_before):
+            Path(unit_path).write_text(
+                _unit_source(preamble, body, 1, counters, count_pages=True), encoding="utf-8"
+            )
+        page_counts = list(executor.map(
+            _count_unit_pages, unit_paths, [format_path] * len(bodies), [env] * len(bodies),
+            [timeout] * len(bodies)
+        ))
+        if None in page_counts:
+            print(f"Error during pdflatex run for {unit_paths[page_counts.index(None)]}")
+            return False
+        
+        # Phase 2: compile every unit starting at its page offset
+        first_page = 1
+        for unit_path, body, counters, pages in zip(unit_paths, bodies, counters_before, page_counts):
+            Path(unit_path).write_text(
+                _unit_source(preamble, body, first_page, counters, count_pages=False),
+                encoding="utf-8"
+            )
+            first_page += pages
+        results = list(executor.map(
+            _compile_unit, unit_paths, [format_path] * len(bodies), [env] * len(bodies),
+            [timeout] * len(bodies)
+        ))
+    
+    for unit_path, result in zip(unit_paths, results):
+        if not result["success"]:
+            print(f"Error during pdflatex run for {unit_path}")
+            return False
+    
+    unit_pdfs = [Path(unit_path).with_suffix(".pdf") for unit_path in unit_paths]
+    merge_pdfs(unit_pdfs, tex_path.with_suffix(".pdf"))
+    return True
@@ -0,0 +1,88 @@
+"""
+PDF post-processing helpers: merging and splitting compiled PDFs.
+
+These require the optional ``pypdf`` package (``pip install xtotext[pdf]``).
+"""
+
+from pathlib import Path
+from typing import List, Sequence, Tuple, Union
+
+try:
+    from pypdf import PdfReader, PdfWriter
+    PYPDF_AVAILABLE = True
+except ImportError:
+    PYPDF_AVAILABLE = False
+
+
+def _require_pypdf():
+    if not PYPDF_AVAILABLE:
+        raise ImportError("pypdf is required for PDF merging and splitting: pip install pypdf")
+
+
+def count_pdf_pages(pdf_path: Union[str, Path]) -> int:
+    """Return the number of pages in a PDF."""
+    _require_pypdf()
+    return len(PdfReader(str(pdf_path)).pages)
+
+
+def merge_pdfs(pdf_paths: Sequence[Union[str, Path]], output_path: Union[str, Path]) -> str:
+    """
+    Concatenate PDFs into one file.
+    
+    Each part's outline (bookmarks) is carried over with its page targets
+    shifted by the pages that precede it, so the merged file has a single
+    outline covering every part.
+    """
+    _require_pypdf()
+    writer = PdfWriter()
+    for pdf_path in pdf_paths:
+        writer.append(str(pdf_path), import_outline=True)
+    
+    with open(output_path, "wb") as file:
+        writer.write(file)
+    return str(output_path)
+
+
+def split_pdf(
+    pdf_path: Union[str, Path],
+    page_ranges: List[Tuple[int, int]],
+    output_paths: Sequence[Union[str, Path]]
+) -> List[str]:
+    """
+    Split a PDF into several files.
+    
+    Args:
+        pdf_path: PDF to split
+        page_ranges: ``(first, last)`` zero-based inclusive page indices per output
+        output_paths: Destination for each range
+    
+    Returns:
+        The written output paths
+    """
+    _require_pypdf()
+    reader = PdfReader(str(pdf_path))
+    written = []
+    for (first, last), output_path in zip(page_ranges, output_paths):
+        writer = PdfWriter()
+        for index in range(first, last + 1):
+            writer.add_page(reader.pages[index])
+        _copy_outline(reader, writer, reader.outline, first, last)
+        with open(output_path, "wb") as file:
+            writer.write(file)
+        written.append(str(output_path))
+    return written
+
+
+def _copy_outline(reader, writer, items, first: int, last: int, parent=None) -> None:
+    """Copy the bookmarks that point into [first, last] to a split-off PDF."""
+    previous = None
+    for item in items:
+        if isinstance(item, list):
+            # Children of the preceding bookmark
+            if previous is not None:
+                _copy_outline(reader, writer, item, first, last, previous)
+            continue
+        previous = None
+        page = reader.get_destination_page_number(item)
+        if page is not None and first <= page <= last:
+            previous = writer.add_outline_item(item.title, page - first, parent=parent)
@@ -0,0 +1,170 @@
+"""
+Resource limits for the external tools xtox runs (pdflatex, ffmpeg).
+
+A document with an infinite macro loop or a huge TikZ picture can keep a
+core busy and grow its memory until the host swaps. Commands wrapped with
+:func:`limited_command` get POSIX rlimits before the tool starts: CPU
+seconds, address space, output file size and open files.
+
+The limits are not set from ``preexec_fn``, which is unsafe when the parent
+runs threads (as the backend's compile pool does). Instead the command is
+started through the ``prlimit`` utility, or, where it is missing, through a
+small Python trampoline that sets the limits and then execs the tool. Either
+way the tool runs with its limits from its first instruction and keeps the
+same process, so return codes and signals are the tool's own.
+
+When a run fails, :func:`exceeded_limit` works out whether a limit was the
+cause, from the signal that ended it (SIGXCPU, SIGXFSZ) or from the
+allocation and file errors the tool printed. Callers report this with
+:class:`ResourceLimitExceeded`.
+
+On platforms without the ``resource`` module (Windows), limits are not
+applied.
+"""
+
+import re
+import shutil
+import signal
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, Optional, Sequence
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+LIMIT_CPU = "cpu"
+LIMIT_MEMORY = "memory"
+LIMIT_FILE_SIZE = "file_size"
+LIMIT_OPEN_FILES = "open_files"
+
+LIMIT_DESCRIPTIONS = {
+    LIMIT_CPU: "CPU time",
+    LIMIT_MEMORY: "memory",
+    LIMIT_FILE_SIZE: "output file size",
+    LIMIT_OPEN_FILES: "open file",
+}
+
+MEMORY_ERROR_PATTERN = re.compile(
+    r"Cannot allocate memory|[Oo]ut of memory|memory exhausted|"
+    r"[Mm]emory allocation (?:error|failed)|std::bad_alloc"
+)
+OPEN_FILES_ERROR_PATTERN = re.compile(r"Too many open files")
+# For tools that ignore SIGXFSZ and see the failed write instead
+FILE_SIZE_ERROR_PATTERN = re.compile(r"File too large")
+
+# prlimit options for each resource
+PRLIMIT_OPTIONS = {
+    "RLIMIT_CPU": "--cpu",
+    "RLIMIT_AS": "--as",
+    "RLIMIT_FSIZE": "--fsize",
+    "RLIMIT_NOFILE": "--nofile",
+}
+
+# Sets ``NAME:soft:hard`` limits, then replaces itself with the tool given
+# after ``--`` as its path followed by its argv
+TRAMPOLINE = (
+    "import os, resource, sys\n"
+    "args = sys.argv[1:]\n"
+    "split = args.index('--')\n"
+    "for spec in args[:split]:\n"
+    "    name, soft, hard = spec.split(':')\n"
+    "    resource.setrlimit(getattr(resource, name), (int(soft), int(hard)))\n"
+    "os.execv(args[split + 1], args[split + 2:])\n"
+)
+
+
+class ResourceLimitExceeded(RuntimeError):
+    """Raised when a subprocess was stopped by one of its resource limits."""
+    
+    def __init__(self, limit: str):
+        self.limit = limit
+        super().__init__(f"Process exceeded its {LIMIT_DESCRIPTIONS.get(limit, limit)} limit")
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """
+    Per-process rlimits; None or 0 leaves a limit unset.
+    
+    Attributes:
+        cpu_seconds: CPU time (RLIMIT_CPU)
+        memory_bytes: Address space (RLIMIT_AS)
+        file_size_bytes: Largest file the process may write (RLIMIT_FSIZE)
+        open_files: Open file descriptors (RLIMIT_NOFILE)
+    """
+    cpu_seconds: Optional[int] = None
+    memory_bytes: Optional[int] = None
+    file_size_bytes: Optional[int] = None
+    open_files: Optional[int] = None
+    
+    def rlimits(self) -> Dict[str, tuple]:
+        """The (soft, hard) pairs to set, by ``resource`` constant name."""
+        if not RESOURCE_AVAILABLE:
+            return {}
+        limits = {}
+        if self.cpu_seconds:
+            # SIGXCPU at the soft limit, SIGKILL a second later if ignored
+            limits["RLIMIT_CPU"] = (self.cpu_seconds, self.cpu_seconds + 1)
+        if self.memory_bytes:
+            limits["RLIMIT_AS"] = (self.memory_bytes, self.memory_bytes)
+        if self.file_size_bytes:
+            limits["RLIMIT_FSIZE"] = (self.file_size_bytes, self.file_size_bytes)
+        if self.open_files:
+            limits["RLIMIT_NOFILE"] = (self.open_files, self.open_files)
+        return limits
+
+
+def limited_command(
+    command: Sequence[str],
+    limits: Optional[ResourceLimits],
+    env: Optional[Mapping[str, str]] = None
+) -> List[str]:
+    """
+    Wrap a command so that it runs under limits, if any.
+    
+    The tool is looked up on env's PATH (or the current one) first, so a
+    missing tool still raises FileNotFoundError in the caller, as Popen
+    would.
+    """
+    command = [str(part) for part in command]
+    rlimits = limits.rlimits() if limits else {}
+    if not rlimits:
+        return command
+    
+    path = env.get("PATH") if env is not None else None
+    executable = shutil.which(command[0], path=path)
+    if executable is None:
+        raise FileNotFoundError(f"No such file or directory: '{command[0]}'")
+    
+    prlimit = shutil.which("prlimit")
+    if prlimit:
+        options = [f"{PRLIMIT_OPTIONS[name]}={soft}:{hard}" for name, (soft, hard) in rlimits.items()]
+        return [prlimit, *options, executable, *command[1:]]
+    
+    specs = [f"{name}:{soft}:{hard}" for name, (soft, hard) in rlimits.items()]
+    return [sys.executable, "-I", "-S", "-c", TRAMPOLINE, *specs, "--", executable, *command]
+
+
+def exceeded_limit(limits: Optional[ResourceLimits], returncode: int, output: str = "") -> Optional[str]:
+    """
+    Work out whether a failed run was stopped by one of its limits.
+    
+    Returns LIMIT_CPU, LIMIT_MEMORY, LIMIT_FILE_SIZE, LIMIT_OPEN_FILES, or
+    None when the failure has another cause.
+    """
+    if not limits or returncode == 0 or not RESOURCE_AVAILABLE:
+        return None
+    if limits.cpu_seconds and returncode in (-signal.SIGXCPU, 128 + signal.SIGXCPU):
+        return LIMIT_CPU
+    if limits.file_size_bytes and (
+        returncode in (-signal.SIGXFSZ, 128 + signal.SIGXFSZ) or FILE_SIZE_ERROR_PATTERN.search(output)
+    ):
+        return LIMIT_FILE_SIZE
+    if limits.memory_bytes and MEMORY_ERROR_PATTERN.search(output):
+        return LIMIT_MEMORY
+    if limits.open_files and OPEN_FILES_ERROR_PATTERN.search(output):
+        return LIMIT_OPEN_FILES
+    return None
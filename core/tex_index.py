@@ -0,0 +1,276 @@
+"""
+Persistent index of what the local TeX installation provides.
+
+Finding out whether a package is installed used to cost a kpsewhich call or
+a failed pdflatex run. This index reads the kpathsea ``ls-R`` databases once
+and records every ``.sty``, ``.cls`` and ``.fmt`` file, plus the location
+and version of pdflatex. The index is stored as JSON and reused until the
+TeX tree changes. A change is detected from the mtimes of the ls-R files,
+their directories and the pdflatex binary, which only needs a few ``stat``
+calls and no processes.
+
+ls-R databases do not cover every tree: TEXMFHOME (``~/texmf``) usually has
+none. Names missing from the index are therefore confirmed with one
+kpsewhich call before they are reported as not installed. Installations
+without any ls-R database (such as MiKTeX) give an empty index; lookups then
+return None, meaning unknown, and callers fall back to asking kpsewhich.
+
+A long-running process re-checks the stamps at most every
+``TEX_INDEX_CHECK_INTERVAL`` seconds, so packages installed while it runs are
+picked up.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+TEX_INDEX_PATH = Path(
+    os.environ.get("XTOX_TEX_INDEX", Path.home() / ".cache" / "xtox" / "tex-index.json")
+)
+INDEXED_EXTENSIONS = (".sty", ".cls", ".fmt")
+TEX_INDEX_VERSION = 1
+TEX_INDEX_CHECK_INTERVAL = 10.0
+
+
+def _mtime(path) -> Optional[int]:
+    """Return a path's mtime in nanoseconds, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _run(command: List[str]) -> Optional[str]:
+    """Run a TeX tool and return its stdout, or None if it fails."""
+    try:
+        result = subprocess.run(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding='utf-8',
+            errors='replace'
+        )
+    except FileNotFoundError:
+        return None
+    return result.stdout if result.returncode == 0 else None
+
+
+def _kpsewhich(names: Iterable[str]) -> Optional[Set[str]]:
+    """Return which of the names kpsewhich finds, or None if it is not available."""
+    try:
+        result = subprocess.run(
+            ["kpsewhich", *names],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding='utf-8',
+            errors='replace'
+        )
+    except FileNotFoundError:
+        return None
+    # kpsewhich exits non-zero when any name is missing, but still prints the rest
+    return {os.path.basename(line.strip()) for line in result.stdout.splitlines()}
+
+
+def read_ls_r(ls_r_path) -> Dict[str, str]:
+    """
+    Read an ls-R database and return indexed file names mapped to full paths.
+    
+    ls-R lists each directory as a ``./relative/dir:`` line followed by the
+    names it contains; the first directory listing a name wins.
+    """
+    root = os.path.dirname(os.path.abspath(ls_r_path))
+    files: Dict[str, str] = {}
+    directory = root
+    with open(ls_r_path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            line = line.rstrip("\n")
+            if not line or line.startswith("%"):
+                continue
+            if line.endswith(":") and ("/" in line or line == ".:"):
+                directory = os.path.normpath(os.path.join(root, line[:-1]))
+            elif line.endswith(INDEXED_EXTENSIONS) and line not in files:
+                files[line] = os.path.join(directory, line)
+    return files
+
+
+class TexIndex:
+    """
+    Lookup table of installed TeX files, persisted to disk.
+    """
+    
+    def __init__(self, index_path=None):
+        self.index_path = Path(index_path or TEX_INDEX_PATH)
+        self._data: Optional[Dict] = None
+        self._checked = 0.0
+        # kpsewhich answers for names the ls-R databases do not list
+        self._outside_index: Dict[str, bool] = {}
+        # Lookups run in worker threads of the backend
+        self._lock = threading.RLock()
+    
+    @property
+    def data(self) -> Dict:
+        """The index contents, loaded on first use and rebuilt when the TeX tree changes."""
+        with self._lock:
+            now = time.monotonic()
+            if self._data is not None and now - self._checked < TEX_INDEX_CHECK_INTERVAL:
+                return self._data
+            
+            # Packages may have been added to unindexed trees since the last check
+            self._outside_index.clear()
+            data = self._data if self._data is not None else self._load()
+            if data is None or data.get("stamps") != self._stamps(data):
+                data = self.rebuild()
+            self._data = data
+            self._checked = now
+            return data
+    
+    @property
+    def pdflatex_path(self) -> Optional[str]:
+        """Path to the pdflatex binary, or None if it is not installed."""
+        return self.data["pdflatex"]
+    
+    @property
+    def tex_version(self) -> Optional[str]:
+        """First line of ``pdflatex --version``, or None if unavailable."""
+        return self.data["tex_version"]
+    
+    @property
+    def complete(self) -> bool:
+        """Whether the index was built from ls-R databases and can answer lookups."""
+        return bool(self.data["ls_r"])
+    
+    def find(self, name: str) -> Optional[str]:
+        """Return the full path of an installed file such as ``amsmath.sty``."""
+        return self.data["files"].get(name)
+    
+    def is_installed(self, name: str) -> Optional[bool]:
+        """Check whether a file is installed; None when the index cannot tell."""
+        missing = self.missing([name])
+        return None if missing is None else name not in missing
+    
+    def missing(self, names: Iterable[str]) -> Optional[Set[str]]:
+        """
+        Return which of the names are not installed, or None if unknown.
+        
+        Names the index lacks are confirmed with kpsewhich, since trees
+        without an ls-R database (such as TEXMFHOME) are not indexed.
+        """
+        if not self.complete:
+            return None
+        files = self.data["files"]
+        absent = {name for name in names if name not in files}
+        
+        # Answer from a snapshot; the memo may be cleared by another thread
+        with self._lock:
+            answers = {name: self._outside_index.get(name) for name in absent}
+        unknown = sorted(name for name, installed in answers.items() if installed is None)
+        if unknown:
+            found = _kpsewhich(unknown)
+            if found is None:
+                return absent
+            with self._lock:
+                for name in unknown:
+                    answers[name] = self._outside_index[name] = name in found
+        return {name for name in absent if not answers[name]}
+    
+    def rebuild(self) -> Dict:
+        """Scan the TeX installation and persist a fresh index."""
+        pdflatex = shutil.which("pdflatex")
+        data = {
+            "version": TEX_INDEX_VERSION,
+            "pdflatex": pdflatex,
+            "tex_version": None,
+            "ls_r": [],
+            "files": {},
+        }
+        
+        if pdflatex:
+            output = _run(["pdflatex", "--version"])
+            if output:
+                data["tex_version"] = output.splitlines()[0].strip()
+            
+            # One kpsewhich call lists every ls-R database, in search order
+            output = _run(["kpsewhich", "-all", "ls-R"]) or ""
+            for ls_r_path in output.splitlines():
+                ls_r_path = os.path.abspath(ls_r_path.strip())
+                if not ls_r_path or ls_r_path in data["ls_r"]:
+                    continue
+                try:
+                    files = read_ls_r(ls_r_path)
+                except OSError:
+                    continue
+                data["ls_r"].append(ls_r_path)
+                for name, path in files.items():
+                    data["files"].setdefault(name, path)
+        
+        data["stamps"] = self._stamps(data)
+        self._save(data)
+        with self._lock:
+            self._data = data
+        return data
+    
+    def _stamps(self, data: Dict) -> Dict[str, Optional[int]]:
+        """mtimes that change whenever the TeX installation does."""
+        pdflatex = shutil.which("pdflatex")
+        stamps = {"pdflatex": pdflatex, "pdflatex_mtime": _mtime(pdflatex) if pdflatex else None}
+        for ls_r_path in data.get("ls_r", []):
+            stamps[ls_r_path] = _mtime(ls_r_path)
+            stamps[os.path.dirname(ls_r_path)] = _mtime(os.path.dirname(ls_r_path))
+        return stamps
+    
+    def _load(self) -> Optional[Dict]:
+        """Read the persisted index, or None if it is missing or outdated."""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != TEX_INDEX_VERSION:
+            return None
+        return data
+    
+    def _save(self, data: Dict) -> None:
+        """Write the index through a temporary file so readers never see a partial one."""
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.index_path.parent, suffix=".tmp")
+        except OSError:
+            # Read-only home: keep the index in memory only
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+_default_index: Optional[TexIndex] = None
+
+
+def get_tex_index() -> TexIndex:
+    """Return the process-wide index configured from the environment."""
+    global _default_index
+    if _default_index is None:
+        _default_index = TexIndex()
+    return _default_index
+
+
+def find_tex_file(name: str) -> Optional[str]:
+    """Return the installed path of a TeX file such as ``amsmath.sty``."""
+    return get_tex_index().find(name)
+
+
+def is_tex_file_installed(name: str) -> Optional[bool]:
+    """Check whether a TeX file is installed; None when the index cannot tell."""
+    return get_tex_index().is_installed(name)
@@ -51,6 +51,12 @@ setup(
             "uvicorn",
             "pydantic",
         ],
+        "pdf": [
+            "pypdf>=3.0",
+        ],
+        "highlight": [
+            "pygments>=2.0",
+        ],
     },
     entry_points={
         "console_scripts": [
@@ -0,0 +1,132 @@
+"""
+Test grouping, combined sources and error attribution for batch compilation.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from xtox.core.batch_compile import (
+    attribute_errors,
+    attribute_warnings,
+    build_batch_source,
+    compile_latex_batch,
+    group_documents,
+    read_page_counts,
+    split_document,
+)
+
+PREAMBLE = "\\documentclass{article}\n\\begin{document}\n"
+
+
+def test_group_documents_by_preamble(tmp_path):
+    """Test that only small, self-contained documents with one preamble are grouped."""
+    documents = {
+        str(tmp_path / "a.tex"): PREAMBLE + "First\n\\end{document}\n",
+        str(tmp_path / "b.tex"): PREAMBLE + "Second\n\\end{document}\n",
+        str(tmp_path / "c.tex"): PREAMBLE + "See \\ref{x}\n\\end{document}\n",
+        str(tmp_path / "d.tex"): "\\documentclass{report}\n\\begin{document}\nOther\n\\end{document}\n",
+        str(tmp_path / "e.tex"): "No structure\n",
+        str(tmp_path / "f.tex"): PREAMBLE + "\\newgeometry{margin=1cm}\n\\end{document}\n",
+    }
+    groups, singles = group_documents(documents)
+
+    assert groups == [[str(tmp_path / "a.tex"), str(tmp_path / "b.tex")]]
+    assert sorted(singles) == [str(tmp_path / name) for name in ("c.tex", "d.tex", "e.tex", "f.tex")]
+
+
+def test_batch_source_maps_errors_to_documents():
+    """Test that log line numbers map back to the original document lines."""
+    first = PREAMBLE + "one\ntwo\n\\end{document}\n"
+    second = PREAMBLE + "three\n\\bad\n\\end{document}\n"
+    preamble, body = split_document(first)
+    source, spans = build_batch_source(preamble, [body, split_document(second)[1]])
+
+    lines = source.splitlines()
+    first_line, last_line, offset = spans[1]
+    assert lines[first_line - 1:last_line] == ["three", "\\bad"]
+    assert source.endswith("\\end{document}\n")
+    assert lines[first_line - 2] == "\\begingroup"
+    assert lines[last_line] == "\\clearpage\\endgroup"
+
+    output = f"! Undefined control sequence.\nl.{last_line} \\bad\n"
+    assert attribute_errors(output, spans) == {1: ["! Undefined control sequence. l.4 \\bad"]}
+    assert attribute_errors("! Emergency stop.\nl.1 \\documentclass\n", spans) is None
+
+    assert read_page_counts("XTOX-BATCH-PAGES=0:2\nXTOX-BATCH-PAGES=1:1\n", 2) == [2, 1]
+    assert read_page_counts("XTOX-BATCH-PAGES=0:2\n", 2) is None
+
+
+def test_warnings_are_attributed_to_documents():
+    """Test that warnings in a combined log reach the document that caused them."""
+    bodies = ["one\ntwo\n", "three\n\\cite{x}\n"]
+    source, spans = build_batch_source(PREAMBLE, bodies)
+    first_line, last_line, offset = spans[1]
+
+    output = (
+        "LaTeX Warning: Unused global option(s) on input line 1.\n"
+        "Overfull \\hbox (1.0pt too wide) in paragraph at lines 5--5\n"
+        "LaTeX Font Warning: Font shape `OT1/cmr/bx/sc' undefined\n"
+        "XTOX-BATCH-PAGES=0:1\n"
+        f"LaTeX Warning: Citation `x' on page 2 undefined on input line {last_line}.\n"
+        "XTOX-BATCH-PAGES=1:1\n"
+        "LaTeX Warning: There were undefined references.\n"
+    )
+    warnings = attribute_warnings(output, spans)
+
+    assert warnings[0] == [
+        "LaTeX Warning: Unused global option(s) on input line 1.",
+        "LaTeX Font Warning: Font shape `OT1/cmr/bx/sc' undefined",
+        "LaTeX Warning: There were undefined references.",
+    ]
+    assert warnings[1] == [
+        "LaTeX Warning: Unused global option(s) on input line 1.",
+        f"LaTeX Warning: Citation `x' on page 2 undefined on input line {last_line - offset}.",
+        "LaTeX Warning: There were undefined references.",
+    ]
+    assert last_line - offset == 4
+
+
+@pytest.mark.skipif(shutil.which("pdflatex") is None, reason="pdflatex not installed")
+def test_batched_documents_do_not_share_font_size(tmp_path):
+    """Test that a size change in one document does not leak into the next."""
+    pypdf = pytest.importorskip("pypdf")
+    (tmp_path / "a.tex").write_text(PREAMBLE + "\\Large Big text\n\\end{document}\n", encoding="utf-8")
+    (tmp_path / "b.tex").write_text(PREAMBLE + "Normal text\n\\end{document}\n", encoding="utf-8")
+    (tmp_path / "alone").mkdir()
+    shutil.copy(tmp_path / "b.tex", tmp_path / "alone" / "b.tex")
+
+    results = compile_latex_batch([tmp_path / "a.tex", tmp_path / "b.tex"], use_format=False)
+    alone = compile_latex_batch([tmp_path / "alone" / "b.tex"], use_format=False)
+    assert results[str(tmp_path / "b.tex")]["batched"]
+
+    def fonts(pdf_path):
+        resources = pypdf.PdfReader(pdf_path).pages[0]["/Resources"]["/Font"]
+        return sorted(str(font.get_object()["/BaseFont"]).split("+")[-1] for font in resources.values())
+
+    batched_fonts = fonts(results[str(tmp_path / "b.tex")]["pdf_path"])
+    assert batched_fonts == fonts(alone[str(tmp_path / "alone" / "b.tex")]["pdf_path"])
+    assert os.path.isfile(results[str(tmp_path / "a.tex")]["pdf_path"])
+
+
+def test_split_pdf_keeps_outline_per_range(tmp_path):
+    """Test that split PDFs keep the bookmarks that fall into their pages."""
+    pypdf = pytest.importorskip("pypdf")
+    from xtox.core.pdf_tools import split_pdf
+
+    writer = pypdf.PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=612, height=792)
+    writer.add_outline_item("First", 0)
+    writer.add_outline_item("Second", 2)
+    combined = tmp_path / "combined.pdf"
+    with open(combined, "wb") as file:
+        writer.write(file)
+
+    outputs = split_pdf(combined, [(0, 1), (2, 2)], [tmp_path / "a.pdf", tmp_path / "b.pdf"])
+    readers = [pypdf.PdfReader(path) for path in outputs]
+
+    assert [len(reader.pages) for reader in readers] == [2, 1]
+    assert [[item.title for item in reader.outline] for reader in readers] == [["First"], ["Second"]]
+    assert readers[1].get_destination_page_number(readers[1].outline[0]) == 0
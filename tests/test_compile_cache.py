@@ -0,0 +1,109 @@
+"""
+Test the content-addressed PDF compile cache.
+"""
+
+import importlib
+
+from xtox.core.compile_cache import CompileCache, compile_cache_key, compile_cache_key_for_file
+
+
+SOURCE = "\\documentclass{article}\n\\begin{document}\n\\includegraphics{pic}\n\\end{document}\n"
+
+
+def test_cache_key_tracks_source_flags_and_images(tmp_path):
+    """Test that the key changes with anything that affects the PDF."""
+    (tmp_path / "pic.png").write_bytes(b"one")
+    key = compile_cache_key(SOURCE.splitlines(), False, tmp_path)
+
+    assert compile_cache_key(SOURCE.replace("\n", "  \r\n").splitlines(), False, tmp_path) == key
+    assert compile_cache_key(SOURCE.splitlines(), True, tmp_path) != key
+
+    (tmp_path / "pic.png").write_bytes(b"two")
+    assert compile_cache_key(SOURCE.splitlines(), False, tmp_path) != key
+
+
+def test_cache_key_tracks_local_dependencies(tmp_path):
+    """Test that inputs, bibliographies, local packages and graphicspath images are hashed."""
+    source = (
+        "\\documentclass{article}\n"
+        "\\usepackage{mystyle}\n"
+        "\\graphicspath{{figures/}}\n"
+        "\\begin{document}\n"
+        "\\input{chapter}\n"
+        "\\bibliography{refs}\n"
+        "\\end{document}\n"
+    ).splitlines()
+    (tmp_path / "figures").mkdir()
+    (tmp_path / "figures" / "plot.png").write_bytes(b"one")
+    (tmp_path / "chapter.tex").write_text("\\includegraphics{plot}\n", encoding="utf-8")
+    (tmp_path / "refs.bib").write_text("@book{a}", encoding="utf-8")
+    (tmp_path / "mystyle.sty").write_text("\\RequirePackage{xcolor}", encoding="utf-8")
+
+    keys = {compile_cache_key(source, False, tmp_path)}
+    for path, data in [
+        ("figures/plot.png", "two"),
+        ("chapter.tex", "\\includegraphics{plot}\nmore\n"),
+        ("refs.bib", "@book{b}"),
+        ("mystyle.sty", "\\RequirePackage{tikz}"),
+    ]:
+        (tmp_path / path).write_text(data, encoding="utf-8")
+        keys.add(compile_cache_key(source, False, tmp_path))
+    assert len(keys) == 5
+
+
+def test_cache_key_skips_sources_with_macro_dependencies(tmp_path):
+    """Test that dependencies only pdflatex can resolve make a source uncacheable."""
+    assert compile_cache_key(["\\input{\\chapterfile}"], False, tmp_path) is None
+    assert compile_cache_key(["\\input\\jobname.extra"], False, tmp_path) is None
+    assert compile_cache_key(["% \\input{\\unused}"], False, tmp_path) is not None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test the size cap and LRU order."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF" + b"x" * 100)
+    cache = CompileCache(tmp_path / "cache", max_bytes=400)
+
+    cache.put("a", pdf, warnings=["Overfull \\hbox"])
+    cache.put("b", pdf)
+    assert cache.get("a")["warnings"] == ["Overfull \\hbox"]
+    cache.put("c", pdf)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_fetch_treats_a_concurrently_evicted_entry_as_a_miss(tmp_path, monkeypatch):
+    """Test that an entry removed between lookup and copy is a miss, not an error."""
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF")
+    cache = CompileCache(tmp_path / "cache")
+    cache.put("a", pdf)
+
+    lookup = cache.get
+
+    def get_then_evict(key):
+        entry = lookup(key)
+        (tmp_path / "cache" / "a.pdf").unlink()
+        return entry
+
+    monkeypatch.setattr(cache, "get", get_then_evict)
+    assert cache.fetch("a", tmp_path / "out.pdf") is None
+
+
+def test_latex_to_pdf_serves_cache_hits(tmp_path, monkeypatch):
+    """Test that a cache hit produces the PDF without running pdflatex."""
+    # The package re-exports the function under the module's name
+    latex_to_pdf_module = importlib.import_module("xtox.core.latex_to_pdf")
+    tex = tmp_path / "doc.tex"
+    tex.write_text(SOURCE, encoding="utf-8")
+    cached_pdf = tmp_path / "cached.pdf"
+    cached_pdf.write_bytes(b"%PDF cached")
+
+    cache = CompileCache(tmp_path / "cache")
+    cache.put(compile_cache_key_for_file(tex), cached_pdf)
+    monkeypatch.setattr(latex_to_pdf_module, "get_compile_cache", lambda: cache)
+
+    assert latex_to_pdf_module.latex_to_pdf(str(tex))
+    assert (tmp_path / "doc.pdf").read_bytes() == b"%PDF cached"
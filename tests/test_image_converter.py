@@ -0,0 +1,72 @@
+"""
+Test image resampling and compression.
+"""
+
+from pathlib import Path
+
+from PIL import Image
+
+from xtox.core import DocumentConverter, ImageConverter
+
+
+def test_downsample_to_dpi_caches_derivatives(tmp_path):
+    """Test that large images are resampled once to their printed size and small ones are kept."""
+    photo = tmp_path / "photo.jpg"
+    Image.new("RGB", (4000, 3000), "navy").save(photo, quality=90)
+    icon = tmp_path / "icon.png"
+    Image.new("RGBA", (300, 300), "red").save(icon)
+    converter = ImageConverter()
+
+    derived = converter.downsample_to_dpi(photo, tmp_path / "derived", width_inches=5.2, dpi=150)
+    with Image.open(derived) as img:
+        assert img.size == (780, 585)
+        assert img.format == "JPEG"
+
+    mtime = Path(derived).stat().st_mtime_ns
+    assert converter.downsample_to_dpi(photo, tmp_path / "derived", 5.2, 150) == derived
+    assert Path(derived).stat().st_mtime_ns == mtime
+
+    assert converter.downsample_to_dpi(icon, tmp_path / "derived", 5.2, 150) == str(icon)
+
+
+def test_convert_markdown_points_latex_at_downsampled_images(tmp_path):
+    """Test that DocumentConverter references the derivative when image_dpi is set."""
+    Image.new("RGB", (3000, 2000), "green").save(tmp_path / "wide.jpg")
+    md_file = tmp_path / "doc.md"
+    md_file.write_text("# Title\n\n![Wide](wide.jpg)\n", encoding="utf-8")
+
+    converter = DocumentConverter(output_dir=str(tmp_path / "out"), image_dpi=100)
+    result = converter.convert_markdown(md_file, ["latex"])
+
+    (derived,) = result["images"]
+    assert derived.endswith("-520x347.jpg")
+    latex = (tmp_path / "out" / "doc.tex").read_text(encoding="utf-8")
+    assert f"{{{derived}}}" in latex
+
+
+def test_compress_image_to_target_size(tmp_path):
+    """Test that compression meets the target in memory, lowering resolution only when needed."""
+    from PIL import features
+
+    source = tmp_path / "source.png"
+    Image.effect_mandelbrot((1200, 900), (-2, -1.2, 1, 1.2), 100).convert("RGB").save(source)
+    converter = ImageConverter()
+
+    formats = ["jpg", "webp"] + (["avif"] if features.check("avif") else [])
+    for extension in formats:
+        output = tmp_path / f"out.{extension}"
+        converter.compress_image(source, output, target_size_kb=30)
+        assert output.stat().st_size <= 30 * 1024
+        with Image.open(output) as img:
+            assert img.size == (1200, 900)
+
+    small = tmp_path / "small.jpg"
+    converter.compress_image(source, small, target_size_kb=5)
+    assert small.stat().st_size <= 5 * 1024
+    with Image.open(small) as img:
+        assert img.width < 1200
+
+    # Nothing but the results is written
+    assert sorted(path.name for path in tmp_path.iterdir()) == sorted(
+        ["source.png", "small.jpg"] + [f"out.{extension}" for extension in formats]
+    )
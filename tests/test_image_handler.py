@@ -0,0 +1,54 @@
+"""
+Test staging of images referenced from Markdown.
+"""
+
+import os
+
+from xtox.utils.image_handler import (
+    MANIFEST_NAME,
+    copy_images_to_output_dir,
+    find_image_references,
+    update_image_paths,
+)
+
+
+def test_images_are_staged_once_by_content(tmp_path, capsys):
+    """Test that staging dedupes content, keeps same-named images apart and skips unchanged ones."""
+    source = tmp_path / "src"
+    (source / "a").mkdir(parents=True)
+    (source / "b").mkdir()
+    (source / "a" / "logo.png").write_bytes(b"first logo")
+    (source / "b" / "logo.png").write_bytes(b"second logo")
+    (source / "copy.png").write_bytes(b"first logo")
+    markdown = "![](a/logo.png) ![](b/logo.png) ![](copy.png) ![](a/logo.png) ![](missing.png)"
+    output = tmp_path / "out"
+
+    mapping = copy_images_to_output_dir(markdown, str(source), str(output))
+
+    assert set(mapping) == {"a/logo.png", "b/logo.png", "copy.png"}
+    assert mapping["a/logo.png"] != mapping["b/logo.png"]
+    assert mapping["a/logo.png"] == mapping["copy.png"]
+    assert (output / mapping["b/logo.png"]).read_bytes() == b"second logo"
+    staged = sorted(name for name in os.listdir(output / "images") if name != MANIFEST_NAME)
+    assert len(staged) == 2
+
+    # A second conversion finds every image already staged
+    capsys.readouterr()
+    assert copy_images_to_output_dir(markdown, str(source), str(output)) == mapping
+    assert "→" not in capsys.readouterr().out
+
+
+def test_image_paths_are_rewritten_in_one_pass():
+    """Test that image references are found once and rewritten from their offsets."""
+    markdown = "![A](a.png) text [link](a.png) ![B](b.png)\n![A again](a.png) ![C](c.png)"
+    references = find_image_references(markdown)
+
+    assert [(ref.alt, ref.path) for ref in references] == [
+        ("A", "a.png"), ("B", "b.png"), ("A again", "a.png"), ("C", "c.png")
+    ]
+    assert markdown[references[1].start:references[1].end] == "b.png"
+
+    mapping = {"a.png": "images/1.png", "b.png": "images/2.png"}
+    expected = "![A](images/1.png) text [link](a.png) ![B](images/2.png)\n![A again](images/1.png) ![C](c.png)"
+    assert update_image_paths(markdown, mapping, references) == expected
+    assert update_image_paths(markdown, mapping) == expected
@@ -0,0 +1,146 @@
+"""
+Test precompiled formats and pdflatex pass control.
+"""
+
+import os
+import time
+
+import xtox.core.latex_format as latex_format
+from xtox.core import convert_markdown_to_latex
+from xtox.core.latex_format import extract_dump_preamble, find_format_for_file
+
+
+def test_markdown_preamble_stops_at_dump_marker():
+    """Test that hyperref is kept out of the dumped Markdown preamble."""
+    latex = convert_markdown_to_latex("# Title\n")
+    preamble = extract_dump_preamble(latex)
+
+    assert preamble.startswith("\\documentclass{article}")
+    assert "\\usepackage{listings}" in preamble
+    assert "hyperref" not in preamble
+    assert extract_dump_preamble("no preamble here") is None
+
+
+def test_format_policy(tmp_path, monkeypatch):
+    """Test which preambles are dumped and when."""
+    dumped = []
+    monkeypatch.setattr(latex_format, "get_tex_version", lambda: "pdfTeX 3.14")
+    monkeypatch.setattr(
+        latex_format, "dump_format",
+        lambda preamble, *args: dumped.append(preamble) or "fmt"
+    )
+
+    marked = tmp_path / "marked.tex"
+    marked.write_text(convert_markdown_to_latex("text\n"), encoding="utf-8")
+    assert find_format_for_file(marked, tmp_path) == "fmt"
+
+    plain = tmp_path / "plain.tex"
+    plain.write_text(
+        "\\documentclass{article}\n\\usepackage{amsmath}\n"
+        "\\begin{document}\nx\n\\end{document}\n",
+        encoding="utf-8"
+    )
+    assert find_format_for_file(plain, tmp_path) is None
+    assert find_format_for_file(plain, tmp_path) == "fmt"
+
+    linked = tmp_path / "linked.tex"
+    linked.write_text(
+        "\\documentclass{article}\n\\usepackage{hyperref}\n"
+        "\\begin{document}\nx\n\\end{document}\n",
+        encoding="utf-8"
+    )
+    assert find_format_for_file(linked, tmp_path) is None
+    assert find_format_for_file(linked, tmp_path) is None
+    assert len(dumped) == 2
+
+
+def test_format_cache_evicts_least_recently_used(tmp_path):
+    """Test that formats and marker files are capped by size in LRU order."""
+    for index, name in enumerate(["old.fmt", "a.seen", "b.failed", "new.fmt"]):
+        path = tmp_path / name
+        path.write_bytes(b"x" * (10000 if name.endswith(".fmt") else 0))
+        os.utime(path, (index, index))
+    (tmp_path / "build-dir").mkdir()
+
+    latex_format.evict_formats(tmp_path, max_bytes=10000 + latex_format.MIN_ENTRY_BYTES)
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.failed", "build-dir", "new.fmt"]
+
+
+def _install_fake_pdflatex(tmp_path, monkeypatch):
+    """Put a pdflatex stand-in on PATH that records its arguments."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "pdflatex"
+    script.write_text(
+        "#!/usr/bin/env python3\n"
+        "import sys\n"
+        "name = sys.argv[-1][:-4]\n"
+        "open('calls.txt', 'a').write(' '.join(sys.argv[1:]) + '\\n')\n"
+        "open(name + '.aux', 'w').write('\\\\relax\\n')\n"
+        "if '-draftmode' not in sys.argv:\n"
+        "    open(name + '.pdf', 'w').write('%PDF')\n",
+        encoding="utf-8"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_run_pdflatex_reruns_only_when_needed(tmp_path, monkeypatch):
+    """Test that passes stop once auxiliary files settle."""
+    from xtox.core.latex_to_pdf import run_pdflatex
+
+    _install_fake_pdflatex(tmp_path, monkeypatch)
+
+    plain = tmp_path / "plain.tex"
+    plain.write_text("\\documentclass{article}\n\\begin{document}\nx\n\\end{document}\n")
+    result = run_pdflatex(plain)
+    assert result["success"] and result["passes"] == 1
+
+    refs = tmp_path / "refs.tex"
+    refs.write_text("\\documentclass{article}\n\\begin{document}\nsee \\ref{a}\n\\end{document}\n")
+    result = run_pdflatex(refs)
+    calls = (tmp_path / "calls.txt").read_text().splitlines()
+    assert result["passes"] == 2
+    assert "-draftmode" in calls[1] and "-draftmode" not in calls[2]
+    assert (tmp_path / "refs.pdf").exists()
+
+    # A recompile with the .aux still in place needs a single full pass
+    result = run_pdflatex(refs)
+    calls = (tmp_path / "calls.txt").read_text().splitlines()
+    assert result["passes"] == 1
+    assert len(calls) == 4 and "-draftmode" not in calls[3]
+
+
+def test_run_pdflatex_stops_after_max_errors(tmp_path, monkeypatch):
+    """Test that a run printing error after error is killed at the limit."""
+    from xtox.core.latex_to_pdf import run_pdflatex
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "pdflatex"
+    script.write_text(
+        "#!/usr/bin/env python3\n"
+        "import sys, time\n"
+        "for line in range(1, 1000):\n"
+        "    print('! Undefined control sequence.')\n"
+        "    print(f'l.{line} \\\\bad')\n"
+        "    sys.stdout.flush()\n"
+        "    time.sleep(0.05)\n"
+        "sys.exit(1)\n",
+        encoding="utf-8"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    broken = tmp_path / "broken.tex"
+    broken.write_text("\\documentclass{article}\n\\begin{document}\n\\bad\n\\end{document}\n")
+    started = time.monotonic()
+    result = run_pdflatex(broken, max_errors=2, timeout=30)
+
+    assert time.monotonic() - started < 10
+    assert result["aborted"] and not result["success"]
+    assert [str(diagnostic) for diagnostic in result["diagnostics"]] == [
+        "! Undefined control sequence. l.1 \\bad",
+        "! Undefined control sequence. l.2 \\bad",
+    ]
@@ -0,0 +1,95 @@
+"""
+Test the pre-flight LaTeX checks that run before pdflatex.
+"""
+
+from xtox.core import lint_latex_content
+from xtox.core import latex_lint
+
+
+def test_lint_reports_unbalanced_braces_and_environments():
+    """Test that balance errors carry the line pdflatex would report."""
+    content = (
+        "\\documentclass{article}\n"
+        "\\begin{document}\n"
+        "\\verb|{| and \\{ % {\n"
+        "\\begin{itemize}\n"
+        "\\item {open\n"
+        "\\end{enumerate}\n"
+        "\\begin{verbatim}\n"
+        "{{ unbalanced is fine here\n"
+        "\\end{verbatim}\n"
+        "}}\n"
+        "\\end{document}\n"
+        "ignored {\n"
+    )
+    errors, _ = lint_latex_content(content, check_packages=False)
+
+    assert errors == [
+        "! LaTeX Error: \\begin{itemize} on input line 4 ended by \\end{enumerate}. l.6 \\end{enumerate}",
+        "! Too many }'s. l.10 }}",
+    ]
+
+
+def test_lint_checks_packages_and_images(tmp_path, monkeypatch):
+    """Test that missing packages and images are reported, found ones are not."""
+    monkeypatch.setitem(latex_lint._installed_files, "article.cls", True)
+    monkeypatch.setitem(latex_lint._installed_files, "graphicx.sty", True)
+    monkeypatch.setitem(latex_lint._installed_files, "nosuch.sty", False)
+    for extension in (".pdf", ".png", ".jpg", ".jpeg"):
+        monkeypatch.setitem(latex_lint._installed_files, f"missing{extension}", False)
+        monkeypatch.setitem(latex_lint._installed_files, f"example-image{extension}", extension == ".pdf")
+    (tmp_path / "img").mkdir()
+    (tmp_path / "img" / "logo.png").write_bytes(b"png")
+
+    content = (
+        "\\documentclass{article}\n"
+        "\\usepackage{graphicx, nosuch}\n"
+        "\\graphicspath{{img/}}\n"
+        "\\begin{document}\n"
+        "\\includegraphics[width=2cm]{logo}\n"
+        "\\includegraphics{missing}\n"
+        "\\includegraphics{example-image}\n"
+        "\\end{document}\n"
+    )
+    errors, warnings = lint_latex_content(content, tmp_path)
+
+    assert errors == [
+        "! LaTeX Error: File `nosuch.sty' not found. l.2 \\usepackage{graphicx, nosuch}",
+        "! LaTeX Error: File `missing' not found. l.6 \\includegraphics{missing}",
+    ]
+    assert warnings == []
+
+
+def test_lint_finds_packages_next_to_the_document(tmp_path, monkeypatch):
+    """Test that local .cls and .sty files count as installed."""
+    monkeypatch.setitem(latex_lint._installed_files, "mythesis.cls", False)
+    monkeypatch.setitem(latex_lint._installed_files, "mystyle.sty", False)
+    (tmp_path / "mythesis.cls").write_text("", encoding="utf-8")
+    (tmp_path / "mystyle.sty").write_text("", encoding="utf-8")
+    content = (
+        "\\documentclass{mythesis}\n"
+        "\\usepackage{mystyle}\n"
+        "\\begin{document}\n"
+        "\\end{document}\n"
+    )
+
+    assert lint_latex_content(content, tmp_path) == ([], [])
+    errors, _ = lint_latex_content(content, tmp_path / "elsewhere")
+    assert len(errors) == 2
+
+
+def test_lint_skips_verbatim_arguments():
+    """Test that % and braces inside URLs and inline code are not LaTeX."""
+    content = (
+        "\\documentclass{article}\n"
+        "\\begin{document}\n"
+        "\\url{http://example.com/a%20b}\n"
+        "\\href{http://x.org/%7Euser}{home}\n"
+        "\\lstinline|}| and \\lstinline[language=C]{a{b}c} and \\path|%{|\n"
+        "\\mintinline{python}|{| \\urlstyle{same}\n"
+        "\\end{document}\n"
+    )
+
+    assert lint_latex_content(content, check_packages=False) == ([], [])
+    errors, _ = lint_latex_content(content.replace("{home}", "{home"), check_packages=False)
+    assert errors == ["! File ended while scanning use of a group: { is never closed. l.4 \\href{http://x.org/%7Euser}{home"]
@@ -0,0 +1,60 @@
+"""
+Test the streaming pdflatex log parser.
+"""
+
+from xtox.core import parse_latex_log_file
+from xtox.core.latex_log import LatexLogParser, summarize_diagnostics
+
+SAMPLE_LOG = """\
+This is pdfTeX, Version 3.141592653-2.6-1.40.25 (TeX Live 2023)
+(./doc.tex
+LaTeX2e <2022-11-01> patch level 1
+(/usr/share/texlive/texmf-dist/tex/latex/base/article.cls
+Document Class: article 2022/07/02 v1.4n Standard LaTeX document class
+(/usr/share/texlive/texmf-dist/tex/latex/base/size10.clo))
+(/usr/share/texlive/texmf-dist/tex/latex/hyperref/hyperref.sty
+Package hyperref Warning: Option `pdfauthor' has already been used,
+(hyperref)                setting the option has no effect on input line 5.
+
+)
+! Undefined control sequence.
+l.12 \\foo
+         bar
+LaTeX Warning: Reference `sec:x' on page 1 undefined on input line 14.
+
+Overfull \\hbox (12.0pt too wide) in paragraph at lines 20--21
+[1] (./doc.aux) )
+"""
+
+
+def test_parse_log_file_structures_diagnostics(tmp_path):
+    """Test severities, files and lines, and the summary kept on results."""
+    log_path = tmp_path / "doc.log"
+    log_path.write_text(SAMPLE_LOG)
+    diagnostics = parse_latex_log_file(log_path)
+
+    assert [(d.severity, d.file, d.line) for d in diagnostics] == [
+        ("warning", "/usr/share/texlive/texmf-dist/tex/latex/hyperref/hyperref.sty", 5),
+        ("error", "./doc.tex", 12),
+        ("warning", "./doc.tex", 14),
+        ("badbox", "./doc.tex", 20),
+    ]
+    errors, warnings = summarize_diagnostics(diagnostics)
+    assert errors == ["! Undefined control sequence. l.12 \\foo"]
+    assert warnings[0].endswith("setting the option has no effect on input line 5.")
+
+
+def test_parser_is_incremental_and_unwraps_long_lines():
+    """Test that errors surface as soon as complete and wrapped lines are joined."""
+    message = "! LaTeX Error: File `" + "a" * 70 + "x.sty' not found."
+    parser = LatexLogParser()
+
+    assert parser.feed(message[:79] + "\n" + message[79:] + "\n\n") == []
+    assert parser.error_count == 1
+    found = parser.feed("l.3 \\usepack")
+    assert found == []
+    found = parser.feed("age{x}\n")
+    assert [(d.message, d.line, d.context) for d in found] == [
+        (message[2:], 3, "\\usepackage{x}")
+    ]
+    assert parser.close() == []
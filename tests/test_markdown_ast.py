@@ -0,0 +1,158 @@
+"""
+Test the shared Markdown parser and the emitters built on it.
+"""
+
+import hashlib
+
+from xtox.core import DocumentConverter, parse_markdown
+from xtox.core.markdown_ast import CodeBlock, Heading, ListBlock, Paragraph, Table
+
+
+SAMPLE_MARKDOWN = """# Title
+
+Some text
+continued here.
+
+- first
+  - nested
+1. one
+
+| A | B |
+|---|---|
+| 1 | 2 |
+
+```python
+# not a heading
+```
+"""
+
+
+def test_parse_markdown_blocks():
+    """Test that blocks are parsed once into the expected tree."""
+    blocks = parse_markdown(SAMPLE_MARKDOWN).blocks
+
+    assert blocks[0] == Heading(level=1, text="Title")
+    assert blocks[1] == Paragraph(text="Some text\ncontinued here.")
+    assert isinstance(blocks[2], ListBlock)
+    assert [(item.level, item.ordered) for item in blocks[2].items] == [
+        (0, False), (1, False), (0, True)
+    ]
+    assert blocks[3] == Table(header=["A", "B"], rows=[["1", "2"]])
+    assert blocks[4] == CodeBlock(language="python", lines=["# not a heading"])
+
+
+def test_convert_markdown_to_multiple_formats(tmp_path):
+    """Test rendering LaTeX, HTML and DOCX from a single parse."""
+    md_file = tmp_path / "doc.md"
+    md_file.write_text(SAMPLE_MARKDOWN, encoding="utf-8")
+
+    converter = DocumentConverter(output_dir=str(tmp_path / "out"))
+    result = converter.convert_markdown(md_file, ["latex", "html", "docx"])
+
+    latex = (tmp_path / "out" / "doc.tex").read_text(encoding="utf-8")
+    html = (tmp_path / "out" / "doc.html").read_text(encoding="utf-8")
+    assert result["latex_path"].endswith("doc.tex")
+    assert (tmp_path / "out" / "doc.docx").exists()
+    assert "\\section{Title}" in latex
+    assert "\\begin{enumerate}" in latex
+    assert "<h1>Title</h1>" in html
+    assert "<th>A</th>" in html
+
+
+def test_latex_stream_matches_batch_conversion():
+    """Test that streaming conversion yields the same LaTeX as the batch API."""
+    from xtox.core import convert_markdown_to_latex, convert_markdown_to_latex_stream
+
+    streamed = ''.join(convert_markdown_to_latex_stream(SAMPLE_MARKDOWN.splitlines(True)))
+    assert streamed == convert_markdown_to_latex(SAMPLE_MARKDOWN)
+
+
+def test_latex_stream_is_incremental():
+    """Test that fragments are yielded before the whole input is read."""
+    from xtox.core import convert_markdown_to_latex_stream
+
+    consumed = []
+
+    def source():
+        for line in ["# One", "", "text", "", "# Two"]:
+            consumed.append(line)
+            yield line
+
+    fragments = convert_markdown_to_latex_stream(source(), include_preamble=False)
+    assert next(fragments) == "\\section{One}\n\n"
+    assert len(consumed) == 1
+
+
+def test_long_tables_stream_as_longtable_chunks():
+    """Test that long tables are parsed in bounded chunks and become a longtable."""
+    from xtox.core import convert_markdown_to_latex, convert_markdown_to_latex_stream, iter_blocks
+    from xtox.core.markdown_to_latex import TABLE_CHUNK_ROWS
+
+    lines = ["| Name | Description |", "|---|---|"]
+    lines += [f"| row{i} | a longer description of row {i} |" for i in range(TABLE_CHUNK_ROWS * 2 + 5)]
+
+    chunks = list(iter_blocks(lines, table_chunk_rows=TABLE_CHUNK_ROWS))
+    assert [len(chunk.rows) for chunk in chunks] == [TABLE_CHUNK_ROWS, TABLE_CHUNK_ROWS, 5]
+    assert [(chunk.continued, chunk.more) for chunk in chunks] == [(False, True), (True, True), (True, False)]
+
+    streamed = ''.join(convert_markdown_to_latex_stream(lines, include_preamble=False))
+    assert streamed == convert_markdown_to_latex('\n'.join(lines), include_preamble=False)
+    assert streamed.count("\\begin{longtable}") == 1
+    assert streamed.count("\\end{longtable}") == 1
+    assert streamed.count("\\endhead") == 1
+    assert "\\begin{table}" not in streamed
+    assert "row2004 & a longer description of row 2004 \\\\ \\hline\n\\end{longtable}" in streamed
+
+    # Short tables keep the floating tabular
+    short = convert_markdown_to_latex('\n'.join(lines[:5]), include_preamble=False)
+    assert "\\begin{tabular}{|cc|}" in short
+
+
+def test_markdown_to_pdf_streaming_writes_latex(tmp_path, monkeypatch):
+    """Test the streaming PDF path stages images and writes the LaTeX file."""
+    import xtox.core.document_converter as document_converter
+
+    (tmp_path / "pic.png").write_bytes(b"png")
+    md_file = tmp_path / "doc.md"
+    md_file.write_text("# Title\n\n![Alt](pic.png)\n", encoding="utf-8")
+
+    def fake_latex_to_pdf(tex_path, auto_fix=False):
+        (tmp_path / "out" / "doc.pdf").write_bytes(b"%PDF")
+        return True
+
+    monkeypatch.setattr(document_converter, "latex_to_pdf", fake_latex_to_pdf)
+    converter = DocumentConverter(output_dir=str(tmp_path / "out"))
+    result = converter.markdown_to_pdf(md_file, stream=True)
+
+    # Staged images are named after their content
+    staged = "images/" + hashlib.sha256(b"png").hexdigest()[:16] + ".png"
+    latex = (tmp_path / "out" / "doc.tex").read_text(encoding="utf-8")
+    assert f"\\includegraphics[width=0.8\\textwidth]{{{staged}}}" in latex
+    assert result["images"] == [staged]
+
+
+def test_inline_formatting_escapes_in_one_pass():
+    """Test LaTeX inline rendering of markup and special characters."""
+    from xtox.core.markdown_to_latex import process_inline_formatting
+
+    assert process_inline_formatting("**bold** and *it*") == "\\textbf{bold} and \\textit{it}"
+    assert process_inline_formatting("snake_case & 50%") == "snake\\_case \\& 50\\%"
+    assert process_inline_formatting("`a_b` [x](http://e.com/#top)") == (
+        "\\texttt{a\\_b} \\href{http://e.com/\\#top}{x}"
+    )
+
+
+def test_inline_formatting_shared_by_html_and_docx():
+    """Test that the HTML and DOCX backends render the same inline tokens."""
+    from docx import Document
+    from xtox.core.markdown_to_docx import _add_formatted_text_to_paragraph
+    from xtox.core.markdown_to_html import _process_inline_formatting
+
+    assert _process_inline_formatting("**a** <b> [l](u)") == (
+        '<strong>a</strong> &lt;b&gt; <a href="u">l</a>'
+    )
+
+    paragraph = Document().add_paragraph()
+    _add_formatted_text_to_paragraph(paragraph, "x **bold *both***")
+    runs = [(run.text, bool(run.bold), bool(run.italic)) for run in paragraph.runs]
+    assert runs == [("x ", False, False), ("bold ", True, False), ("both", True, True)]
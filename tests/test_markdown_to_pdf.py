@@ -0,0 +1,81 @@
+"""
+Test the direct Markdown to PDF renderer and engine selection.
+"""
+
+import pytest
+
+from xtox.core import DocumentConverter
+from xtox.core.markdown_ast import parse_markdown
+from xtox.core.markdown_to_pdf import convert_markdown_to_pdf, find_unsupported_features
+
+pypdf = pytest.importorskip("pypdf")
+
+SIMPLE_MARKDOWN = """# Introduction
+
+Some **bold** text and a [link](https://example.com/docs).
+
+- First item
+  - Nested item
+1. Numbered
+
+> A quotation.
+
+![A red square](square.jpg)
+"""
+
+
+def _write_image(path):
+    Image = pytest.importorskip("PIL.Image")
+    Image.new("RGB", (40, 30), (200, 30, 30)).save(path)
+
+
+def test_unsupported_features_are_reported(tmp_path):
+    """Test that tables, code, unknown images and unencodable text are flagged."""
+    _write_image(tmp_path / "square.jpg")
+    assert find_unsupported_features(parse_markdown(SIMPLE_MARKDOWN), tmp_path) == []
+
+    document = parse_markdown(
+        "| a | b |\n|---|---|\n| 1 | 2 |\n\n```\ncode\n```\n\n![x](missing.png)\n\nΩ\n"
+    )
+    assert find_unsupported_features(document, tmp_path) == [
+        "tables",
+        "code blocks",
+        "image missing.png (not found)",
+        "characters outside the standard PDF fonts",
+    ]
+
+
+def test_direct_pdf_has_text_links_and_images(tmp_path):
+    """Test that the rendered PDF carries the text, link and embedded image."""
+    _write_image(tmp_path / "square.jpg")
+    output = tmp_path / "simple.pdf"
+    convert_markdown_to_pdf(SIMPLE_MARKDOWN + "\nfiller text " * 400, output, tmp_path)
+
+    reader = pypdf.PdfReader(output)
+    text = reader.pages[0].extract_text()
+    assert "1  Introduction" in text
+    assert "Some bold text and a link." in text
+    assert len(reader.pages) > 1
+
+    links = [annotation.get_object()["/A"]["/URI"] for annotation in reader.pages[0]["/Annots"]]
+    assert links == ["https://example.com/docs"]
+    images = [image for page in reader.pages for image in page.images]
+    assert images and images[0].image.size == (40, 30)
+
+
+def test_engine_selection(tmp_path):
+    """Test that auto and direct engines render simple documents without LaTeX."""
+    _write_image(tmp_path / "square.jpg")
+    source = tmp_path / "simple.md"
+    source.write_text(SIMPLE_MARKDOWN, encoding="utf-8")
+
+    result = DocumentConverter(pdf_engine="auto").markdown_to_pdf(source)
+    assert result["engine"] == "direct"
+    assert (tmp_path / "simple.pdf").read_bytes().startswith(b"%PDF-")
+
+    code = tmp_path / "code.md"
+    code.write_text("# Code\n\n```\nprint(1)\n```\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="code blocks"):
+        DocumentConverter().markdown_to_pdf(code, engine="direct")
+    with pytest.raises(ValueError, match="Unknown PDF engine"):
+        DocumentConverter(pdf_engine="fast")
@@ -87,4 +87,112 @@ This is a test document for the conversion workflow.
     
     # Check that the output files were created
     assert os.path.exists(result["latex_path"])
-    assert os.path.exists(result["pdf_path"])
\ No newline at end of file
+    assert os.path.exists(result["pdf_path"])
+
+def test_markdown_to_latex_scales_linearly(monkeypatch):
+    """Test that doubling the input exactly doubles the conversion work."""
+    from xtox.core import convert_markdown_to_latex
+    from xtox.core import markdown_to_latex
+
+    section = """## Section
+
+A paragraph with **bold**, *italic* and `code`.
+
+- item one
+- item two
+
+| A | B |
+|---|---|
+| 1 | 2 |
+
+```python
+x = 1
+```
+
+"""
+
+    # Count what the emitter does instead of timing it, which is flaky
+    work = {}
+    iter_inline = markdown_to_latex.iter_inline
+    render_latex = markdown_to_latex.render_latex
+
+    def counting_iter_inline(text):
+        work["inline_calls"] += 1
+        work["inline_chars"] += len(text)
+        return iter_inline(text)
+
+    def counting_render_latex(*args, **kwargs):
+        for fragment in render_latex(*args, **kwargs):
+            work["fragments"] += 1
+            work["fragment_chars"] += len(fragment)
+            yield fragment
+
+    monkeypatch.setattr(markdown_to_latex, "iter_inline", counting_iter_inline)
+    monkeypatch.setattr(markdown_to_latex, "render_latex", counting_render_latex)
+
+    def measure(markdown_content):
+        work.update(inline_calls=0, inline_chars=0, fragments=0, fragment_chars=0)
+        latex = convert_markdown_to_latex(markdown_content)
+        # The output is joined once from the fragments, never rebuilt
+        assert len(latex) == work["fragment_chars"]
+        return dict(work)
+
+    empty = measure("")
+    single = measure(section * 50)
+    double = measure(section * 100)
+    assert single["inline_calls"] > empty["inline_calls"]
+
+    for key in work:
+        assert double[key] - empty[key] == 2 * (single[key] - empty[key])
+
+
+def test_fix_latex_content_in_memory(tmp_path):
+    """Test structure fixing on strings and the path-based wrapper."""
+    from xtox.core import check_latex_content, fix_latex_content, fix_latex_structure
+
+    fixed, changed = fix_latex_content("\\usepackage{amsmath}\nHello\n")
+    assert changed
+    assert all(check_latex_content(fixed))
+    assert "\\n" not in fixed
+    assert fixed.index("\\usepackage{amsmath}") < fixed.index("\\begin{document}") < fixed.index("Hello")
+
+    complete = "\\documentclass{article}\n\\begin{document}\nx\n\\end{document}\n"
+    assert fix_latex_content(complete) == (complete, False)
+
+    tex_file = tmp_path / "doc.tex"
+    tex_file.write_text("Hello\n", encoding="utf-8")
+    fix_latex_structure(str(tex_file))
+    assert tex_file.read_text(encoding="utf-8") == fix_latex_content("Hello\n")[0]
+    assert (tmp_path / "doc.tex.bak").read_text(encoding="utf-8") == "Hello\n"
+
+
+def test_code_block_listing_strategies(tmp_path):
+    """Test that long code blocks skip lstlisting and highlighting is cached."""
+    from xtox.core import convert_markdown_to_latex
+    from xtox.core import code_highlight
+    from xtox.core.markdown_to_latex import HIGHLIGHT_MAX_LINES, LISTINGS_MAX_LINES
+
+    def code_block(line_count):
+        lines = ["def f(x):  # {comment}", "    return '\\\\n'"] * (line_count // 2)
+        return "```python\n" + "\n".join(lines) + "\n```\n"
+
+    assert "\\begin{lstlisting}[language=python]" in convert_markdown_to_latex(code_block(10))
+
+    highlighted = convert_markdown_to_latex(code_block(LISTINGS_MAX_LINES + 2))
+    assert "\\begin{Verbatim}[commandchars=\\\\\\{\\}]" in highlighted
+    assert "lstlisting" not in highlighted.split("\\begin{document}")[1]
+    if code_highlight.PYGMENTS_AVAILABLE:
+        assert "\\XK{def}" in highlighted
+        assert "\\XC{# \\XZob{}comment\\XZcb{}}" in highlighted
+
+    plain = convert_markdown_to_latex(code_block(HIGHLIGHT_MAX_LINES + 2))
+    assert "\\begin{verbatim}\ndef f(x):  # {comment}\n" in plain
+
+    # The same block is served from the cache on the next build
+    lines = ["x = 1"] * code_highlight.HIGHLIGHT_DISK_CACHE_MIN_LINES
+    first = code_highlight.highlight_code(lines, "python", cache_dir=tmp_path)
+    code_highlight.clear_highlight_cache()
+    if code_highlight.PYGMENTS_AVAILABLE:
+        assert len(list(tmp_path.glob("*.tex"))) == 1
+    assert code_highlight.highlight_code(lines, "python", cache_dir=tmp_path) == first
+    assert len(first) == len(lines)
@@ -0,0 +1,85 @@
+"""
+Test section splitting for parallel compilation and PDF merging.
+"""
+
+import pytest
+
+from xtox.core import convert_markdown_to_latex
+from xtox.core.parallel_compile import _count_carried, _unit_source, split_latex_units
+
+
+def test_split_latex_units_at_sections():
+    """Test that units start at top-level sections and keep front matter."""
+    latex = convert_markdown_to_latex("Intro\n\n# One\n\ntext\n\n## Sub\n\n# Two\n\nmore\n")
+    preamble, bodies = split_latex_units(latex)
+
+    assert preamble.endswith("\\begin{document}\n")
+    assert len(bodies) == 2
+    assert bodies[0].startswith("\\maketitle")
+    assert "\\subsection{Sub}" in bodies[0]
+    assert bodies[1].startswith("\\section{Two}")
+
+    unit = _unit_source(preamble, bodies[1], 4, {"section": 1, "figure": 0}, False)
+    assert "\\setcounter{page}{4}\n\\setcounter{section}{1}\n\\section{Two}" in unit
+    assert unit.endswith("\\end{document}\n")
+
+    assert split_latex_units(latex.replace("\\maketitle", "\\tableofcontents")) is None
+    assert split_latex_units(latex.replace("more", "see \\ref{sec:one}")) is None
+    assert split_latex_units(latex.replace("more", "as in \\cite{knuth}")) is None
+    assert split_latex_units(convert_markdown_to_latex("# Only\n")) is None
+
+
+def test_split_latex_units_skips_verbatim_sections():
+    """Test that \\section lines inside code blocks neither split nor count."""
+    latex = convert_markdown_to_latex(
+        "# One\n\n```latex\n\\section{Shown}\ntext\n```\n\n# Two\n\nmore\n"
+    )
+    preamble, bodies = split_latex_units(latex)
+
+    assert len(bodies) == 2
+    assert "\\section{Shown}" in bodies[0]
+    assert bodies[1].startswith("\\section{Two}")
+    assert _count_carried(bodies[0])["section"] == 1
+
+
+def test_parallel_compile_falls_back_to_serial(tmp_path, monkeypatch):
+    """Test that a failing unit sends the whole document through the serial path."""
+    from xtox.core import parallel_compile
+
+    latex = convert_markdown_to_latex("# One\n\ntext\n\n# Two\n\nmore\n")
+    serial = []
+    monkeypatch.setattr(parallel_compile, "_compile_units", lambda *args: False)
+    monkeypatch.setattr(parallel_compile, "lint_latex_content", lambda content, base_dir: ([], []))
+    monkeypatch.setattr(
+        parallel_compile, "latex_content_to_pdf",
+        lambda content, tex_path, **options: serial.append(options) or True
+    )
+
+    assert parallel_compile.compile_latex_in_parallel(latex, tmp_path / "doc.tex", use_cache=False)
+    assert serial == [{"auto_fix": False, "use_format": True, "use_cache": False, "preflight": True}]
+    assert not (tmp_path / "doc-parts").exists()
+
+
+def test_merge_pdfs_keeps_outline(tmp_path):
+    """Test that merged PDFs keep every part's bookmarks at shifted pages."""
+    pypdf = pytest.importorskip("pypdf")
+    from xtox.core.pdf_tools import count_pdf_pages, merge_pdfs
+
+    parts = []
+    for index, pages in enumerate([2, 3]):
+        writer = pypdf.PdfWriter()
+        for _ in range(pages):
+            writer.add_blank_page(width=612, height=792)
+        writer.add_outline_item(f"Part {index}", 0)
+        path = tmp_path / f"part{index}.pdf"
+        with open(path, "wb") as file:
+            writer.write(file)
+        parts.append(path)
+
+    merged = merge_pdfs(parts, tmp_path / "merged.pdf")
+    reader = pypdf.PdfReader(merged)
+
+    assert count_pdf_pages(merged) == 5
+    assert [(item.title, reader.get_destination_page_number(item)) for item in reader.outline] == [
+        ("Part 0", 0), ("Part 1", 2)
+    ]
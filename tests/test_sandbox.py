@@ -0,0 +1,77 @@
+"""
+Test resource limits for external tools.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from xtox.core.sandbox import (
+    LIMIT_CPU,
+    LIMIT_FILE_SIZE,
+    RESOURCE_AVAILABLE,
+    ResourceLimitExceeded,
+    ResourceLimits,
+    exceeded_limit,
+    limited_command,
+)
+
+pytestmark = pytest.mark.skipif(not RESOURCE_AVAILABLE, reason="resource limits need POSIX")
+
+
+def test_file_size_limit_is_reported(tmp_path):
+    """Test that a process writing past its file size limit is recognised."""
+    limits = ResourceLimits(file_size_bytes=1024)
+    result = subprocess.run(
+        limited_command([sys.executable, "-c", "open('big.bin', 'wb').write(b'x' * 65536)"], limits),
+        cwd=tmp_path,
+        capture_output=True,
+        text=True
+    )
+
+    assert (tmp_path / "big.bin").stat().st_size <= 1024
+    assert exceeded_limit(limits, result.returncode, result.stderr) == LIMIT_FILE_SIZE
+    assert exceeded_limit(ResourceLimits(), result.returncode, result.stderr) is None
+    assert limited_command(["pdflatex", "doc.tex"], ResourceLimits()) == ["pdflatex", "doc.tex"]
+
+
+def test_limited_command_without_prlimit(tmp_path, monkeypatch):
+    """Test that the trampoline applies the limits where prlimit is missing."""
+    from xtox.core import sandbox
+
+    which = sandbox.shutil.which
+    monkeypatch.setattr(
+        sandbox.shutil, "which", lambda name, path=None: None if name == "prlimit" else which(name, path=path)
+    )
+    limits = ResourceLimits(open_files=17)
+    script = "import resource; print(resource.getrlimit(resource.RLIMIT_NOFILE))"
+    result = subprocess.run(
+        limited_command([sys.executable, "-c", script], limits),
+        capture_output=True,
+        text=True
+    )
+
+    assert result.stdout.strip() == "(17, 17)"
+    with pytest.raises(FileNotFoundError):
+        limited_command(["no-such-tool"], limits)
+
+
+def test_run_pdflatex_raises_on_cpu_limit(tmp_path, monkeypatch):
+    """Test that a compile spinning past its CPU time is stopped and reported."""
+    from xtox.core.latex_to_pdf import run_pdflatex
+
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "pdflatex"
+    script.write_text(f"#!{sys.executable}\nwhile True:\n    pass\n", encoding="utf-8")
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    loop = tmp_path / "loop.tex"
+    loop.write_text("\\documentclass{article}\n\\begin{document}\n\\def\\x{\\x}\\x\n\\end{document}\n")
+    with pytest.raises(ResourceLimitExceeded) as excinfo:
+        run_pdflatex(loop, limits=ResourceLimits(cpu_seconds=1), timeout=30)
+
+    assert excinfo.value.limit == LIMIT_CPU
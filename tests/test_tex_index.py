@@ -0,0 +1,91 @@
+"""
+Test the persisted index of installed TeX files.
+"""
+
+import os
+
+from xtox.core import tex_index
+from xtox.core.tex_index import TexIndex
+
+
+def test_tex_index_persists_and_rebuilds_on_tree_change(tmp_path, monkeypatch):
+    """Test that the index is read from ls-R, reused, and rebuilt after mktexlsr."""
+    tree = tmp_path / "texmf"
+    (tree / "tex" / "latex" / "amsmath").mkdir(parents=True)
+    ls_r = tree / "ls-R"
+    ls_r.write_text(
+        "% ls-R -- filename database for kpathsea; do not change this line.\n"
+        "./:\nls-R\ntex\n\n"
+        "./tex/latex/amsmath:\namsmath.sty\nREADME\n"
+    )
+    pdflatex = tmp_path / "pdflatex"
+    pdflatex.write_text("")
+
+    calls = []
+
+    def fake_run(command):
+        calls.append(command[0])
+        return "pdfTeX 3.141592653\n" if command[0] == "pdflatex" else f"{ls_r}\n"
+
+    monkeypatch.setattr(tex_index.shutil, "which", lambda name: str(pdflatex))
+    monkeypatch.setattr(tex_index, "_run", fake_run)
+    monkeypatch.setattr(tex_index, "_kpsewhich", lambda names: set())
+    index_path = tmp_path / "index.json"
+
+    index = TexIndex(index_path)
+    assert index.find("amsmath.sty") == str(tree / "tex" / "latex" / "amsmath" / "amsmath.sty")
+    assert index.missing(["amsmath.sty", "nosuch.sty"]) == {"nosuch.sty"}
+    assert index.tex_version == "pdfTeX 3.141592653"
+    assert calls == ["pdflatex", "kpsewhich"]
+
+    # Another process reuses the index without running anything
+    assert TexIndex(index_path).is_installed("amsmath.sty") is True
+    assert len(calls) == 2
+
+    # Installing a package rewrites ls-R, which invalidates the index
+    with open(ls_r, "a") as file:
+        file.write("\n./tex/latex/extra:\nextra.sty\n")
+    stat = ls_r.stat()
+    os.utime(ls_r, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert TexIndex(index_path).is_installed("extra.sty") is True
+    assert len(calls) == 4
+
+
+def test_tex_index_confirms_absent_names_and_refreshes(tmp_path, monkeypatch):
+    """Test that TEXMFHOME files are found through kpsewhich and ls-R changes are noticed."""
+    ls_r = tmp_path / "ls-R"
+    ls_r.write_text("./:\namsmath.sty\n")
+    pdflatex = tmp_path / "pdflatex"
+    pdflatex.write_text("")
+    monkeypatch.setattr(tex_index.shutil, "which", lambda name: str(pdflatex))
+    monkeypatch.setattr(tex_index, "_run", lambda command: f"{ls_r}\n")
+    lookups = []
+
+    def fake_kpsewhich(names):
+        lookups.append(list(names))
+        return {"homestyle.sty"} & set(names)
+
+    monkeypatch.setattr(tex_index, "_kpsewhich", fake_kpsewhich)
+    index = TexIndex(tmp_path / "index.json")
+
+    assert index.missing(["amsmath.sty", "homestyle.sty", "nosuch.sty"]) == {"nosuch.sty"}
+    assert index.is_installed("homestyle.sty") is True
+    assert lookups == [["homestyle.sty", "nosuch.sty"]]
+
+    # The same instance notices a rebuilt ls-R once the check interval passes
+    ls_r.write_text("./:\namsmath.sty\nextra.sty\n")
+    stat = ls_r.stat()
+    os.utime(ls_r, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    monkeypatch.setattr(tex_index, "TEX_INDEX_CHECK_INTERVAL", 0.0)
+    assert index.find("extra.sty") == str(tmp_path / "extra.sty")
+
+
+def test_tex_index_without_ls_r_cannot_answer(tmp_path, monkeypatch):
+    """Test that lookups are unknown rather than negative without ls-R."""
+    monkeypatch.setattr(tex_index.shutil, "which", lambda name: None)
+    index = TexIndex(tmp_path / "index.json")
+
+    assert index.pdflatex_path is None
+    assert index.is_installed("amsmath.sty") is None
+    assert index.missing(["amsmath.sty"]) is None
@@ -2,6 +2,11 @@
 Utility functions for xtotext.
 """
 
-from .image_handler import copy_images_to_output_dir, update_image_paths
+from .image_handler import (
+    ImageStager,
+    copy_images_to_output_dir,
+    find_image_references,
+    update_image_paths,
+)
 
-__all__ = ["copy_images_to_output_dir", "update_image_paths"]
\ No newline at end of file
+__all__ = ["ImageStager", "copy_images_to_output_dir", "find_image_references", "update_image_paths"]
\ No newline at end of file
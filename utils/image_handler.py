@@ -1,19 +1,87 @@
+import hashlib
+import json
 import os
 import re
 import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import NamedTuple
 
-def copy_images_to_output_dir(markdown_content, source_dir, target_dir):
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# ![alt](path): the opening up to the path, the path, and the closing parenthesis
+IMAGE_REFERENCE_PATTERN = re.compile(r'(!\[(.*?)\]\()(.*?)(\))')
+
+# Linux ioctl that makes dst share src's blocks (copy-on-write filesystems)
+FICLONE = 0x40049409
+
+# Remembers the size, mtime and hash of each source image between conversions
+MANIFEST_NAME = ".xtox-images.json"
+
+# Threads used to hash and copy images
+IMAGE_STAGING_WORKERS = min(8, os.cpu_count() or 1)
+
+class ImageReference(NamedTuple):
+    """An image reference in Markdown, with the offsets of its path."""
+    alt: str
+    path: str
+    start: int
+    end: int
+
+def find_image_references(markdown_content):
     """
-    Copy all images referenced in markdown to the target directory.
+    List every image reference in markdown, in order, in one scan.
+    
+    The result can be passed to copy_images_to_output_dir and
+    update_image_paths so neither scans the document again.
     """
-    images_dir = os.path.join(target_dir, "images")
-    os.makedirs(images_dir, exist_ok=True)
+    return [
+        ImageReference(match.group(2), match.group(3), match.start(3), match.end(3))
+        for match in IMAGE_REFERENCE_PATTERN.finditer(markdown_content)
+    ]
+
+class ImageStager:
+    """
+    Stage referenced images into a target's images directory.
     
-    image_matches = re.findall(r'!\[.*?\]\((.*?)\)', markdown_content)
-    path_mapping = {}
+    Each image is stored once under a name derived from a hash of its
+    content, so repeated references share one file and images with the same
+    basename in different folders do not overwrite each other. Files are
+    reflinked or hard-linked from the source where the filesystem allows and
+    copied otherwise. A manifest of source size, mtime and hash lets later
+    conversions skip unchanged images without reading them.
     
-    for image_path in image_matches:
+    Use as a context manager, or call ``close`` to save the manifest.
+    """
+    
+    def __init__(self, target_dir):
+        self.images_dir = os.path.join(target_dir, "images")
+        os.makedirs(self.images_dir, exist_ok=True)
+        self._manifest_path = os.path.join(self.images_dir, MANIFEST_NAME)
+        self._manifest = self._load_manifest()
+        self._manifest_changed = False
+        self._lock = threading.Lock()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+    
+    def stage(self, image_path, source_dir):
+        """
+        Stage a single referenced image.
+        
+        Returns the path to reference from the target directory, or None if the
+        image could not be found.
+        """
         full_source_path = os.path.join(source_dir, image_path)
         
         if not os.path.exists(full_source_path):
@@ -21,25 +89,165 @@ def copy_images_to_output_dir(markdown_content, source_dir, target_dir):
                 full_source_path = image_path
             else:
                 print(f"Warning: Image not found: {image_path}")
-                continue
+                return None
         
-        image_filename = os.path.basename(image_path)
-        target_path = os.path.join(images_dir, image_filename)
+        full_source_path = os.path.abspath(full_source_path)
+        stat = os.stat(full_source_path)
+        digest = self._digest(full_source_path, stat)
         
-        shutil.copy2(full_source_path, target_path)
-        print(f"Copied image: {image_path} → {target_path}")
+        image_filename = digest[:16] + Path(image_path).suffix.lower()
+        target_path = os.path.join(self.images_dir, image_filename)
         
-        path_mapping[image_path] = os.path.join("images", image_filename)
+        # Same content is already staged, by this run or an earlier one
+        if not (os.path.exists(target_path) and os.path.getsize(target_path) == stat.st_size):
+            method = _place_file(full_source_path, target_path)
+            print(f"{method} image: {image_path} → {target_path}")
+        
+        return os.path.join("images", image_filename)
+    
+    def stage_all(self, image_paths, source_dir):
+        """
+        Stage several images concurrently.
+        
+        Returns a mapping of each image path that was found to its staged path.
+        """
+        unique_paths = list(dict.fromkeys(image_paths))
+        with ThreadPoolExecutor(max_workers=IMAGE_STAGING_WORKERS) as executor:
+            staged = executor.map(lambda path: self.stage(path, source_dir), unique_paths)
+            return {
+                image_path: staged_path
+                for image_path, staged_path in zip(unique_paths, staged)
+                if staged_path is not None
+            }
     
-    return path_mapping
+    def close(self):
+        """Save the manifest if any image was hashed."""
+        if not self._manifest_changed:
+            return
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.images_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                json.dump(self._manifest, file)
+            os.replace(temp_path, self._manifest_path)
+            self._manifest_changed = False
+        except OSError as e:
+            print(f"Warning: Could not save image manifest: {e}")
+    
+    def _digest(self, source_path, stat):
+        """Hash an image, reusing the manifest entry if size and mtime match."""
+        with self._lock:
+            entry = self._manifest.get(source_path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest = digest.hexdigest()
+        
+        with self._lock:
+            self._manifest[source_path] = [stat.st_size, stat.st_mtime_ns, digest]
+            self._manifest_changed = True
+        return digest
+    
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+            return manifest if isinstance(manifest, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+def _place_file(source_path, target_path):
+    """
+    Put a copy of source_path at target_path as cheaply as the filesystem allows.
+    
+    Tries a reflink, then a hard link, then a regular copy, and returns which
+    one was used. The file is created under a temporary name and renamed into
+    place so readers never see it half written.
+    """
+    target_dir = os.path.dirname(target_path)
+    fd, temp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+    os.close(fd)
+    try:
+        if _reflink(source_path, temp_path):
+            method = "Reflinked"
+        else:
+            os.unlink(temp_path)
+            try:
+                os.link(source_path, temp_path)
+                method = "Linked"
+            except OSError:
+                shutil.copy2(source_path, temp_path)
+                method = "Copied"
+        os.replace(temp_path, target_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return method
+
+def _reflink(source_path, target_path):
+    """Clone source_path into target_path on copy-on-write filesystems."""
+    if not (FCNTL_AVAILABLE and sys.platform.startswith("linux")):
+        return False
+    try:
+        with open(source_path, "rb") as source, open(target_path, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        return True
+    except OSError:
+        return False
+
+def copy_images_to_output_dir(markdown_content, source_dir, target_dir, references=None):
+    """
+    Copy all images referenced in markdown to the target directory.
+    
+    references, from find_image_references, saves scanning the content again.
+    """
+    if references is None:
+        references = find_image_references(markdown_content)
+    
+    with ImageStager(target_dir) as stager:
+        return stager.stage_all([reference.path for reference in references], source_dir)
+
+def stage_image(image_path, source_dir, target_dir):
+    """
+    Copy a single referenced image into the target's images directory.
+    
+    Returns the path to reference from the target directory, or None if the
+    image could not be found. Use ImageStager directly to stage many images.
+    """
+    with ImageStager(target_dir) as stager:
+        return stager.stage(image_path, source_dir)
 
-def update_image_paths(markdown_content, path_mapping):
+def update_image_paths(markdown_content, path_mapping, references=None):
     """
     Update image paths in markdown content based on the mapping.
+    
+    The document is rebuilt in a single pass: from the offsets in references
+    when given, otherwise with one regex substitution that looks each path
+    up in the mapping.
     """
-    updated_content = markdown_content
-    for old_path, new_path in path_mapping.items():
-        updated_content = updated_content.replace(f'![]({old_path})', f'![]({new_path})')
-        updated_content = updated_content.replace(f']({old_path})', f']({new_path})')
+    if not path_mapping:
+        return markdown_content
+    
+    if references is None:
+        def replace(match):
+            new_path = path_mapping.get(match.group(3))
+            if new_path is None:
+                return match.group(0)
+            return match.group(1) + new_path + match.group(4)
+        
+        return IMAGE_REFERENCE_PATTERN.sub(replace, markdown_content)
     
-    return updated_content
\ No newline at end of file
+    parts = []
+    position = 0
+    for reference in references:
+        new_path = path_mapping.get(reference.path)
+        if new_path is not None:
+            parts.append(markdown_content[position:reference.start])
+            parts.append(new_path)
+            position = reference.end
+    parts.append(markdown_content[position:])
+    return ''.join(parts)
@@ -3,8 +3,8 @@ import sys
 from pathlib import Path
 from typing import Dict, List, Optional, Union
 
-from xtox.core import convert_markdown_to_latex, latex_to_pdf, fix_latex_structure, check_latex_structure
-from xtox.utils.image_handler import copy_images_to_output_dir, update_image_paths
+from xtox.core import convert_markdown_to_latex, check_latex_content, fix_latex_content, latex_content_to_pdf
+from xtox.utils.image_handler import copy_images_to_output_dir, find_image_references, update_image_paths
 
 def process_markdown_to_pdf(
     markdown_path: Union[str, Path], 
@@ -55,35 +55,39 @@ def process_markdown_to_pdf(
     
     # Process images
     print("Processing images...")
-    image_path_mapping = copy_images_to_output_dir(markdown_content, str(source_dir), str(output_dir))
+    image_references = find_image_references(markdown_content)
+    image_path_mapping = copy_images_to_output_dir(
+        markdown_content, str(source_dir), str(output_dir), references=image_references
+    )
     
     if image_path_mapping:
-        markdown_content = update_image_paths(markdown_content, image_path_mapping)
+        markdown_content = update_image_paths(markdown_content, image_path_mapping, image_references)
         print(f"Processed {len(image_path_mapping)} images")
     
-    # Convert to LaTeX
+    # Convert to LaTeX in memory; the .tex file is written once, before compiling
     print("Converting Markdown to LaTeX...")
-    latex_content = convert_markdown_to_latex(markdown_content, str(latex_path))
-    print(f"LaTeX file created: {latex_path}")
+    latex_content = convert_markdown_to_latex(markdown_content)
     
     # Apply refinements based on level
     if refinement_level > 0:
         print(f"Refining LaTeX (level {refinement_level})...")
-        if refinement_level == 1:
-            fix_latex_structure(str(latex_path), backup=False)
-        elif refinement_level >= 2:
-            fix_latex_structure(str(latex_path), backup=True)
-            if refinement_level >= 3:
-                # Future enhancement: More advanced LaTeX refinements
-                print("Advanced refinement (level 3) - reserved for future enhancements")
+        refined_content, changed = fix_latex_content(latex_content)
+        if changed and refinement_level >= 2:
+            with open(f"{latex_path}.bak", 'w', encoding='utf-8') as f:
+                f.write(latex_content)
+        latex_content = refined_content
+        if refinement_level >= 3:
+            # Future enhancement: More advanced LaTeX refinements
+            print("Advanced refinement (level 3) - reserved for future enhancements")
     
     # Generate PDF
     print("Generating PDF...")
-    success = latex_to_pdf(str(latex_path), auto_fix=(refinement_level > 0))
+    success = latex_content_to_pdf(latex_content, str(latex_path), auto_fix=(refinement_level > 0))
+    print(f"LaTeX file created: {latex_path}")
     
     if not success or not os.path.exists(pdf_path):
         print("PDF generation failed. Checking for issues...")
-        has_documentclass, has_begin_document, has_end_document = check_latex_structure(str(latex_path))
+        has_documentclass, has_begin_document, has_end_document = check_latex_content(latex_content)
         if not all([has_documentclass, has_begin_document, has_end_document]):
             print("LaTeX structure issues detected. Try with higher refinement level.")
         raise RuntimeError(f"PDF generation failed: {pdf_path} not found")